@@ -0,0 +1,95 @@
+"""
+Attachment upload benchmark. See README for license info.
+
+Uploads a set of generated files to the fake server one at a time with
+JIRA.add_attachment (with requests_toolbelt's MultipartEncoder when it is
+installed, and with the files= fallback), then with JIRA.add_attachments, and
+prints the throughput and the peak Python heap of each. The uploads run in a separate
+interpreter so the heap measured is the client's alone. Usage:
+
+    python benchmarks/bench_attachments.py [--files 8] [--size-mb 16] [--workers 4]
+
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import fakejira
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+UPLOAD = """
+import json, os, sys, time, tracemalloc
+sys.path.insert(0, {here!r})
+import run
+run.install_client()
+import jira.client
+from jira.client import JIRA
+
+if {mode!r} == "files=":
+    jira.client._multipart_encoder = lambda: None
+
+jira = JIRA({{"server": {url!r}}}, basic_auth=("benchmark", "benchmark"))
+uploads = {uploads!r}
+tracemalloc.start()
+started = time.time()
+if {mode!r} != "add_attachments":
+    for issue, path in uploads:
+        with open(path, "rb") as f:
+            jira.add_attachment(issue, f)
+    failed = 0
+else:
+    failed = len(jira.add_attachments(uploads, workers={workers}).failed)
+seconds = time.time() - started
+print(json.dumps({{"seconds": seconds, "failed": failed,
+                   "peak": tracemalloc.get_traced_memory()[1]}}))
+"""
+
+
+def upload(url, uploads, mode, workers):
+    """
+    Uploads (issue key, path) pairs in a new interpreter.
+    Returns: dict with seconds, failed and peak (bytes of Python heap)
+
+    """
+    code = UPLOAD.format(here=HERE, url=url, uploads=uploads, mode=mode,
+                         workers=workers)
+    done = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                          text=True, check=True)
+    return json.loads(done.stdout.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--size-mb", type=float, default=16)
+    parser.add_argument("--workers", type=int, default=4,
+                        help="concurrent uploads for add_attachments")
+    args = parser.parse_args(argv)
+
+    size = int(args.size_mb * 1e6)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(directory, "feed-sample-%d.xml" % i)
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+            paths.append(path)
+        dataset = fakejira.Dataset(issues=args.files)
+        uploads = list(zip(sorted(dataset.issues), paths))
+        with fakejira.FakeJira(dataset) as fake:
+            print("%-16s %9s %9s %12s %7s" % (
+                "method", "seconds", "MB/s", "peak heap MB", "failed"))
+            for mode in ("files=", "add_attachment", "add_attachments"):
+                result = upload(fake.url, uploads, mode, args.workers)
+                print("%-16s %9.2f %9.1f %12.1f %7d" % (
+                    mode, result["seconds"],
+                    size * args.files / 1e6 / result["seconds"],
+                    result["peak"] / 1e6, result["failed"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark of JIRA._get_url. See README for license info.
+
+Compares the URL builder in client.py with the previous one, which copied and
+formatted the whole options dict on every call, and prints the time per call
+of each. Usage:
+
+    python benchmarks/bench_get_url.py [--number 200000] [--repeat 5]
+
+"""
+import argparse
+import timeit
+
+import fakejira
+import run
+
+
+def options_copy_url(jira, path, base):
+    """
+    The previous _get_url: copy the options, add the path, format.
+
+    """
+    options = jira._options.copy()
+    options.update({"path": path})
+    return base.format(**options)
+
+
+def measure(number, repeat):
+    """
+    Returns {name: best seconds per call} for both builders.
+
+    """
+    run.install_client()
+    from jira.client import JIRA
+    with fakejira.FakeJira(fakejira.Dataset(issues=10)) as fake:
+        jira = JIRA({"server": fake.url}, basic_auth=("benchmark", "benchmark"))
+    path = "issue/INDEXREP-1234/watchers"
+    base = JIRA.JIRA_BASE_URL
+    assert jira._get_url(path) == options_copy_url(jira, path, base)
+    builders = {
+        "options copy + format": lambda: options_copy_url(jira, path, base),
+        "cached prefix": lambda: jira._get_url(path),
+        }
+    return dict((name, min(timeit.repeat(fn, number=number, repeat=repeat))
+                 / number)
+                for name, fn in builders.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--number", type=int, default=200000,
+                        help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="measurements; the best one is reported")
+    args = parser.parse_args(argv)
+
+    results = measure(args.number, args.repeat)
+    for name, seconds in results.items():
+        print("%-24s %8.0f ns/call" % (name, seconds * 1e9))
+    before, after = results["options copy + format"], results["cached prefix"]
+    print("%-24s %8.1fx" % ("speedup", before / after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Import-time benchmark of client.py. See README for license info.
+
+Imports jira.client in fresh interpreters, with this repo's client.py in place
+of the installed one as it is deployed, and prints the median import time and
+the slowest modules it pulled in. Exits with status 1 when one of the modules
+client.py imports lazily was loaded anyway, or when the median is over
+--max-ms, so it can guard against regressions. Usage:
+
+    python benchmarks/bench_import.py [--runs 7] [--top 10] [--max-ms 250]
+
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules client.py only imports when a feature needs them
+LAZY = ("pkg_resources", "imghdr", "requests_toolbelt", "requests_jwt",
+        "requests_kerberos", "requests_oauthlib", "oauthlib", "magic")
+
+PROBE = """
+import importlib.abc, importlib.util, json, sys, time
+
+class Finder(importlib.abc.MetaPathFinder):
+    def find_spec(self, name, path, target=None):
+        if name == "jira.client":
+            return importlib.util.spec_from_file_location(name, {client!r})
+
+sys.meta_path.insert(0, Finder())
+started = time.perf_counter()
+import jira.client
+print(json.dumps({{"seconds": time.perf_counter() - started,
+                   "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(importtime=False):
+    """
+    Imports jira.client in a new interpreter.
+    Returns: (result dict, stderr text)
+
+    """
+    code = PROBE.format(client=os.path.join(ROOT, "client.py"), lazy=LAZY)
+    command = [sys.executable] + (["-X", "importtime"] if importtime else [])
+    done = subprocess.run(command + ["-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    return json.loads(done.stdout), done.stderr
+
+
+def slowest(importtime_log, top):
+    """
+    Returns the top modules of a -X importtime log by cumulative time, as
+    (microseconds, module) pairs.
+
+    """
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), module.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--runs", type=int, default=7,
+                        help="interpreters started; the median is reported")
+    parser.add_argument("--top", type=int, default=10,
+                        help="slowest modules listed")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="fail when the median import takes longer")
+    args = parser.parse_args(argv)
+
+    # the first run compiles client.py, so it is not counted
+    probe()
+    results = [probe()[0] for _ in range(args.runs)]
+    median = statistics.median(result["seconds"] for result in results) * 1e3
+    result, log = probe(importtime=True)
+    print("%-40s %8.1f ms" % ("import jira.client (median)", median))
+    for microseconds, module in slowest(log, args.top):
+        print("  %-38s %8.1f ms" % (module.strip(), microseconds / 1e3))
+
+    failed = False
+    if result["loaded"]:
+        print("loaded at import time: %s" % ", ".join(result["loaded"]))
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print("over the %.0f ms limit" % args.max_ms)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Webhook receiver benchmark. See README for license info.
+
+Starts webhook.py's receiver against a FakeJira, posts one issue_created
+event for every unassigned open issue and one status change event for every
+Merged issue, and prints the time from posting to the jobs being done and
+the requests they made, next to a full Housekeeping run over the same
+dataset. --samples writes the posted payloads to a directory, for posting to
+a receiver by hand with ``python webhook.py --post``. Usage:
+
+    python benchmarks/bench_webhook.py [--issues 200] [--latency 0.02]
+                                       [--samples DIR]
+
+"""
+from contextlib import redirect_stdout
+import argparse
+import importlib
+import io
+import json
+import os
+import sys
+import time
+
+import fakejira
+import run
+
+
+def events(dataset):
+    """
+    Returns webhook payloads for the issues the auto_assign and auto QC jobs
+    would handle.
+
+    """
+    payloads = []
+    for key, issue in sorted(dataset.issues.items()):
+        fields = issue["fields"]
+        if fields["assignee"] is None and fields["resolutiondate"] is None:
+            payloads.append({"webhookEvent": "jira:issue_created",
+                             "issue": {"key": key, "id": issue["id"]}})
+        elif fields["status"]["name"] == "Merged":
+            payloads.append({
+                "webhookEvent": "jira:issue_updated",
+                "issue_event_type_name": "issue_generic",
+                "issue": {"key": key, "id": issue["id"]},
+                "changelog": {"items": [{"field": "status",
+                                         "fromString": "In Progress",
+                                         "toString": "Merged"}]}})
+    return payloads
+
+
+def fresh(name):
+    """
+    Imports a script module anew, so it binds the secrets installed last.
+
+    """
+    sys.modules.pop(name, None)
+    return importlib.import_module(name)
+
+
+def requests_made(fake, before):
+    return sum(stat["requests"] for stat in fake.snapshot().values()) - before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--issues", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--samples", metavar="DIR",
+                        help="write the posted payloads to DIR")
+    args = parser.parse_args(argv)
+
+    run.install_client()
+    run.skip_reload_delay()
+    import requests
+    import settings
+    # the auto QC filter has no delay in the fake dataset
+    settings.webhook_routes = [dict(rule, delay=0)
+                               for rule in settings.webhook_routes]
+
+    payloads = events(fakejira.Dataset(issues=args.issues))
+    if args.samples:
+        os.makedirs(args.samples, exist_ok=True)
+        for i, payload in enumerate(payloads):
+            with open(os.path.join(args.samples, "event-%03d.json" % i), "w") as f:
+                json.dump(payload, f, indent=2)
+
+    print("%-28s %9s %9s" % ("", "requests", "seconds"))
+    with fakejira.FakeJira(fakejira.Dataset(issues=args.issues),
+                           latency=args.latency) as fake:
+        run.install_secrets(fake)
+        jiratools = fresh("jiratools")
+        started = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            jiratools.Housekeeping()
+        print("%-28s %9d %9.2f" % ("cron run (all jobs)",
+                                   requests_made(fake, 0),
+                                   time.perf_counter() - started))
+
+    with fakejira.FakeJira(fakejira.Dataset(issues=args.issues),
+                           latency=args.latency) as fake:
+        run.install_secrets(fake)
+        jiratools = fresh("jiratools")
+        webhook = fresh("webhook")
+        with redirect_stdout(io.StringIO()):
+            dispatcher = webhook.Dispatcher(jiratools.Housekeeping(run=False))
+        with webhook.WebhookServer(dispatcher, port=0) as receiver:
+            before = requests_made(fake, 0)
+            started = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                for payload in payloads:
+                    requests.post(receiver.url, json=payload)
+                while len(dispatcher) or dispatcher.running:
+                    time.sleep(0.01)
+            seconds = time.perf_counter() - started
+            print("%-28s %9d %9.2f" % ("%d webhook events" % len(payloads),
+                                       requests_made(fake, before), seconds))
+            if dispatcher.failed:
+                print("%d jobs failed" % dispatcher.failed)
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,846 @@
+"""
+Local stand-in for the Jira REST API, used by the benchmarks. See README for
+license info.
+
+Serves the endpoints the scripts in this repo hit (search, filter, group,
+watchers, transitions, issue, comment, ...) from a synthetic in-memory
+dataset, and counts requests and bytes per endpoint. Writes are applied to
+the dataset so a run behaves like it would against a real instance.
+
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import json
+import random
+import re
+import threading
+import time
+
+PROJECTS = ["INDEXREP", "ADT", "FCA", "MER", "SE"]
+STATUSES = ["Open", "In Progress", "Merged", "Resolved", "Failed Audit"]
+RESOLVED = ("Resolved", "Closed")
+GROUPS = [
+    "member-services",
+    "membership-development",
+    "issue audits",
+    "issue audits lead",
+    "content-acquisition",
+    "content-acquisition-free",
+    "free-index-default",
+    "mer-assignees",
+    "mer-auto-watch",
+    "se-assignees",
+    "Sales-Engineering",
+    ]
+# filter key -> JQL. The keys match secrets.jira_filters in the scripts
+FILTERS = {
+    "auto_qc": 'project = INDEXREP AND status = Merged',
+    "audit_list": 'project = INDEXREP AND status = Resolved',
+    "assigned_audits": 'project = ADT AND resolution is EMPTY',
+    "stale_free": 'project = FCA AND assignee is not EMPTY AND resolution is EMPTY',
+    "member_auto_assign": 'project = INDEXREP AND assignee is EMPTY AND resolution is EMPTY',
+    "free_auto_assign": 'project = FCA AND assignee is EMPTY AND resolution is EMPTY',
+    "mer_auto_assign": 'project = MER AND assignee is EMPTY AND resolution is EMPTY',
+    "se_auto_assign": 'project = SE AND assignee is EMPTY AND resolution is EMPTY',
+    "member_assigned_issues": 'project = INDEXREP AND assignee is not EMPTY AND resolution is EMPTY',
+    "free_assigned_issues": 'project = FCA AND assignee is not EMPTY AND resolution is EMPTY',
+    "mer_assigned_issues": 'project = MER AND assignee is not EMPTY AND resolution is EMPTY',
+    "se_assigned_issues": 'project = SE AND assignee is not EMPTY AND resolution is EMPTY',
+    "remind_close_issues": 'project != INDEXREP AND status = Resolved AND labels != auto-close',
+    "auto_close_issues": 'project != INDEXREP AND status = Resolved AND labels = auto-close',
+    "autoclose_label": 'labels = auto-close AND resolution is EMPTY',
+    "time_to_touch": 'project = SE ORDER BY created DESC',
+    }
+TRANSITIONS = [
+    {"id": "11", "name": "Send to QC", "to": "Quality Control"},
+    {"id": "21", "name": "Close Issue", "to": "Closed"},
+    {"id": "31", "name": "Complete", "to": "Closed"},
+    ]
+# option id -> value of the indexing type field, customfield_10500
+INDEXING_TYPES = {"10100": "Free", "10103": "Member"}
+AUTO_CLOSE_LABEL = "auto-close"
+REST = "/rest/api/2/"
+REST_PATH = re.compile(r"^/rest/api/(2|latest)/")
+ATTACHMENT_CONTENT = re.compile(r"^/secure/attachment/(\d+)/")
+BACKUP_RUN = "/rest/backup/1/export/runbackup"
+BACKUP_PROGRESS = "/rest/obm/1.0/getprogress"
+BACKUP_FILE = re.compile(r"^/webdav/backupmanager/(.+)$")
+PAGE = 50
+
+
+class Dataset:
+    """
+    Synthetic users, groups, filters and issues.
+
+    A Cloud backup started through the API takes ``backup_seconds`` to
+    complete and produces ``backup_size`` bytes.
+
+    """
+    backup_seconds = 1.0
+    backup_size = 4 * 1024 * 1024
+
+    def __init__(self, issues=200, users=40, group_size=10, seed=1):
+        """
+        Inputs:
+        :issues:        number of issues, spread over PROJECTS
+        :users:         size of the user pool
+        :group_size:    members per group
+        :seed:          random seed, so runs are comparable
+
+        """
+        rnd = random.Random(seed)
+        self.lock = threading.RLock()
+        self.users = dict(
+            ("acc-%04d" % i, {"accountId": "acc-%04d" % i,
+                              "displayName": "User %d" % i,
+                              "active": True})
+            for i in range(users))
+        pool = sorted(self.users)
+        self.groups = dict(
+            (name, sorted(rnd.sample(pool, min(group_size, len(pool)))))
+            for name in GROUPS)
+        self.filters = dict((i + 1, (key, jql))
+                            for i, (key, jql) in enumerate(sorted(FILTERS.items())))
+        self.issues = {}
+        self.by_id = {}
+        self.links = []
+        self.attachments = {}
+        self.backup = None
+        self.next_id = 10000
+        self.next_number = {}
+        self.next_comment = 1
+        start = datetime(2019, 1, 1)
+        for n in range(issues):
+            project = PROJECTS[n % len(PROJECTS)]
+            status = rnd.choice(STATUSES)
+            created = start + timedelta(hours=rnd.randint(0, 24 * 300))
+            labels = []
+            if rnd.random() < 0.1:
+                labels.append("wait")
+            if status == "Resolved" and rnd.random() < 0.3:
+                labels.append(AUTO_CLOSE_LABEL)
+            histories = []
+            for h in range(rnd.randint(1, 6)):
+                histories.append({
+                    "id": str(h),
+                    "author": {"accountId": rnd.choice(pool)},
+                    "created": (created + timedelta(hours=rnd.randint(1, 72))
+                                ).strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+                    "items": [{"field": "status", "toString": status}],
+                    })
+            histories.sort(key=lambda h: h["created"], reverse=True)
+            summary = "Feed %d for employer %d" % (n, rnd.randint(1, 999))
+            if project == "ADT":
+                summary = "compliance audit - %s [INDEXREP-%d]" % (summary, n)
+            if rnd.random() < 0.05:
+                summary = "New member setup " + summary
+            self.add_issue(project, {
+                "summary": summary,
+                "description": "Synthetic issue %d" % n,
+                "status": {"name": status},
+                "reporter": self.users[rnd.choice(pool)],
+                # audit tickets are always assigned to an auditor
+                "assignee": (self.users[rnd.choice(pool)]
+                             if project == "ADT" or rnd.random() < 0.6
+                             else None),
+                "labels": labels,
+                "issuelinks": [],
+                "created": created.strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+                "updated": created.strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+                "resolutiondate": None,
+                "customfield_10500": (None if rnd.random() < 0.5 else
+                                      {"id": "10103", "value": "Member"}),
+                "customfield_10501": str(rnd.randint(1, 9999)),
+                "customfield_10502": str(rnd.randint(1, 9999)),
+                "customfield_13100": "",
+                "customfield_13101": "",
+                }, histories=histories,
+                watchers=rnd.sample(pool, rnd.randint(0, 3)),
+                comments=[{"body": "synthetic comment",
+                           "author": self.users[rnd.choice(pool)]}
+                          for _ in range(rnd.randint(0, 2))])
+
+    def add_issue(self, project, fields, histories=(), watchers=(), comments=()):
+        with self.lock:
+            self.next_id += 1
+            self.next_number[project] = self.next_number.get(project, 0) + 1
+            key = "%s-%d" % (project, self.next_number[project])
+            fields = dict(fields)
+            fields["project"] = {"key": project}
+            issue = {"id": str(self.next_id), "key": key, "fields": fields,
+                     "changelog": {"histories": list(histories)},
+                     "watchers": list(watchers), "comments": []}
+            self.issues[key] = issue
+            self.by_id[issue["id"]] = issue
+            for comment in comments:
+                self.add_comment(issue, comment["body"], comment["author"])
+            return issue
+
+    def add_comment(self, issue, body, author):
+        with self.lock:
+            comment = {"id": str(self.next_comment), "body": body, "author": author,
+                       "created": datetime.now().strftime(
+                           "%Y-%m-%dT%H:%M:%S.000+0000")}
+            self.next_comment += 1
+            issue["comments"].append(comment)
+            return comment
+
+    def touch(self, issue):
+        """Records a change to an issue in its updated/resolutiondate."""
+        with self.lock:
+            now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+            now += "+0000"
+            fields = issue["fields"]
+            fields["updated"] = now
+            if fields["status"]["name"] in RESOLVED:
+                fields["resolutiondate"] = fields.get("resolutiondate") or now
+            else:
+                fields["resolutiondate"] = None
+
+    def start_backup(self):
+        with self.lock:
+            started = datetime.utcnow()
+            self.backup = {
+                "started": time.time(),
+                "fileName": started.strftime("JIRA-backup-%Y%m%d%H%M%S.zip"),
+                "content": random.Random(self.next_id).randbytes(
+                    self.backup_size)}
+
+    def backup_progress(self):
+        """Returns the backup state the way /rest/obm/1.0/getprogress does."""
+        with self.lock:
+            if self.backup is None:
+                return {}
+            elapsed = time.time() - self.backup["started"]
+            percent = min(100, int(100 * elapsed / self.backup_seconds)
+                          if self.backup_seconds else 100)
+            return {"fileName": self.backup["fileName"],
+                    "alternativePercentage":
+                        "Estimated progress: %d %%" % percent,
+                    "size": str(len(self.backup["content"])
+                                if percent >= 100 else 0)}
+
+    def issue(self, key_or_id):
+        return self.issues.get(key_or_id) or self.by_id.get(key_or_id)
+
+    def search(self, jql):
+        with self.lock:
+            return [issue for issue in self.issues.values()
+                    if _matches(jql, issue["fields"], issue["key"])]
+
+
+# searches evaluate the same JQL against every issue, so the string work is
+# cached rather than redone per issue
+@lru_cache(maxsize=4096)
+def _split(expr, word):
+    """Splits a JQL expression on a keyword at parenthesis depth 0."""
+    parts, depth, start, i = [], 0, 0, 0
+    token = " %s " % word
+    upper = expr.upper()
+    while i < len(expr):
+        if expr[i] == "(":
+            depth += 1
+        elif expr[i] == ")":
+            depth -= 1
+        elif depth == 0 and upper.startswith(token, i):
+            parts.append(expr[start:i])
+            i += len(token)
+            start = i
+            continue
+        i += 1
+    parts.append(expr[start:])
+    return tuple(part.strip() for part in parts)
+
+
+@lru_cache(maxsize=4096)
+def _wrapped(expr):
+    if not (expr.startswith("(") and expr.endswith(")")):
+        return False
+    depth = 0
+    for i, char in enumerate(expr):
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if depth == 0 and i < len(expr) - 1:
+            return False
+    return True
+
+
+def _values(issue_fields, key, field):
+    """Returns the values an issue has for a JQL field, as a list."""
+    field = field.lower()
+    if field == "key":
+        return [key]
+    if field == "project":
+        return [issue_fields["project"]["key"]]
+    if field == "status":
+        return [issue_fields["status"]["name"]]
+    if field in ("assignee", "reporter"):
+        user = issue_fields.get(field)
+        return [user["accountId"]] if user else []
+    if field == "labels":
+        return list(issue_fields.get("labels") or [])
+    if field == "resolution":
+        return (["Fixed"] if issue_fields["status"]["name"] in RESOLVED else [])
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _where(jql):
+    return re.split(r"\s+ORDER\s+BY\s+", jql, flags=re.I)[0].strip()
+
+
+def _matches(jql, issue_fields, key):
+    """
+    Evaluates the subset of JQL the scripts use (AND/OR, parentheses, =, !=,
+    in, not in, is [not] EMPTY, date comparisons). Clauses it does not
+    understand are treated as true.
+
+    """
+    expr = _where(jql)
+    if _wrapped(expr):
+        return _matches(expr[1:-1], issue_fields, key)
+    alternatives = _split(expr, "OR")
+    if len(alternatives) > 1:
+        return any(_matches(alt, issue_fields, key) for alt in alternatives)
+    clauses = _split(expr, "AND")
+    if len(clauses) > 1:
+        return all(_matches(clause, issue_fields, key) for clause in clauses)
+
+    match = re.match(r'^(created|updated|resolutiondate)\s*(>=|<=|>|<)\s*'
+                     r'"?([^"]*)"?$', expr, re.I)
+    if match:
+        return _compare_date(issue_fields.get(match.group(1).lower()),
+                             match.group(2), match.group(3))
+    match = re.match(r'^(\w+)\s+is\s+(not\s+)?EMPTY$', expr, re.I)
+    if match:
+        values = _values(issue_fields, key, match.group(1))
+        if values is None:
+            return True
+        return bool(values) == bool(match.group(2))
+    match = re.match(r'^(\w+)\s+(not\s+in|in)\s*\((.*)\)$', expr, re.I)
+    if match:
+        values = _values(issue_fields, key, match.group(1))
+        if values is None:
+            return True
+        wanted = [v.strip().strip('"') for v in match.group(3).split(",")]
+        hit = any(v in values for v in wanted)
+        if match.group(2).lower() != "in":
+            # like Jira, "not in" never matches an empty field
+            return bool(values) and not hit
+        return hit
+    match = re.match(r'^(\w+)\s*(!=|=)\s*"?([^"]*)"?$', expr)
+    if match:
+        values = _values(issue_fields, key, match.group(1))
+        if values is None:
+            return True
+        hit = match.group(3) in values
+        # like Jira, != never matches an empty field
+        return hit if match.group(2) == "=" else bool(values) and not hit
+    return True
+
+
+def _compare_date(timestamp, op, value):
+    """
+    Compares a Jira timestamp with a JQL date: relative (-5m, -2d) or
+    absolute (2019/01/31 [12:00], 2019-01-31), both read as UTC.
+
+    """
+    if not timestamp:
+        return False
+    moment = datetime.strptime(timestamp[:19], "%Y-%m-%dT%H:%M:%S")
+    relative = re.match(r"^([-+]?)(\d+)([mhdw])$", value.strip())
+    if relative:
+        units = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+        delta = timedelta(**{units[relative.group(3)]: int(relative.group(2))})
+        limit = datetime.utcnow() + (-delta if relative.group(1) == "-"
+                                     else delta)
+    else:
+        limit = None
+        for pattern in ("%Y/%m/%d %H:%M", "%Y-%m-%d %H:%M", "%Y/%m/%d",
+                        "%Y-%m-%d"):
+            try:
+                limit = datetime.strptime(value.strip(), pattern)
+                break
+            except ValueError:
+                continue
+        if limit is None:
+            return True
+    return {">=": moment >= limit, ">": moment > limit,
+            "<=": moment <= limit, "<": moment < limit}[op]
+
+
+def endpoint(method, path):
+    """Collapses ids and issue keys in a REST path, e.g. issue/{id}/watchers."""
+    path = REST_PATH.sub("", path.split("?")[0])
+    parts = ["{id}" if re.match(r"^([A-Z][A-Z0-9_]*-\d+|\d+)$", part) else part
+             for part in path.strip("/").split("/")]
+    return "%s %s" % (method, "/".join(parts))
+
+
+class FakeJira:
+    """
+    Threaded HTTP server serving a Dataset. Use as a context manager or call
+    start()/stop(). ``url`` is the server address to pass to JIRA().
+
+    """
+    def __init__(self, dataset=None, latency=0.0, host="127.0.0.1", port=0):
+        """
+        Inputs:
+        :dataset:   Dataset to serve. Defaults to Dataset()
+        :latency:   seconds added to every request
+        :host/port: address to listen on. Port 0 picks a free one
+
+        """
+        self.dataset = dataset or Dataset()
+        self.latency = latency
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+        # statuses the next requests are answered with, see fail_next()
+        self.failures = []
+        # most group members returned for a users[start:end] range; Jira can
+        # answer a range with fewer users than it asked for
+        self.group_page = PAGE
+        handler = type("Handler", (_Handler,), {"fake": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.url = "http://%s:%d" % self.server.server_address
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def record(self, method, path, bytes_in, bytes_out):
+        name = endpoint(method, path)
+        with self._stats_lock:
+            stat = self.stats.setdefault(name, {"requests": 0, "bytes_in": 0,
+                                                "bytes_out": 0})
+            stat["requests"] += 1
+            stat["bytes_in"] += bytes_in
+            stat["bytes_out"] += bytes_out
+
+    def snapshot(self):
+        """Returns a copy of the per-endpoint counters."""
+        with self._stats_lock:
+            return dict((name, dict(stat)) for name, stat in self.stats.items())
+
+    def reset(self):
+        with self._stats_lock:
+            self.stats.clear()
+
+    def fail_next(self, status, count=1):
+        """Answers the next ``count`` requests with ``status`` and no body."""
+        with self._stats_lock:
+            self.failures.extend([status] * count)
+
+    def _failure(self):
+        with self._stats_lock:
+            return self.failures.pop(0) if self.failures else None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    fake = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        url = urlparse(self.path)
+        failure = self.fake._failure()
+        if failure is not None:
+            self.fake.record(method, url.path, length, 0)
+            self.send_response(failure)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        match = ATTACHMENT_CONTENT.match(url.path)
+        if method == "GET" and match:
+            return self._content(match.group(1))
+        match = BACKUP_FILE.match(url.path)
+        if method == "GET" and match:
+            backup = self.fake.dataset.backup
+            ready = (backup and backup["fileName"] == match.group(1) and
+                     self.fake.dataset.backup_progress()["size"] != "0")
+            return self._send_bytes("/webdav/backupmanager",
+                                    backup["content"] if ready else None)
+        # repeated parameters (fields=a&fields=b) read as one list, "a,b"
+        query = dict((k, ",".join(v)) for k, v in parse_qs(url.query).items())
+        content_type = self.headers.get("Content-Type") or ""
+        try:
+            if content_type.startswith("multipart/form-data"):
+                payload = _multipart(body, content_type)
+            else:
+                payload = json.loads(body.decode("utf-8")) if body else None
+        except ValueError:
+            payload = None
+        path = (REST_PATH.sub("", url.path) if REST_PATH.match(url.path)
+                else url.path if url.path in (BACKUP_RUN, BACKUP_PROGRESS)
+                else None)
+        try:
+            with self.fake.dataset.lock:
+                status, result = _route(self.fake, method, path, query, payload)
+        except Exception as e:
+            status, result = 500, {"errorMessages": ["%s: %s" % (type(e).__name__, e)]}
+        data = b"" if result is None else json.dumps(result).encode("utf-8")
+        # counted before answering, so a client snapshot taken right after
+        # the response arrives already includes this request
+        self.fake.record(method, url.path, length, len(data))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def _content(self, attachment_id):
+        with self.fake.dataset.lock:
+            attachment = self.fake.dataset.attachments.get(attachment_id)
+        self._send_bytes("/secure/attachment/%s" % attachment_id,
+                         attachment and attachment["content"])
+
+    def _send_bytes(self, name, content):
+        """Serves a file, honouring a single Range header. None is a 404."""
+        if content is None:
+            self.fake.record("GET", name, 0, 0)
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        status, start, end = 200, 0, len(content)
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if match and int(match.group(1)) >= len(content):
+            self.fake.record("GET", name, 0, 0)
+            self.send_response(416)
+            self.send_header("Content-Range", "bytes */%d" % len(content))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if match:
+            status, start = 206, int(match.group(1))
+            end = int(match.group(2)) + 1 if match.group(2) else end
+        self.fake.record("GET", name, 0, end - start)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start))
+        if status == 206:
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (
+                start, end - 1, len(content)))
+        self.end_headers()
+        self.wfile.write(content[start:end])
+
+
+def _multipart(body, content_type):
+    """Returns the files of a multipart/form-data body as (filename, bytes)."""
+    boundary = re.search(r"boundary=([^;]+)", content_type).group(1).strip('"')
+    files = []
+    for part in body.split(b"--" + boundary.encode("ascii"))[1:-1]:
+        head, _, content = part.partition(b"\r\n\r\n")
+        name = re.search(rb'filename="([^"]*)"', head)
+        if name:
+            files.append((name.group(1).decode("utf-8"), content[:-2]))
+    return {"files": files}
+
+
+def _base(fake):
+    return fake.url + REST
+
+
+def _user(fake, user):
+    if not user:
+        return None
+    user = dict(user)
+    user["self"] = _base(fake) + "user?accountId=" + user["accountId"]
+    return user
+
+
+def _issue_json(fake, issue, expand=""):
+    fields = dict(issue["fields"])
+    fields["reporter"] = _user(fake, fields.get("reporter"))
+    fields["assignee"] = _user(fake, fields.get("assignee"))
+    fields["resolution"] = ({"id": "1", "name": "Fixed"}
+                            if fields["status"]["name"] in RESOLVED else None)
+    fields["attachment"] = [
+        _attachment_json(fake, attachment_id)
+        for attachment_id, attachment in fake.dataset.attachments.items()
+        if attachment["issue"] == issue["key"]]
+    raw = {"id": issue["id"], "key": issue["key"],
+           "self": _base(fake) + "issue/" + issue["id"], "fields": fields}
+    if "changelog" in (expand or ""):
+        histories = issue["changelog"]["histories"]
+        raw["changelog"] = {"startAt": 0, "maxResults": len(histories),
+                            "total": len(histories), "histories": histories}
+    return raw
+
+
+def _attachment_json(fake, attachment_id):
+    attachment = fake.dataset.attachments[attachment_id]
+    return {"self": _base(fake) + "attachment/" + attachment_id,
+            "id": attachment_id, "filename": attachment["filename"],
+            "size": len(attachment["content"]),
+            "mimeType": "application/octet-stream",
+            "content": "%s/secure/attachment/%s/%s" % (
+                fake.url, attachment_id, attachment["filename"])}
+
+
+def _comment_json(fake, issue, comment):
+    comment = dict(comment)
+    comment["author"] = _user(fake, comment["author"])
+    comment["self"] = "%sissue/%s/comment/%s" % (_base(fake), issue["id"],
+                                                 comment["id"])
+    return comment
+
+
+def _route(fake, method, path, query, payload):
+    """Returns (status, json) for a REST call."""
+    data = fake.dataset
+    if path == BACKUP_RUN and method == "POST":
+        data.start_backup()
+        return 200, None
+    if path == BACKUP_PROGRESS and method == "GET":
+        return 200, data.backup_progress()
+    if path is None:
+        return 404, {"errorMessages": ["Not a REST path"]}
+    parts = path.strip("/").split("/")
+    head = parts[0]
+
+    if method == "GET" and head == "serverInfo":
+        return 200, {"baseUrl": fake.url, "versionNumbers": [1001, 0, 0],
+                     "deploymentType": "Cloud", "version": "1001.0.0"}
+    if method == "GET" and head == "field":
+        return 200, [{"id": name, "name": name, "clauseNames": [name]}
+                     for name in ("summary", "status", "assignee", "reporter",
+                                  "labels", "created")]
+    if method == "GET" and head == "myself":
+        return 200, _user(fake, next(iter(data.users.values())))
+    if method == "GET" and head == "issuetype":
+        return 200, [{"id": "3", "name": "Task",
+                      "self": _base(fake) + "issuetype/3"}]
+    if method == "GET" and head == "project":
+        return 200, [{"id": str(i), "key": key, "name": key,
+                      "self": _base(fake) + "project/" + str(i)}
+                     for i, key in enumerate(PROJECTS)]
+    if method == "GET" and head == "issueLinkType":
+        return 200, {"issueLinkTypes": [{
+            "id": "10003", "name": "Relates", "inward": "relates to",
+            "outward": "relates to", "self": _base(fake) + "issueLinkType/10003"}]}
+    if method == "POST" and head == "issueLink":
+        for side in ("inwardIssue", "outwardIssue"):
+            if data.issue(payload[side]["key"]) is None:
+                return 404, {"errorMessages": [
+                    "Issue Does Not Exist: %s" % payload[side]["key"]]}
+        data.links.append(payload)
+        return 201, None
+    if method == "GET" and head == "filter" and len(parts) == 2:
+        key, jql = data.filters.get(int(parts[1]), (None, None))
+        if key is None:
+            return 404, {"errorMessages": ["No filter %s" % parts[1]]}
+        return 200, {"id": parts[1], "name": key, "jql": jql,
+                     "self": _base(fake) + "filter/" + parts[1]}
+    if method == "GET" and head == "groups" and parts[1:] == ["picker"]:
+        wanted = query.get("query", "").lower()
+        names = [name for name in data.groups if wanted in name.lower()]
+        return 200, {"total": len(names), "groups": [{"name": name}
+                                                      for name in names]}
+    if method == "GET" and head == "group":
+        return _group(fake, query)
+    if method == "GET" and head == "search":
+        return _search(fake, query)
+    if method == "GET" and head == "label":
+        labels = sorted(set(label for issue in data.issues.values()
+                            for label in issue["fields"].get("labels") or ()))
+        start = int(query.get("startAt") or 0)
+        max_results = int(query.get("maxResults") or 1000)
+        page = labels[start:start + max_results]
+        return 200, {"startAt": start, "maxResults": max_results,
+                     "total": len(labels), "values": page,
+                     "isLast": start + len(page) >= len(labels)}
+    if head == "issue":
+        status, result = _issue_route(fake, method, parts[1:], query, payload)
+        if method != "GET" and status < 300:
+            data.touch(data.issue(parts[1]) if len(parts) > 1
+                       else data.issue(result["key"]))
+        return status, result
+    return 404, {"errorMessages": ["Unknown endpoint %s %s" % (method, path)]}
+
+
+def _group(fake, query):
+    name = query.get("groupname", "")
+    members = None
+    for group, accounts in fake.dataset.groups.items():
+        if group.lower() == name.lower():
+            members = accounts
+    if members is None:
+        return 404, {"errorMessages": ["No group %s" % name]}
+    match = re.match(r"users\[(\d+):(\d+)\]", query.get("expand", ""))
+    start, end = (int(match.group(1)), int(match.group(2))) if match \
+        else (0, PAGE - 1)
+    if match:
+        end = min(end, start + fake.group_page - 1)
+    page = members[start:end + 1]
+    return 200, {"name": name, "users": {
+        "size": len(members),
+        "items": [_user(fake, fake.dataset.users[a]) for a in page],
+        "max-results": PAGE, "start-index": start,
+        "end-index": start + len(page) - 1}}
+
+
+def _search(fake, query):
+    # like Jira, a key list naming an unknown issue fails the whole search
+    unknown = [key for clause in re.findall(r"\bkey\s+in\s*\(([^)]*)\)",
+                                            query.get("jql", ""), re.I)
+               for key in (v.strip().strip('"') for v in clause.split(","))
+               if fake.dataset.issue(key) is None]
+    if unknown:
+        return 400, {"errorMessages": [
+            "An issue with key '%s' does not exist for field 'key'." % key
+            for key in unknown], "errors": {}}
+    issues = fake.dataset.search(query.get("jql", ""))
+    start = int(query.get("startAt") or 0)
+    max_results = min(int(query.get("maxResults", PAGE)), 100)
+    page = issues[start:start + max_results]
+    return 200, {"startAt": start, "maxResults": max_results,
+                 "total": len(issues),
+                 "issues": [_select_fields(_issue_json(fake, issue,
+                                                       query.get("expand")),
+                                           query.get("fields"))
+                            for issue in page]}
+
+
+def _select_fields(raw, fields):
+    """Keeps only the requested fields, like Jira's fields parameter."""
+    wanted = [field for field in (fields or "").split(",") if field]
+    if not wanted or "*all" in wanted or "*navigable" in wanted:
+        return raw
+    raw["fields"] = dict((field, value) for field, value
+                         in raw["fields"].items() if field in wanted)
+    return raw
+
+
+def _issue_route(fake, method, parts, query, payload):
+    data = fake.dataset
+    if not parts:
+        if method == "POST":
+            fields = dict(payload["fields"])
+            project = fields.pop("project")["key"]
+            fields.update({"status": {"name": "Open"}, "labels": [],
+                           "reporter": None, "assignee": None,
+                           "issuelinks": [], "customfield_10500": None})
+            issue = data.add_issue(project, fields)
+            return 201, {"id": issue["id"], "key": issue["key"],
+                         "self": _base(fake) + "issue/" + issue["id"]}
+        return 404, {"errorMessages": ["Unknown issue call"]}
+
+    issue = data.issue(parts[0])
+    if issue is None:
+        return 404, {"errorMessages": ["Issue does not exist"]}
+    sub = parts[1] if len(parts) > 1 else None
+
+    if sub is None and method == "GET":
+        return 200, _issue_json(fake, issue, query.get("expand"))
+    if sub == "attachments" and method == "POST":
+        created = []
+        for filename, content in (payload or {}).get("files", ()):
+            attachment_id = str(data.next_id)
+            data.next_id += 1
+            data.attachments[attachment_id] = {
+                "issue": issue["key"], "filename": filename,
+                "content": content}
+            created.append(_attachment_json(fake, attachment_id))
+        if not created:
+            return 400, {"errorMessages": ["No file in the request"]}
+        return 200, created
+    if sub is None and method == "PUT":
+        for field, value in (payload or {}).get("fields", {}).items():
+            if field in ("assignee", "reporter") and value is not None:
+                # {"name": ""} is how the scripts clear an assignee
+                value = data.users.get(value.get("accountId"))
+            if field == "customfield_10500" and value and "id" in value:
+                # options are set by id and read back with their value
+                value = {"id": value["id"],
+                         "value": INDEXING_TYPES.get(value["id"])}
+            issue["fields"][field] = value
+        return 204, None
+    if sub == "assignee" and method == "PUT":
+        issue["fields"]["assignee"] = data.users.get(payload.get("accountId"))
+        return 204, None
+    if sub == "watchers":
+        if method == "GET":
+            return 200, {"self": "%sissue/%s/watchers" % (_base(fake), issue["key"]),
+                         "isWatching": False,
+                         "watchCount": len(issue["watchers"]),
+                         "watchers": [_user(fake, data.users[a])
+                                      for a in issue["watchers"]
+                                      if a in data.users]}
+        if method == "POST":
+            if payload not in issue["watchers"]:
+                issue["watchers"].append(payload)
+            return 204, None
+        if method == "DELETE":
+            account = query.get("accountId")
+            if account in issue["watchers"]:
+                issue["watchers"].remove(account)
+            return 204, None
+    if sub == "transitions":
+        # an issue can carry its own transitions, like a workflow condition
+        # hiding some of them for that issue
+        transitions = issue.get("transitions", TRANSITIONS)
+        if method == "GET":
+            return 200, {"transitions": [{"id": t["id"], "name": t["name"],
+                                          "to": {"name": t["to"]}}
+                                         for t in transitions]}
+        if method == "POST":
+            wanted = str(payload["transition"]["id"])
+            for transition in transitions:
+                if transition["id"] == wanted:
+                    issue["fields"]["status"] = {"name": transition["to"]}
+                    return 204, None
+            return 400, {"errorMessages": [
+                "It seems that you have tried to perform a workflow operation "
+                "(%s) that is not valid for the current state of this issue "
+                "(%s)." % (wanted, issue["key"])], "errors": {}}
+    if sub == "comment":
+        if method == "GET" and len(parts) == 2:
+            return 200, {"startAt": 0, "total": len(issue["comments"]),
+                         "comments": [_comment_json(fake, issue, c)
+                                      for c in issue["comments"]]}
+        if method == "GET":
+            for comment in issue["comments"]:
+                if comment["id"] == parts[2]:
+                    return 200, _comment_json(fake, issue, comment)
+            return 404, {"errorMessages": ["No comment %s" % parts[2]]}
+        if method == "POST":
+            comment = data.add_comment(issue, payload["body"],
+                                       next(iter(data.users.values())))
+            return 201, _comment_json(fake, issue, comment)
+    return 404, {"errorMessages": ["Unknown issue call %s" % "/".join(parts)]}
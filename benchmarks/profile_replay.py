@@ -0,0 +1,103 @@
+"""
+Profiles Housekeeping offline from a recorded cassette. See README for
+license info.
+
+Records the HTTP traffic of a Housekeeping run against a local FakeJira,
+stops the server and replays the recording under cProfile, so the CPU cost of
+JSON parsing, Resource construction and the jobs themselves can be compared
+between changes without any network in the measurement. Usage:
+
+    python benchmarks/profile_replay.py [--issues 200] [--seed 1]
+                                        [--latency 0] [--cassette FILE]
+                                        [--sort cumulative] [--limit 30]
+                                        [--output run.prof]
+
+A run of the live instance is recorded and profiled the same way with
+
+    python jiratools.py --cassette run.cassette
+    python -m cProfile -s cumulative jiratools.py --cassette run.cassette \
+        --cassette-mode replay --cassette-latency 0
+
+"""
+from contextlib import redirect_stdout
+import argparse
+import cProfile
+import importlib
+import io
+import os
+import pstats
+import tempfile
+import time
+
+import fakejira
+import run
+
+
+def record(path, issues=200, users=40, group_size=10, seed=1):
+    """
+    Records a Housekeeping run against a fresh FakeJira into ``path``. The
+    ``secrets`` module keeps pointing at the (stopped) server afterwards, so
+    the cassette can be replayed with the same configuration.
+
+    """
+    dataset = fakejira.Dataset(issues=issues, users=users,
+                               group_size=group_size, seed=seed)
+    with fakejira.FakeJira(dataset) as fake:
+        run.install_secrets(fake)
+        jiratools = importlib.import_module("jiratools")
+        with redirect_stdout(io.StringIO()):
+            housekeeping = jiratools.Housekeeping(
+                options={"cassette": path, "cassette_mode": "record"})
+        housekeeping.jira.close()
+
+
+def replay(path, latency=0.0):
+    """
+    Replays a cassette through Housekeeping under cProfile and returns the
+    profile and the wall time.
+
+    """
+    jiratools = importlib.import_module("jiratools")
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        profile.enable()
+        jiratools.Housekeeping(options={"cassette": path,
+                                        "cassette_mode": "replay",
+                                        "cassette_latency": latency})
+        profile.disable()
+    return profile, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--issues", type=int, default=200)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--group-size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cassette",
+                        help="keep the recording in this file")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="factor applied to the recorded response times")
+    parser.add_argument("--sort", default="cumulative")
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--output", help="also dump the raw profile here")
+    args = parser.parse_args(argv)
+
+    run.install_client()
+    run.skip_reload_delay()
+    path = args.cassette or os.path.join(tempfile.mkdtemp(),
+                                         "housekeeping.cassette")
+    record(path, issues=args.issues, users=args.users,
+           group_size=args.group_size, seed=args.seed)
+    profile, seconds = replay(path, latency=args.latency)
+    print("replayed {} ({} bytes) in {:.3f}s".format(
+        path, os.path.getsize(path), seconds))
+    stats = pstats.Stats(profile).sort_stats(args.sort)
+    stats.print_stats(args.limit)
+    if args.output:
+        stats.dump_stats(args.output)
+
+
+if __name__ == "__main__":
+    main()
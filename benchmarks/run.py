@@ -0,0 +1,215 @@
+"""
+Benchmarks the Jira scripts against a local FakeJira. See README for license
+info.
+
+Runs Housekeeping, MonthlyCount and TimeToTouch against a synthetic dataset
+and reports, per job, the number of requests, bytes sent and received, and
+wall time. Usage:
+
+    python benchmarks/run.py [--issues 200] [--group-size 10] [--latency 0.02]
+                             [--scripts housekeeping,monthlycount,timetotouch]
+                             [--endpoints] [--reload-delay] [--json results.json]
+
+The client under test is the client.py in this repo, installed as
+jira.client the same way it is deployed. jira 2.0.0 sleeps 4 seconds after
+every Resource.update() before reloading it; that sleep is skipped unless
+--reload-delay is given, so the wall times show the cost of the requests.
+
+"""
+from contextlib import redirect_stdout
+import argparse
+import importlib
+import io
+import json
+import os
+import secrets as stdlib_secrets
+import sys
+import time
+import types
+
+import fakejira
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def install_client():
+    """
+    Makes ``from jira.client import JIRA`` resolve to this repo's client.py.
+
+    """
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import jira
+    client = importlib.import_module("client")
+    sys.modules["jira.client"] = client
+    jira.client = client
+
+
+def skip_reload_delay():
+    """
+    Removes the fixed time.sleep(4) in jira.resources.Resource.update().
+
+    """
+    import jira.resources
+    jira.resources.time = types.SimpleNamespace(sleep=lambda seconds: None)
+
+
+def install_secrets(fake):
+    """
+    Installs a ``secrets`` module pointing the scripts at the fake server.
+    It is built on top of the standard library module of the same name, so
+    libraries importing the real one keep working.
+
+    """
+    module = types.ModuleType("secrets")
+    module.__dict__.update(stdlib_secrets.__dict__)
+    filter_ids = dict((key, filter_id) for filter_id, (key, _)
+                      in fake.dataset.filters.items())
+    module.options = {"server": fake.url}
+    module.housekeeping_auth = ("benchmark", "benchmark")
+    module.jira_filters = filter_ids
+    module.ac_label = fakejira.AUTO_CLOSE_LABEL
+    module.monthlySearches = [{"jql": "project = %s" % project, "label": project}
+                              for project in fakejira.PROJECTS]
+    module.time_to_touch_filters = {"Sales-Engineering": filter_ids["time_to_touch"]}
+    sys.modules["secrets"] = module
+
+
+class Meter:
+    """
+    Collects per-job measurements from a FakeJira.
+
+    """
+    def __init__(self, fake):
+        self.fake = fake
+        self.results = []
+
+    def measure(self, name, fn, *args, **kwargs):
+        before = self.fake.snapshot()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.results.append(dict(job=name, seconds=elapsed,
+                                     **_diff(before, self.fake.snapshot())))
+
+
+def _diff(before, after):
+    totals = {"requests": 0, "bytes_in": 0, "bytes_out": 0}
+    endpoints = {}
+    for name, stat in after.items():
+        old = before.get(name, {"requests": 0, "bytes_in": 0, "bytes_out": 0})
+        delta = dict((k, stat[k] - old[k]) for k in totals)
+        if delta["requests"]:
+            endpoints[name] = delta
+            for k in totals:
+                totals[k] += delta[k]
+    totals["endpoints"] = endpoints
+    return totals
+
+
+def run_housekeeping(meter):
+    jiratools = importlib.import_module("jiratools")
+    cls = jiratools.Housekeeping
+    originals = dict((job, getattr(cls, job)) for job in cls.jobs)
+
+    def timed(job, method):
+        def wrapper(self, *args, **kwargs):
+            return meter.measure("housekeeping." + job, method, self,
+                                 *args, **kwargs)
+        return wrapper
+
+    for job, method in originals.items():
+        setattr(cls, job, timed(job, method))
+    try:
+        meter.measure("housekeeping (total)", cls)
+    finally:
+        for job, method in originals.items():
+            setattr(cls, job, method)
+
+
+def run_monthlycount(meter):
+    monthlycount = importlib.import_module("monthlycount")
+    meter.measure("monthlycount", monthlycount.MonthlyCount)
+
+
+def run_timetotouch(meter):
+    timetotouch = importlib.import_module("timetotouch")
+    meter.measure("timetotouch", timetotouch.TimeToTouch)
+
+
+SCRIPTS = {
+    "housekeeping": run_housekeeping,
+    "monthlycount": run_monthlycount,
+    "timetotouch": run_timetotouch,
+    }
+
+
+def run(scripts, issues=200, users=40, group_size=10, latency=0.0, seed=1,
+        reload_delay=False):
+    """
+    Runs the given scripts, each against a fresh FakeJira, and returns the
+    list of per-job results.
+
+    """
+    install_client()
+    if not reload_delay:
+        skip_reload_delay()
+    results = []
+    for script in scripts:
+        dataset = fakejira.Dataset(issues=issues, users=users,
+                                   group_size=group_size, seed=seed)
+        with fakejira.FakeJira(dataset, latency=latency) as fake:
+            install_secrets(fake)
+            meter = Meter(fake)
+            with redirect_stdout(io.StringIO()):
+                SCRIPTS[script](meter)
+            results.extend(meter.results)
+    return results
+
+
+def report(results, endpoints=False):
+    print("%-44s %9s %11s %11s %9s" % ("job", "requests", "bytes in",
+                                       "bytes out", "seconds"))
+    for result in results:
+        print("%-44s %9d %11d %11d %9.3f" % (result["job"], result["requests"],
+                                            result["bytes_in"],
+                                            result["bytes_out"],
+                                            result["seconds"]))
+        if endpoints:
+            for name, stat in sorted(result["endpoints"].items(),
+                                     key=lambda item: -item[1]["requests"]):
+                print("    %-40s %9d %11d %11d" % (name, stat["requests"],
+                                                   stat["bytes_in"],
+                                                   stat["bytes_out"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--scripts", default=",".join(SCRIPTS),
+                        help="comma separated list of %s" % ", ".join(SCRIPTS))
+    parser.add_argument("--issues", type=int, default=200)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--group-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to every request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--endpoints", action="store_true",
+                        help="break each job down per endpoint")
+    parser.add_argument("--reload-delay", action="store_true",
+                        help="keep jira's 4 second sleep after every update")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args.scripts.split(","), issues=args.issues,
+                  users=args.users, group_size=args.group_size,
+                  latency=args.latency, seed=args.seed,
+                  reload_delay=args.reload_delay)
+    report(results, endpoints=args.endpoints)
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump(results, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Request budgets for the Housekeeping jobs. See README for license info.
+
+A JobBudget caps the number of requests and the wall time a job may use.
+Jobs walk their issues through JobBudget.issues(), which stops handing out
+issues once the budget is spent; the remaining issues still match their
+filter and are picked up by the next run.
+
+"""
+import logging
+import threading
+import time
+
+
+class JobBudget:
+    """
+    Request and wall time allowance for a single job run.
+
+    """
+    def __init__(self, job, max_requests=None, max_seconds=None):
+        """
+        Inputs:
+        :job:           name of the job, as used for its instrumentation span
+        :max_requests:  requests the job may make. None for no limit
+        :max_seconds:   seconds the job may run. None for no limit
+
+        """
+        self.job = job
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.requests = 0
+        self.processed = 0
+        self.deferred = 0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def track(self, instrumentation):
+        """
+        Context manager that counts the job's requests while it runs.
+
+        """
+        return _Tracking(self, instrumentation)
+
+    def count(self, event):
+        """
+        Post-request hook counting the requests made for this job.
+
+        """
+        if event["job"] == self.job:
+            with self._lock:
+                self.requests += 1
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def exhausted(self):
+        """
+        True once either limit has been reached.
+
+        """
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            return True
+        if self.max_seconds is not None and self.elapsed >= self.max_seconds:
+            return True
+        return False
+
+    def issues(self, issues):
+        """
+        Yields issues until the budget is exhausted. Issues that were not
+        handed out are counted as deferred to the next run.
+
+        """
+        remaining = iter(issues)
+        for issue in remaining:
+            if self.exhausted:
+                self.deferred += 1 + sum(1 for _ in remaining)
+                logging.warning(
+                    "%s: budget exhausted after %d requests in %.1fs, "
+                    "deferring %d issues to the next run",
+                    self.job, self.requests, self.elapsed, self.deferred)
+                return
+            self.processed += 1
+            yield issue
+
+    def report(self):
+        """
+        Returns a one line summary of consumed versus allowed budget.
+
+        """
+        return "{:<32} {:>8} {:>10} {:>9.1f} {:>9} {:>9} {:>8}".format(
+            self.job,
+            self.requests,
+            "-" if self.max_requests is None else self.max_requests,
+            self.elapsed,
+            "-" if self.max_seconds is None else self.max_seconds,
+            self.processed,
+            self.deferred)
+
+    @staticmethod
+    def report_header():
+        return "{:<32} {:>8} {:>10} {:>9} {:>9} {:>9} {:>8}".format(
+            "job", "requests", "allowed", "seconds", "allowed", "processed",
+            "deferred")
+
+
+class _Tracking:
+    def __init__(self, budget, instrumentation):
+        self.budget = budget
+        self.instrumentation = instrumentation
+
+    def __enter__(self):
+        self.budget.started = time.time()
+        self.instrumentation.add_hook(post=self.budget.count)
+        return self.budget
+
+    def __exit__(self, *exc_info):
+        self.budget.finished = time.time()
+        self.instrumentation.remove_hook(post=self.budget.count)
@@ -11,9 +11,6 @@ at: https://jira.readthedocs.io/en/latest/
 from functools import lru_cache
 from functools import wraps
 
-import imghdr
-import mimetypes
-
 from collections.abc import Iterable
 import copy
 import json
@@ -22,15 +19,22 @@ import os
 import re
 
 
+import base64
 import calendar
 import datetime
-import hashlib
+import gzip
+import mmap
 from numbers import Number
 import requests
 import sys
+import threading
 import time
+import uuid
 import warnings
 
+from requests.adapters import BaseAdapter
+from requests.adapters import HTTPAdapter
+from requests.models import Response
 from requests.utils import get_netrc_auth
 from urllib.parse import urlparse
 
@@ -74,22 +78,68 @@ from jira.resources import Worklog
 
 from jira import __version__
 from jira.utils import CaseInsensitiveDict
-from jira.utils import json_loads
 from jira.utils import threaded_requests
-from pkg_resources import parse_version
 
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional and rarely needed modules (MIME sniffing, JWT, Kerberos, OAuth,
+# version checks, multipart uploads) are imported by the methods that use
+# them, so short-lived scripts don't pay for them at startup.
+
+
+def _multipart_encoder():
+    """Return requests_toolbelt's MultipartEncoder, or None when it is not installed."""
+    try:
+        # noinspection PyUnresolvedReferences
+        from requests_toolbelt import MultipartEncoder
+    except ImportError:
+        return None
+    return MultipartEncoder
+
 
-try:
-    # noinspection PyUnresolvedReferences
-    from requests_toolbelt import MultipartEncoder
-except ImportError:
-    pass
+# JSON decoders tried in order by set_json_backend(); the first one installed wins
+JSON_BACKENDS = ("orjson", "ujson", "json")
+json_backend = None
+_json_decode = json.loads
 
-try:
-    from requests_jwt import JWTAuth
-except ImportError:
-    pass
+
+def set_json_backend(name=None):
+    """Select the module used to decode response bodies.
+
+    :param name: one of :py:data:`JSON_BACKENDS`, or None for the fastest one installed
+    :type name: Optional[str]
+    :return: the name of the backend in use
+    :rtype: str
+    """
+    global json_backend, _json_decode
+    for candidate in (name,) if name else JSON_BACKENDS:
+        try:
+            module = __import__(candidate)
+        except ImportError:
+            if name:
+                raise
+            continue
+        json_backend, _json_decode = candidate, module.loads
+        return json_backend
+
+
+set_json_backend()
+
+
+def json_loads(r):
+    """Decode the JSON body of a response with the selected backend.
+
+    Same contract as :py:func:`jira.utils.json_loads`: errors are raised as
+    :py:exc:`JIRAError` and an empty body decodes to ``{}``. The raw bytes are
+    handed to the backend, which skips building an intermediate ``str`` for
+    multi-megabyte search pages.
+    """
+    raise_on_error(r)
+    content = r.content
+    if not content:
+        return {}
+    return _json_decode(content)
 
 
 logging.getLogger("jira").addHandler(logging.NullHandler())
@@ -128,6 +178,30 @@ def _field_worker(fields=None, **fieldargs):
     return {"fields": fieldargs}
 
 
+def _jql_quote(value):
+    """Return ``value`` as a JQL string literal."""
+    return '"{}"'.format(str(value).replace("\\", "\\\\").replace('"', '\\"'))
+
+
+def _jql_and(jql_str, clause):
+    """Return ``jql_str`` narrowed by ``clause``, keeping its ORDER BY clause last."""
+    parts = re.split(r"\s+ORDER\s+BY\s+", jql_str, maxsplit=1, flags=re.I)
+    where = "({}) AND ".format(parts[0].strip()) if parts[0].strip() else ""
+    narrowed = "{}({})".format(where, clause)
+    if len(parts) > 1:
+        narrowed = "{} ORDER BY {}".format(narrowed, parts[1])
+    return narrowed
+
+
+def _field_value(raw):
+    """Return what a JQL clause compares a field's JSON value with, e.g. a user's accountId."""
+    if isinstance(raw, dict):
+        for key in ("accountId", "name", "value", "key", "id"):
+            if key in raw:
+                return raw[key]
+    return raw
+
+
 class ResultList(list):
     def __init__(
         self, iterable=None, _startAt=0, _maxResults=0, _total=0, _isLast=None
@@ -164,6 +238,18 @@ class ResultList(list):
             return self.iterable[self.current - 1]
 
 
+class GroupMembers(OrderedDict):
+    """Members of a group keyed (and ordered) by accountId.
+
+    Behaves like the ``OrderedDict`` returned before, with the account ids also
+    exposed as a frozenset for cheap membership tests and set algebra.
+    """
+
+    def __init__(self, items=()):
+        super(GroupMembers, self).__init__(items)
+        self.account_ids = frozenset(self)
+
+
 class QshGenerator(object):
     def __init__(self, context_path):
         self.context_path = context_path
@@ -185,6 +271,8 @@ class QshGenerator(object):
             "query": query,
         }
 
+        import hashlib
+
         return hashlib.sha256(qsh.encode("utf-8")).hexdigest()
 
 
@@ -237,6 +325,1240 @@ class JiraCookieAuth(AuthBase):
         self._get_session(self.__auth)
 
 
+class HTTPCache(object):
+    """Size-bounded LRU store of GET responses, with an optional disk tier.
+
+    Entries are keyed on the request URL (query string included) and the user
+    the request is made as, so users never share entries, and keep the
+    ``ETag``/``Last-Modified`` validators so a stale entry can be revalidated
+    with a conditional request instead of being downloaded again. When
+    ``directory`` is set every entry is also written to disk, so a fresh process
+    starts with a warm cache; the least recently used files are pruned once the
+    directory holds more than ``max_disk_bytes``.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, directory=None, max_age=0,
+                 max_disk_bytes=256 * 1024 * 1024):
+        """
+        :param max_bytes: upper bound for the bodies held in memory
+        :type max_bytes: int
+        :param directory: optional directory for the disk tier
+        :type directory: Optional[str]
+        :param max_age: seconds an entry is served without revalidation (Default: 0)
+        :type max_age: int
+        :param max_disk_bytes: upper bound for the files of the disk tier
+        :type max_disk_bytes: int
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_age = max_age
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(request, identity=None):
+        """Return the cache key for a prepared request.
+
+        :param identity: the user the request is made as. Defaults to the
+            ``Authorization`` header. Session cookies are never part of the key,
+            since Jira rotates them.
+        """
+        import hashlib
+
+        credentials = identity or request.headers.get("Authorization", "")
+        return hashlib.sha256(
+            ("%s %s %s" % (request.method, request.url, credentials)).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key):
+        """Return the entry stored under ``key`` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        """Store ``entry`` (a dict) under ``key`` in memory and on disk."""
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def discard(self, key):
+        """Drop the entry stored under ``key``, if any."""
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous["content"])
+        if self.directory:
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def touch(self, key, entry, headers):
+        """Refresh an entry after the server answered 304 Not Modified."""
+        entry["stored"] = time.time()
+        for header in ("ETag", "Last-Modified"):
+            if header in headers:
+                entry[header.lower()] = headers[header]
+        self._write_disk(key, entry)
+
+    def is_fresh(self, entry):
+        if entry.get("no-cache"):
+            return False
+        return time.time() - entry["stored"] < self.max_age
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remember(self, key, entry):
+        size = len(entry["content"])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous["content"])
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted["content"])
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".json", base + ".body"
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path) as meta_file:
+                entry = json.load(meta_file)
+            with open(body_path, "rb") as body_file:
+                entry["content"] = body_file.read()
+            # the modification time orders the files for pruning
+            os.utime(meta_path)
+        except (IOError, ValueError):
+            return None
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.directory:
+            return
+        meta_path, body_path = self._paths(key)
+        meta = dict((k, v) for k, v in entry.items() if k != "content")
+        try:
+            with open(body_path + ".tmp", "wb") as body_file:
+                body_file.write(entry["content"])
+            os.replace(body_path + ".tmp", body_path)
+            with open(meta_path + ".tmp", "w") as meta_file:
+                json.dump(meta, meta_file)
+            os.replace(meta_path + ".tmp", meta_path)
+        except IOError as e:
+            logging.warning("Unable to write HTTP cache entry %s: %s" % (key, e))
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete the least recently used entries until the disk tier fits ``max_disk_bytes``."""
+        entries = {}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            key, _, kind = name.partition(".")
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            size, used = entries.get(key, (0, 0))
+            used = stat.st_mtime if kind == "json" else used
+            entries[key] = (size + stat.st_size, used)
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_disk_bytes:
+                break
+            with self._lock:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._size -= len(previous["content"])
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+
+class CachingAdapter(BaseAdapter):
+    """Transport adapter that answers GETs for slowly changing resources from an :py:class:`HTTPCache`.
+
+    Only URLs whose path matches one of ``patterns`` are cached. The cache belongs to
+    one user, so ``Cache-Control: private`` responses are kept; ``no-store`` ones are
+    not, unless ``ignore_no_store`` is set, and ``no-cache`` ones are revalidated on
+    every use. Stock Jira marks all of its REST responses ``no-cache, no-store``, so
+    against it the cache only keeps anything with ``ignore_no_store``. Stored entries
+    are revalidated with ``If-None-Match``/``If-Modified-Since`` and a 304 answer is
+    turned back into the cached 200 response, so callers never see the difference.
+    """
+
+    # headers that belong to the session of the response, not to the resource
+    SKIPPED_HEADERS = ("Set-Cookie",)
+
+    def __init__(self, cache, patterns, adapter=None, identity=None, ignore_no_store=False):
+        """
+        :param cache: the store to use
+        :type cache: HTTPCache
+        :param patterns: regular expressions matched against the URL path
+        :type patterns: Iterable[str]
+        :param adapter: the adapter that performs the real requests (Default: HTTPAdapter())
+        :type adapter: Optional[BaseAdapter]
+        :param identity: the user the requests are made as, see :py:meth:`HTTPCache.key`
+        :type identity: Optional[str]
+        :param ignore_no_store: store responses marked ``no-store`` as well
+        :type ignore_no_store: bool
+        """
+        super(CachingAdapter, self).__init__()
+        self.cache = cache
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.adapter = adapter or HTTPAdapter()
+        self.identity = identity
+        self.ignore_no_store = ignore_no_store
+
+    def cacheable(self, request):
+        if request.method != "GET":
+            return False
+        path = urlparse(request.url).path
+        return any(pattern.search(path) for pattern in self.patterns)
+
+    def send(self, request, **kwargs):
+        if not self.cacheable(request):
+            return self.adapter.send(request, **kwargs)
+
+        key = self.cache.key(request, self.identity)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                self.cache.hits += 1
+                return self._build_response(request, entry)
+            if entry.get("etag"):
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry.get("last-modified"):
+                request.headers["If-Modified-Since"] = entry["last-modified"]
+
+        response = self.adapter.send(request, **kwargs)
+        if entry is not None and response.status_code == 304:
+            self.cache.revalidated += 1
+            self.cache.touch(key, entry, response.headers)
+            response.close()
+            return self._build_response(request, entry)
+
+        self.cache.misses += 1
+        directives = self.directives(response)
+        if "no-store" in directives and not self.ignore_no_store:
+            if entry is not None:
+                self.cache.discard(key)
+            return response
+        has_validator = "ETag" in response.headers or "Last-Modified" in response.headers
+        no_cache = "no-cache" in directives
+        if response.status_code == 200 and (has_validator or (self.cache.max_age and not no_cache)):
+            self.cache.put(
+                key,
+                {
+                    "url": request.url,
+                    "stored": time.time(),
+                    "etag": response.headers.get("ETag"),
+                    "last-modified": response.headers.get("Last-Modified"),
+                    "no-cache": no_cache,
+                    "headers": self._stored_headers(response.headers),
+                    "encoding": response.encoding,
+                    "content": response.content,
+                },
+            )
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+    @staticmethod
+    def directives(response):
+        """Return the names of the ``Cache-Control`` directives of ``response``."""
+        return set(
+            directive.split("=", 1)[0].strip().lower()
+            for directive in response.headers.get("Cache-Control", "").split(",")
+        )
+
+    @classmethod
+    def _stored_headers(cls, headers):
+        skipped = [name.lower() for name in cls.SKIPPED_HEADERS]
+        return dict((name, value) for name, value in headers.items() if name.lower() not in skipped)
+
+    @classmethod
+    def _build_response(cls, request, entry):
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = requests.structures.CaseInsensitiveDict(cls._stored_headers(entry["headers"]))
+        response.encoding = entry["encoding"]
+        response._content = entry["content"]
+        response.url = request.url
+        response.request = request
+        response.from_cache = True
+        return response
+
+
+class Cassette(object):
+    """Requests and responses of a run, kept for replaying it offline.
+
+    Interactions are stored as gzipped JSON lines holding the method, URL, a
+    digest of the request body, the response status, headers and body and the
+    time the server took to answer. Replaying matches requests on method, URL
+    and body digest; a request made several times is answered with its
+    recordings in order, the last one repeating once they run out.
+    """
+
+    # response headers that are never written to a cassette
+    SKIPPED_HEADERS = ("Set-Cookie",)
+
+    def __init__(self, path, interactions=None):
+        """
+        :param path: file the cassette is saved to and loaded from
+        :type path: str
+        """
+        self.path = path
+        self.interactions = list(interactions or [])
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._tape = None
+
+    @classmethod
+    def load(cls, path):
+        """Read a cassette written by :py:meth:`save`."""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return cls(path, (json.loads(line) for line in f if line.strip()))
+
+    def save(self):
+        """Write the recorded interactions to :py:attr:`path`."""
+        with self._lock:
+            interactions = list(self.interactions)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            for interaction in interactions:
+                f.write(json.dumps(interaction, sort_keys=True) + "\n")
+
+    @staticmethod
+    def key(method, url, body):
+        import hashlib
+
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest() if body else None
+        return method, url, digest
+
+    def record(self, request, response):
+        """Add a request and the response it got."""
+        content = response.content or b""
+        try:
+            body = {"text": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            body = {"base64": base64.b64encode(content).decode("ascii")}
+        method, url, digest = self.key(request.method, request.url, request.body)
+        interaction = dict(
+            body,
+            method=method,
+            url=url,
+            body_sha1=digest,
+            status=response.status_code,
+            reason=response.reason,
+            headers=dict(
+                (name, value)
+                for name, value in response.headers.items()
+                if name not in self.SKIPPED_HEADERS
+            ),
+            elapsed=response.elapsed.total_seconds(),
+        )
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def play(self, request):
+        """Return the next recorded interaction for a request, or None."""
+        key = self.key(request.method, request.url, request.body)
+        with self._lock:
+            if self._tape is None:
+                self._tape = {}
+                for interaction in self.interactions:
+                    self._tape.setdefault(
+                        (interaction["method"], interaction["url"], interaction["body_sha1"]), []
+                    ).append(interaction)
+            recordings = self._tape.get(key)
+            if not recordings:
+                self.misses += 1
+                return None
+            return recordings.pop(0) if len(recordings) > 1 else recordings[0]
+
+
+class CassetteAdapter(BaseAdapter):
+    """Transport adapter that records to or replays from a :py:class:`Cassette`.
+
+    In ``record`` mode requests go to the server through ``adapter`` and every
+    response is added to the cassette, which is saved when the adapter is
+    closed. In ``replay`` mode nothing is sent: responses come from the
+    cassette, after sleeping for the recorded server time multiplied by
+    ``latency`` (``1`` for the original timing, ``0`` for none).
+    """
+
+    def __init__(self, cassette, mode="replay", latency=1.0, adapter=None):
+        """
+        :param cassette: the cassette to record to or replay from
+        :type cassette: Cassette
+        :param mode: ``record`` or ``replay``
+        :type mode: str
+        :param latency: factor applied to the recorded server time when replaying
+        :type latency: float
+        :param adapter: the adapter that performs the real requests when recording (Default: HTTPAdapter())
+        :type adapter: Optional[BaseAdapter]
+        """
+        super(CassetteAdapter, self).__init__()
+        if mode not in ("record", "replay"):
+            raise ValueError("Unknown cassette mode %r" % mode)
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+        self.adapter = adapter or HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        if self.mode == "record":
+            response = self.adapter.send(request, **kwargs)
+            self.cassette.record(request, response)
+            return response
+
+        interaction = self.cassette.play(request)
+        if interaction is None:
+            raise JIRAError(
+                "No recorded response for %s %s" % (request.method, request.url),
+                url=request.url,
+            )
+        if self.latency:
+            time.sleep(interaction["elapsed"] * self.latency)
+        return self._build_response(request, interaction)
+
+    def close(self):
+        if self.mode == "record":
+            self.cassette.save()
+        self.adapter.close()
+
+    @staticmethod
+    def _build_response(request, interaction):
+        response = Response()
+        response.status_code = interaction["status"]
+        response.reason = interaction["reason"]
+        response.headers = requests.structures.CaseInsensitiveDict(interaction["headers"])
+        if "base64" in interaction:
+            response._content = base64.b64decode(interaction["base64"])
+        else:
+            response._content = interaction["text"].encode("utf-8")
+        response.encoding = "utf-8" if "text" in interaction else None
+        response.elapsed = datetime.timedelta(seconds=interaction["elapsed"])
+        response.url = request.url
+        response.request = request
+        return response
+
+
+class SingleFlight(object):
+    """Coalesces identical calls that are in flight at the same time.
+
+    The first caller for a key runs the function; callers arriving with the same
+    key before it returns wait for it and receive the same result (or exception)
+    instead of issuing a duplicate request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event()}
+            else:
+                self.coalesced += 1
+        if not leader:
+            call["done"].wait()
+        else:
+            try:
+                call["result"] = fn()
+            except Exception as e:
+                call["error"] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call["done"].set()
+        if "error" in call:
+            raise call["error"]
+        return call["result"]
+
+
+class Instrumentation(object):
+    """Dispatches an event for every HTTP request the client makes.
+
+    Hooks registered with :py:meth:`add_hook` receive a dict describing the
+    request: ``method``, ``url``, ``path`` (the REST path with ids collapsed,
+    e.g. ``issue/{id}/watchers``), ``job``, ``status``, ``elapsed`` (seconds),
+    ``bytes_in``, ``bytes_out``, ``retries`` and ``error``. ``pre`` hooks are
+    called before the request is sent (without the response fields), ``post``
+    hooks once it finished, and ``span`` hooks with ``(job, seconds)`` when a
+    :py:meth:`span` closes.
+    """
+
+    REST_PREFIX = re.compile(r"^.*?/rest/(api|agile|greenhopper)/[^/]+/")
+    ID_SEGMENT = re.compile(r"^([A-Z][A-Z0-9_]*-\d+|\d+)$")
+
+    def __init__(self):
+        self.pre_hooks = []
+        self.post_hooks = []
+        self.span_hooks = []
+        self._local = threading.local()
+
+    def add_hook(self, pre=None, post=None, span=None):
+        """Register callables for the pre-request, post-request and span events."""
+        if pre is not None:
+            self.pre_hooks.append(pre)
+        if post is not None:
+            self.post_hooks.append(post)
+        if span is not None:
+            self.span_hooks.append(span)
+
+    def remove_hook(self, pre=None, post=None, span=None):
+        """Unregister callables added with :py:meth:`add_hook`."""
+        for hooks, hook in (
+            (self.pre_hooks, pre),
+            (self.post_hooks, post),
+            (self.span_hooks, span),
+        ):
+            if hook is not None and hook in hooks:
+                hooks.remove(hook)
+
+    def span(self, job):
+        """Context manager attributing the requests made by this thread to ``job``."""
+        return _Span(self, job)
+
+    def wrap(self, fn):
+        """Return ``fn`` bound to the current job, for running it in another thread."""
+        job = self.current_job
+
+        def wrapper(*args, **kwargs):
+            self._enter(job)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._local.jobs.pop()
+
+        return wrapper
+
+    @property
+    def current_job(self):
+        stack = getattr(self._local, "jobs", None)
+        return stack[-1] if stack else None
+
+    @classmethod
+    def path_template(cls, url):
+        path = urlparse(url).path
+        match = cls.REST_PREFIX.match(path)
+        if match:
+            path = path[match.end():]
+        return "/".join(
+            "{id}" if cls.ID_SEGMENT.match(part) else part
+            for part in path.strip("/").split("/")
+        )
+
+    def start(self, method, url, kwargs):
+        data = kwargs.get("data")
+        event = {
+            "method": method,
+            "url": url,
+            "path": self.path_template(url),
+            "job": self.current_job,
+            "bytes_out": _body_size(data),
+            "attempts": 0,
+            "started": time.time(),
+        }
+        for hook in self.pre_hooks:
+            hook(event)
+        return event
+
+    def finish(self, event, response=None, error=None, stream=False):
+        event["elapsed"] = time.time() - event.pop("started")
+        event["retries"] = max(event.pop("attempts") - 1, 0)
+        event["error"] = error
+        event["status"] = response.status_code if response is not None else None
+        if response is None:
+            event["bytes_in"] = 0
+        elif stream:
+            event["bytes_in"] = int(response.headers.get("Content-Length") or 0)
+        else:
+            event["bytes_in"] = len(response.content or b"")
+        for hook in self.post_hooks:
+            hook(event)
+
+    def _enter(self, job):
+        if not hasattr(self._local, "jobs"):
+            self._local.jobs = []
+        self._local.jobs.append(job)
+
+    def _exit(self, job, seconds):
+        self._local.jobs.pop()
+        for hook in self.span_hooks:
+            hook(job, seconds)
+
+
+class _Span(object):
+    def __init__(self, instrumentation, job):
+        self.instrumentation = instrumentation
+        self.job = job
+
+    def __enter__(self):
+        self.started = time.time()
+        self.instrumentation._enter(self.job)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.instrumentation._exit(self.job, time.time() - self.started)
+
+
+def _body_size(data):
+    if data is None:
+        return 0
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    if isinstance(data, bytes):
+        return len(data)
+    size = getattr(data, "len", None)
+    if size is None and hasattr(data, "__len__"):
+        size = len(data)
+    return size or 0
+
+
+class EndpointHistogram(object):
+    """Aggregates request events per method and path template.
+
+    Keeps request/error/retry counts, bytes and a latency histogram for every
+    endpoint. Attach it with :py:meth:`register`.
+    """
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, float("inf"))
+
+    def __init__(self):
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def register(self, instrumentation):
+        instrumentation.add_hook(post=self)
+        return self
+
+    def __call__(self, event):
+        key = "%s %s" % (event["method"], event["path"])
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = {
+                    "requests": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "bytes_in": 0,
+                    "bytes_out": 0,
+                    "seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "buckets": [0] * len(self.BUCKETS),
+                }
+            stats["requests"] += 1
+            stats["errors"] += int(event["error"] is not None)
+            stats["retries"] += event["retries"]
+            stats["bytes_in"] += event["bytes_in"]
+            stats["bytes_out"] += event["bytes_out"]
+            stats["seconds"] += event["elapsed"]
+            stats["max_seconds"] = max(stats["max_seconds"], event["elapsed"])
+            for i, bound in enumerate(self.BUCKETS):
+                if event["elapsed"] <= bound:
+                    stats["buckets"][i] += 1
+                    break
+
+    def report(self):
+        """Return the histogram as text, busiest endpoint first."""
+        lines = [
+            "%-45s %8s %6s %7s %11s %11s %9s %9s"
+            % ("endpoint", "requests", "errors", "retries", "bytes in", "bytes out", "avg s", "max s")
+        ]
+        for key, stats in sorted(
+            self.endpoints.items(), key=lambda item: -item[1]["requests"]
+        ):
+            lines.append(
+                "%-45s %8d %6d %7d %11d %11d %9.3f %9.3f"
+                % (
+                    key,
+                    stats["requests"],
+                    stats["errors"],
+                    stats["retries"],
+                    stats["bytes_in"],
+                    stats["bytes_out"],
+                    stats["seconds"] / stats["requests"],
+                    stats["max_seconds"],
+                )
+            )
+        return "\n".join(lines)
+
+
+class JobBreakdown(object):
+    """Aggregates request events and wall time per :py:meth:`Instrumentation.span` job.
+
+    Requests made outside of any span are attributed to ``None``.
+    """
+
+    def __init__(self):
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, instrumentation):
+        instrumentation.add_hook(post=self, span=self.span_finished)
+        return self
+
+    def _stats(self, job):
+        stats = self.jobs.get(job)
+        if stats is None:
+            stats = self.jobs[job] = {
+                "requests": 0,
+                "errors": 0,
+                "retries": 0,
+                "bytes_in": 0,
+                "bytes_out": 0,
+                "request_seconds": 0.0,
+                "wall_seconds": 0.0,
+                "endpoints": {},
+            }
+        return stats
+
+    def __call__(self, event):
+        with self._lock:
+            stats = self._stats(event["job"])
+            stats["requests"] += 1
+            stats["errors"] += int(event["error"] is not None)
+            stats["retries"] += event["retries"]
+            stats["bytes_in"] += event["bytes_in"]
+            stats["bytes_out"] += event["bytes_out"]
+            stats["request_seconds"] += event["elapsed"]
+            key = "%s %s" % (event["method"], event["path"])
+            stats["endpoints"][key] = stats["endpoints"].get(key, 0) + 1
+
+    def span_finished(self, job, seconds):
+        with self._lock:
+            self._stats(job)["wall_seconds"] += seconds
+
+    def report(self):
+        """Return the per-job totals as text."""
+        lines = [
+            "%-32s %8s %7s %11s %11s %9s"
+            % ("job", "requests", "retries", "bytes in", "bytes out", "wall s")
+        ]
+        for job, stats in self.jobs.items():
+            lines.append(
+                "%-32s %8d %7d %11d %11d %9.3f"
+                % (
+                    job or "(outside jobs)",
+                    stats["requests"],
+                    stats["retries"],
+                    stats["bytes_in"],
+                    stats["bytes_out"],
+                    stats["wall_seconds"],
+                )
+            )
+        return "\n".join(lines)
+
+
+# ResilientSession keeps its retry decision (backoff included) name-mangled;
+# the alias lets JiraSession call it, and fails at import if it goes away
+ResilientSession._recoverable = ResilientSession._ResilientSession__recoverable
+
+
+class JiraSession(ResilientSession):
+    """:py:class:`ResilientSession` that reports every call to an :py:class:`Instrumentation`.
+
+    A call through one of the verb methods is reported once, with the number of
+    retries ResilientSession needed; requests sent through ``request()``
+    directly are reported individually. When ``plan`` is set to a
+    :py:class:`WritePlan`, writes are recorded in it instead of being sent.
+    """
+
+    def __init__(self, timeout=None, instrumentation=None, plan=None):
+        super(JiraSession, self).__init__(timeout=timeout)
+        self.instrumentation = instrumentation
+        self.plan = plan
+        self._calls = threading.local()
+
+    def _call(self, method, verb, url, **kwargs):
+        if self.instrumentation is None or getattr(self._calls, "event", None):
+            return verb(self, url, **kwargs)
+        event = self.instrumentation.start(method, url, kwargs)
+        self._calls.event = event
+        try:
+            response = verb(self, url, **kwargs)
+        except Exception as e:
+            self._calls.event = None
+            self.instrumentation.finish(event, response=getattr(e, "response", None), error=e)
+            raise
+        self._calls.event = None
+        self.instrumentation.finish(event, response, stream=kwargs.get("stream", False))
+        return response
+
+    def get(self, url, **kwargs):
+        return self._call("GET", ResilientSession.get, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._call("POST", ResilientSession.post, url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self._call("PUT", ResilientSession.put, url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._call("DELETE", ResilientSession.delete, url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self._call("HEAD", ResilientSession.head, url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self._call("PATCH", ResilientSession.patch, url, **kwargs)
+
+    def options(self, url, **kwargs):
+        return self._call("OPTIONS", ResilientSession.options, url, **kwargs)
+
+    def get_range(self, url, **kwargs):
+        """GET that also accepts ``206 Partial Content`` and ``416 Range Not Satisfiable``.
+
+        ResilientSession only returns a 200 and raises for any other success
+        status, so resumed downloads go through here. 502, 503, 504 and
+        connection errors are retried with the same backoff as the other verbs.
+        """
+        return self._call("GET", JiraSession._get_range, url, **kwargs)
+
+    def _get_range(self, url, **kwargs):
+        retry_number = 0
+        while True:
+            response = exception = None
+            try:
+                response = requests.Session.get(self, url, timeout=self.timeout, **kwargs)
+                if response.status_code in (200, 206, 416):
+                    return response
+            except requests.exceptions.ConnectionError as e:
+                exception = e
+            retry_number += 1
+            if retry_number > self.max_retries or not self._recoverable(
+                response if response is not None else exception, url, "GET", retry_number
+            ):
+                break
+            if response is not None:
+                response.close()
+        if exception is not None:
+            raise exception
+        raise_on_error(response, verb="GET")
+        return response
+
+    def request(self, method, url, **kwargs):
+        event = getattr(self._calls, "event", None)
+        if event is not None:
+            event["attempts"] += 1
+            return self._send(method, url, **kwargs)
+        if self.instrumentation is None:
+            return self._send(method, url, **kwargs)
+        verb = lambda session, url, **kw: session._send(method, url, **kw)
+        return self._call(method.upper(), verb, url, **kwargs)
+
+    def _send(self, method, url, **kwargs):
+        if self.plan is not None:
+            if self.plan.is_write(method, url):
+                job = self.instrumentation.current_job if self.instrumentation else None
+                return self.plan.record(method, url, kwargs, job=job)
+            response = self.plan.read(url)
+            if response is not None:
+                return response
+        return super(JiraSession, self).request(method, url, **kwargs)
+
+
+class WritePlan(object):
+    """Writes captured instead of sent while the client runs in dry-run mode.
+
+    Reads still go to the server. Every other request is recorded as an entry
+    with its method, URL and payload and answered with an empty success
+    response; creating an issue returns a placeholder key (``DRYRUN-1``,
+    ``DRYRUN-2``, ...) that later reads and writes can refer to. The plan can be
+    written to and read from a JSON lines file with :py:meth:`dump` and
+    :py:meth:`load`, and sent with :py:meth:`replay`.
+
+    Reads do not see the planned writes (other than the issues the plan
+    creates), so code that decides on what it reads after writing plans
+    differently than it would act in a real run. A plan is a preview of the
+    writes, not a recording of a run.
+    """
+
+    PLACEHOLDER = "DRYRUN-%d"
+    PLACEHOLDER_RE = re.compile(r"DRYRUN-\d+")
+    ISSUE_RE = re.compile(r"/issue/([^/?]+)")
+    # empty answers to reads of the sub-resources of a placeholder issue, by
+    # the path that follows the placeholder
+    EMPTY_READS = (
+        (re.compile(r"^/transitions$"), lambda url: {"transitions": []}),
+        (re.compile(r"^/watchers$"), lambda url: {
+            "self": url, "isWatching": False, "watchCount": 0, "watchers": []}),
+        (re.compile(r"^/comment$"), lambda url: {
+            "startAt": 0, "maxResults": 0, "total": 0, "comments": []}),
+        (re.compile(r"^/worklog$"), lambda url: {
+            "startAt": 0, "maxResults": 0, "total": 0, "worklogs": []}),
+        (re.compile(r"^/votes$"), lambda url: {
+            "self": url, "votes": 0, "hasVoted": False, "voters": []}),
+        (re.compile(r"^/remotelink$"), lambda url: []),
+        (re.compile(r"^/editmeta$"), lambda url: {"fields": {}}),
+    )
+    # POSTs that only read
+    READ_ONLY_POSTS = (re.compile(r"/search$"), re.compile(r"/auth/\d+/session$"))
+
+    def __init__(self, entries=None):
+        self.entries = list(entries or [])
+        self.created = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def is_write(self, method, url):
+        """Return True if a request would change something on the server."""
+        method = method.upper()
+        if method in ("GET", "HEAD", "OPTIONS"):
+            return False
+        if method == "POST":
+            path = urlparse(url).path
+            return not any(pattern.search(path) for pattern in self.READ_ONLY_POSTS)
+        return True
+
+    def record(self, method, url, kwargs, job=None):
+        """Add a write to the plan and return the response standing in for it."""
+        entry = {"method": method.upper(), "url": url, "job": job}
+        if kwargs.get("params"):
+            entry["params"] = kwargs["params"]
+        data = kwargs.get("json")
+        if data is None:
+            data = kwargs.get("data")
+        if kwargs.get("files") or not isinstance(
+            data, (str, bytes, dict, list, type(None))
+        ):
+            entry["payload"] = None
+            entry["note"] = "binary body not captured"
+        else:
+            entry["payload"] = _decode_payload(data)
+        body = None
+        with self._lock:
+            entry["seq"] = len(self.entries) + 1
+            entry["issue"] = self._issue_of(entry)
+            if entry["method"] == "POST" and urlparse(url).path.endswith("/issue"):
+                key = self.PLACEHOLDER % (len(self.created) + 1)
+                body = {"id": key, "key": key, "self": url + "/" + key}
+                self.created[key] = dict(body, fields=dict(
+                    (entry["payload"] or {}).get("fields", {})
+                ))
+                entry["issue"] = entry["creates"] = key
+            elif entry["method"] == "PUT" and entry["issue"] in self.created:
+                fields = (entry["payload"] or {}).get("fields", {})
+                self.created[entry["issue"]]["fields"].update(fields)
+            self.entries.append(entry)
+        return _plan_response(url, body)
+
+    def read(self, url):
+        """Return a response for a read of a placeholder issue, or None.
+
+        The issue itself is answered with what the plan created, and its
+        sub-resources listed in ``EMPTY_READS`` with an empty payload of the
+        right shape. Other reads raise a :py:exc:`JIRAError`, since the issue
+        does not exist on the server.
+        """
+        path = urlparse(url).path
+        match = self.PLACEHOLDER_RE.search(path)
+        if match is None:
+            return None
+        rest = path[match.end():].rstrip("/")
+        with self._lock:
+            raw = self.created.get(match.group(0))
+        if raw is not None and not rest:
+            return _plan_response(url, copy.deepcopy(raw))
+        for pattern, empty in self.EMPTY_READS:
+            if pattern.match(rest):
+                return _plan_response(url, empty(url))
+        raise JIRAError(
+            status_code=404,
+            text="Dry run: %s is planned, not created, so %s cannot be read"
+            % (match.group(0), rest or "it"),
+            url=url,
+        )
+
+    def _issue_of(self, entry):
+        # writes to an issue created by the plan belong with its creation
+        placeholder = self.PLACEHOLDER_RE.search(
+            entry["url"] + json.dumps(entry["payload"], default=str)
+        )
+        if placeholder:
+            return placeholder.group(0)
+        match = self.ISSUE_RE.search(urlparse(entry["url"]).path)
+        return match.group(1) if match else None
+
+    def dump(self, path):
+        """Write the plan to ``path``, one JSON object per line."""
+        with open(path, "w") as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry, sort_keys=True) + "\n")
+
+    @classmethod
+    def load(cls, path):
+        """Read a plan written by :py:meth:`dump`."""
+        with open(path) as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def groups(self):
+        """Return the entries grouped by issue, in plan order.
+
+        Writes to the same issue keep their relative order; writes that do not
+        belong to an issue each form their own group.
+        """
+        groups = OrderedDict()
+        for entry in self.entries:
+            key = entry.get("issue") or ("seq", entry["seq"])
+            groups.setdefault(key, []).append(entry)
+        return list(groups.values())
+
+    def replay(self, jira, workers=None):
+        """Send the plan through ``jira``, which must not be in dry-run mode.
+
+        The groups from :py:meth:`groups` are sent concurrently, each group in
+        order. When a write fails, the rest of its group is skipped since it
+        may depend on it. Placeholder keys are replaced by the keys of the
+        issues created during the replay.
+
+        :param jira: the client to send the writes with
+        :param workers: number of groups sent at the same time (Default: the
+            client's ``async_workers`` option)
+        :return: a list of ``(entry, response, error)`` tuples in plan order;
+            skipped entries have neither a response nor an error
+        """
+        if getattr(jira._session, "plan", None) is not None:
+            raise JIRAError("Cannot replay a plan through a dry-run client")
+        keys = {}
+        results = {}
+
+        def send(group):
+            for i, entry in enumerate(group):
+                if entry.get("payload") is None and entry.get("note"):
+                    logging.warning("Skipping #%d %s %s: %s", entry["seq"],
+                                    entry["method"], entry["url"], entry["note"])
+                    results[entry["seq"]] = (entry, None, None)
+                    continue
+                url, payload = self._substitute(keys, entry)
+                kwargs = {"params": entry.get("params")}
+                if payload is not None:
+                    kwargs["data"] = json.dumps(payload)
+                try:
+                    r = getattr(jira._session, entry["method"].lower())(url, **kwargs)
+                except Exception as e:
+                    logging.error("Replaying #%d %s %s failed: %s", entry["seq"],
+                                  entry["method"], url, e)
+                    results[entry["seq"]] = (entry, None, e)
+                    for skipped in group[i + 1:]:
+                        results[skipped["seq"]] = (skipped, None, None)
+                    return
+                if entry.get("creates"):
+                    keys[entry["creates"]] = json_loads(r)["key"]
+                results[entry["seq"]] = (entry, r, None)
+
+        groups = self.groups()
+        workers = workers or jira._options["async_workers"]
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(groups) or 1))) as executor:
+            list(executor.map(jira.instrumentation.wrap(send), groups))
+        return [results[entry["seq"]] for entry in self.entries]
+
+    def _substitute(self, keys, entry):
+        if not keys:
+            return entry["url"], entry.get("payload")
+        replace = lambda text: self.PLACEHOLDER_RE.sub(
+            lambda m: keys.get(m.group(0), m.group(0)), text
+        )
+        payload = entry.get("payload")
+        if payload is not None:
+            payload = json.loads(replace(json.dumps(payload)))
+        return replace(entry["url"]), payload
+
+
+class MultipartFileBody(object):
+    """A ``multipart/form-data`` request body holding one file, read from a buffer without copying it.
+
+    ``buffer`` is anything supporting the buffer protocol, typically an
+    :py:class:`mmap.mmap` of the file, so the file is paged in by the OS as
+    the request is sent instead of being read into memory. The body has a
+    length, so requests sends it with a ``Content-Length`` header, in chunks of
+    whatever size the connection reads. :py:meth:`close` must be called before
+    the buffer is closed.
+    """
+
+    def __init__(self, buffer, filename, field="file", content_type="application/octet-stream", boundary=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        filename = filename.replace('"', "%22")
+        head = (
+            '--%s\r\nContent-Disposition: form-data; name="%s"; filename="%s"\r\n'
+            "Content-Type: %s\r\n\r\n" % (self.boundary, field, filename, content_type)
+        ).encode("utf-8")
+        tail = ("\r\n--%s--\r\n" % self.boundary).encode("ascii")
+        self._parts = [memoryview(head), memoryview(buffer), memoryview(tail)]
+        self.len = sum(part.nbytes for part in self._parts)
+        self._part = 0
+        self._offset = 0
+
+    @property
+    def content_type(self):
+        return "multipart/form-data; boundary=%s" % self.boundary
+
+    def __len__(self):
+        return self.len
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.len
+        chunks = []
+        while size > 0 and self._part < len(self._parts):
+            part = self._parts[self._part]
+            chunk = part[self._offset : self._offset + size]
+            chunks.append(chunk.tobytes())
+            size -= chunk.nbytes
+            self._offset += chunk.nbytes
+            if self._offset >= part.nbytes:
+                self._part += 1
+                self._offset = 0
+        return b"".join(chunks)
+
+    def close(self):
+        """Release the buffer."""
+        for part in self._parts:
+            part.release()
+        self._parts = []
+
+
+class UploadReport(list):
+    """Results of :py:meth:`JIRA.add_attachments`, in the order the uploads were given.
+
+    Each item is the :py:class:`Attachment` created, or the exception the upload
+    failed with.
+    """
+
+    def __init__(self, results=(), bytes_sent=0, seconds=0.0):
+        list.__init__(self, results)
+        self.bytes = bytes_sent
+        self.seconds = seconds
+
+    @property
+    def failed(self):
+        return [result for result in self if isinstance(result, Exception)]
+
+    @property
+    def throughput(self):
+        """Bytes uploaded per second."""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return "%d of %d files, %.1f MB in %.2fs (%.1f MB/s)" % (
+            len(self) - len(self.failed),
+            len(self),
+            self.bytes / 1e6,
+            self.seconds,
+            self.throughput / 1e6,
+        )
+
+
+class DownloadReport(UploadReport):
+    """Results of :py:meth:`JIRA.download_attachments`.
+
+    Each item is the path an attachment was saved to, or the exception its
+    download failed with. ``skipped`` lists the paths that were already
+    complete and not downloaded again.
+    """
+
+    def __init__(self, results=(), bytes_sent=0, seconds=0.0, skipped=()):
+        UploadReport.__init__(self, results, bytes_sent=bytes_sent, seconds=seconds)
+        self.skipped = list(skipped)
+
+    def __str__(self):
+        return "%s, %d already present" % (
+            UploadReport.__str__(self),
+            len(self.skipped),
+        )
+
+
+def _response_size(response):
+    """Size of the whole file a (possibly partial) response is part of, or None."""
+    content_range = response.headers.get("Content-Range", "")
+    if response.status_code == 206 and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and not response.headers.get("Content-Encoding"):
+        return int(length)
+    return None
+
+
+def _backup_state(progress):
+    """Percentage done and file size from a :py:meth:`JIRA.backup_progress` result."""
+    match = re.search(r"\s([0-9]+)\s", (progress or {}).get("alternativePercentage") or "")
+    size = (progress or {}).get("size") or "0"
+    return (int(match.group(1)) if match else 0), (int(size) if str(size).isdigit() else 0)
+
+
+def _decode_payload(data):
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    if isinstance(data, str):
+        try:
+            return json.loads(data)
+        except ValueError:
+            return data
+    return data
+
+
+def _plan_response(url, body):
+    response = Response()
+    response.url = url
+    if body is None:
+        response.status_code = 204
+        response._content = b""
+    else:
+        response.status_code = 200
+        response._content = json.dumps(body).encode("utf-8")
+        response.headers["Content-Type"] = "application/json"
+    response.encoding = "utf-8"
+    return response
+
+
 class JIRA(object):
     """User interface to JIRA.
 
@@ -271,6 +1593,22 @@ class JIRA(object):
         * client_cert -- a tuple of (cert,key) for the requests library for client side SSL
         * check_update -- Check whether using the newest python-jira library version.
         * cookies -- A dict of custom cookies that are sent in all requests to the server.
+        * http_cache -- Cache GETs of slowly changing resources and revalidate them with ETag/Last-Modified.
+          Either ``True`` or an :py:class:`HTTPCache` instance. Defaults to ``False``.
+        * http_cache_dir -- Directory for the disk tier of the HTTP cache. Defaults to ``None`` (memory only).
+        * http_cache_size -- Bytes of response bodies the HTTP cache keeps in memory. Defaults to 32 MiB.
+        * http_cache_max_age -- Seconds a cached response is used without revalidation. Defaults to ``0``.
+        * http_cache_dir_size -- Bytes of files the disk tier of the HTTP cache keeps. Defaults to 256 MiB.
+        * http_cache_ignore_no_store -- Cache responses marked ``Cache-Control: no-store`` too. Jira marks
+          every REST response that way, so without it the HTTP cache keeps nothing from a stock Jira.
+          Entries are never shared between users. Defaults to ``False``.
+        * cassette -- Path of a :py:class:`Cassette` to record the requests to or replay them from.
+          Defaults to ``None``.
+        * cassette_mode -- ``record`` or ``replay``. Defaults to ``replay``.
+        * cassette_latency -- Factor applied to the recorded server time when replaying; ``0`` answers
+          immediately. Defaults to ``1``.
+        * dry_run -- Record writes in a :py:class:`WritePlan` (``write_plan``) instead of sending them.
+          Either ``True`` or a :py:class:`WritePlan` instance. Defaults to ``False``.
 
     :param basic_auth: A tuple of username and password to use when establishing a session via HTTP BASIC
         authentication.
@@ -322,6 +1660,16 @@ class JIRA(object):
         "async_workers": 5,
         "client_cert": None,
         "check_update": False,
+        "http_cache": False,
+        "http_cache_dir": None,
+        "http_cache_size": 32 * 1024 * 1024,
+        "http_cache_max_age": 0,
+        "http_cache_dir_size": 256 * 1024 * 1024,
+        "http_cache_ignore_no_store": False,
+        "cassette": None,
+        "cassette_mode": "replay",
+        "cassette_latency": 1.0,
+        "dry_run": False,
         # amount of seconds to wait for loading a resource after updating it
         # used to avoid server side caching issues, used to be 4 seconds.
         "delay_reload": 0,
@@ -338,6 +1686,17 @@ class JIRA(object):
 
     checked_version = False
 
+    # REST resources that change rarely enough to be served by the HTTP cache
+    CACHEABLE_PATHS = (
+        r"/filter/\d+$",
+        r"/group$",
+        r"/issuetype$",
+        r"/field$",
+        r"/serverInfo$",
+        r"/issueLinkType$",
+        r"/project(/[^/]+)?$",
+    )
+
     # TODO(ssbarnea): remove these two variables and use the ones defined in resources
     JIRA_BASE_URL = Resource.JIRA_BASE_URL
     AGILE_BASE_URL = GreenHopperResource.AGILE_BASE_URL
@@ -459,6 +1818,8 @@ class JIRA(object):
         self._options.update(options)
 
         self._rank = None
+        self._inflight = SingleFlight()
+        self.instrumentation = Instrumentation()
 
         # Rip off trailing slash since all urls depend on that
         if self._options["server"].endswith("/"):
@@ -468,7 +1829,10 @@ class JIRA(object):
         if len(context_path) > 0:
             self._options["context_path"] = context_path
 
-        self._try_magic()
+        # everything in front of the path, resolved once from the options
+        self._url_prefixes = {}
+        for base in (self.JIRA_BASE_URL, self.AGILE_BASE_URL):
+            self._get_url("", base=base)
 
         if oauth:
             self._create_oauth_session(oauth, timeout)
@@ -486,7 +1850,7 @@ class JIRA(object):
             )  # always log in for cookie based auth, as we need a first request to be logged in
         else:
             verify = self._options["verify"]
-            self._session = ResilientSession(timeout=timeout)
+            self._session = JiraSession(timeout=timeout)
             self._session.verify = verify
         self._session.headers.update(self._options["headers"])
 
@@ -494,10 +1858,36 @@ class JIRA(object):
             self._session.cookies.update(self._options["cookies"])
 
         self._session.max_retries = max_retries
+        self._session.instrumentation = self.instrumentation
 
         if proxies:
             self._session.proxies = proxies
 
+        if self._options["cassette"]:
+            self._install_cassette()
+        if self._options["http_cache"]:
+            # OAuth and JWT sign every request, so the Authorization header
+            # cannot tell whose responses are cached
+            if basic_auth:
+                identity = "basic:%s" % basic_auth[0]
+            elif auth:
+                identity = "cookie:%s" % auth[0]
+            elif oauth:
+                identity = "oauth:%s:%s" % (oauth["consumer_key"], oauth["access_token"])
+            elif jwt:
+                identity = "jwt:%s" % jwt["secret"]
+            elif "cookies" in self._options:
+                identity = "cookies:%s" % sorted(self._options["cookies"].items())
+            else:
+                identity = None
+            self._install_http_cache(identity)
+
+        self.write_plan = None
+        if self._options["dry_run"]:
+            plan = self._options["dry_run"]
+            self.write_plan = plan if isinstance(plan, WritePlan) else WritePlan()
+            self._session.plan = self.write_plan
+
         self.auth = auth
         if validate:
             # This will raise an Exception if you are not allowed to login.
@@ -533,13 +1923,56 @@ class JIRA(object):
                     self._fields[name] = f["id"]
 
     def _create_cookie_auth(self, auth, timeout):
-        self._session = ResilientSession(timeout=timeout)
+        self._session = JiraSession(timeout=timeout)
         self._session.auth = JiraCookieAuth(self._session, self.session, auth)
         self._session.verify = self._options["verify"]
         self._session.cert = self._options["client_cert"]
 
+    def _install_http_cache(self, identity=None):
+        """Mount a :py:class:`CachingAdapter` for the server on the session.
+
+        :param identity: the user the cached responses belong to
+        """
+        cache = self._options["http_cache"]
+        if not isinstance(cache, HTTPCache):
+            cache = HTTPCache(
+                max_bytes=self._options["http_cache_size"],
+                directory=self._options["http_cache_dir"],
+                max_age=self._options["http_cache_max_age"],
+                max_disk_bytes=self._options["http_cache_dir_size"],
+            )
+        self._http_cache = cache
+        server = self._options["server"]
+        self._session.mount(
+            server,
+            CachingAdapter(
+                cache,
+                self.CACHEABLE_PATHS,
+                adapter=self._session.get_adapter(server),
+                identity=identity,
+                ignore_no_store=self._options["http_cache_ignore_no_store"],
+            ),
+        )
+
+    def _install_cassette(self):
+        """Mount a :py:class:`CassetteAdapter` for the server on the session."""
+        path = self._options["cassette"]
+        mode = self._options["cassette_mode"]
+        if mode == "replay":
+            self.cassette = Cassette.load(path)
+        else:
+            self.cassette = Cassette(path)
+        self._session.mount(
+            self._options["server"],
+            CassetteAdapter(
+                self.cassette, mode=mode, latency=self._options["cassette_latency"]
+            ),
+        )
+
     def _check_update_(self):
         """Check if the current version of the library is outdated."""
+        from pkg_resources import parse_version
+
         try:
             data = requests.get(
                 "https://pypi.python.org/pypi/jira/json", timeout=2.001
@@ -877,14 +2310,15 @@ class JIRA(object):
         if not fname:
             fname = os.path.basename(attachment.name)
 
-        if "MultipartEncoder" not in globals():
+        MultipartEncoder = _multipart_encoder()
+        if MultipartEncoder is None:
             method = "old"
             r = self._session.post(
                 url,
                 files={"file": (fname, attachment, "application/octet-stream")},
-                headers=CaseInsensitiveDict(
-                    {"content-type": None, "X-Atlassian-Token": "nocheck"}
-                ),
+                # jira.utils.CaseInsensitiveDict fails on Python 3.8+; the
+                # session merges these case-insensitively anyway
+                headers={"content-type": None, "X-Atlassian-Token": "nocheck"},
             )
         else:
             method = "MultipartEncoder"
@@ -902,9 +2336,7 @@ class JIRA(object):
             r = self._session.post(
                 url,
                 data=m,
-                headers=CaseInsensitiveDict(
-                    {"content-type": m.content_type, "X-Atlassian-Token": "nocheck"}
-                ),
+                headers={"content-type": m.content_type, "X-Atlassian-Token": "nocheck"},
                 retry_data=file_stream,
             )
 
@@ -919,6 +2351,231 @@ class JIRA(object):
             )
         return attachment
 
+    def add_attachments(self, uploads, workers=None):
+        """Attach many files to issues, several at a time.
+
+        Each file is memory-mapped and streamed to the server, so the memory
+        used does not grow with the size of the files. A failed upload does not
+        stop the others; its exception takes its place in the report.
+
+        :param uploads: ``(issue, path)`` or ``(issue, path, filename)`` tuples. ``filename`` defaults
+            to the base name of ``path``.
+        :type uploads: Iterable[Tuple]
+        :param workers: Number of files uploaded at the same time (Default: the
+            ``async_workers`` option)
+        :type workers: Optional[int]
+        :rtype: UploadReport
+        """
+        uploads = [tuple(upload) + (None,) * (3 - len(upload)) for upload in uploads]
+        if not uploads:
+            return UploadReport()
+        sent = []
+
+        def upload(item):
+            issue, path, filename = item
+            if isinstance(issue, (Issue, Project)):
+                issue = issue.key
+            try:
+                with open(path, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    # empty files cannot be mapped
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+                    try:
+                        attachment = self._post_attachment(
+                            issue, buffer, filename or os.path.basename(path)
+                        )
+                    finally:
+                        if size:
+                            buffer.close()
+            except Exception as e:
+                logging.warning("Attaching %s to %s failed: %s", path, issue, e)
+                return e
+            sent.append(size)
+            return attachment
+
+        started = time.time()
+        workers = min(len(uploads), workers or self._options["async_workers"])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(self.instrumentation.wrap(upload), uploads))
+        report = UploadReport(results, bytes_sent=sum(sent), seconds=time.time() - started)
+        logging.info("Uploaded %s", report)
+        return report
+
+    def download_attachments(self, issues, dest_dir, workers=None, chunk_size=1024 * 1024):
+        """Download every attachment of some issues, several at a time.
+
+        Attachments are saved as ``dest_dir/<issue key>/<filename>``; when an issue
+        has two attachments with the same name, their IDs are put in front of the
+        names. Bodies are streamed to disk in ``chunk_size`` chunks. Files already
+        present with the attachment's size are skipped, and partial files left by an
+        interrupted run are resumed with an HTTP Range request. Jira does not
+        publish attachment checksums, so the size is all a file is checked against.
+        Issues that cannot be read and failed downloads are reported, in that order
+        at the start of the report, without stopping the other downloads.
+
+        :param issues: Issue keys or Issue resources
+        :type issues: Iterable[Union[str, Issue]]
+        :param dest_dir: Directory to save the attachments in
+        :type dest_dir: str
+        :param workers: Number of downloads run at the same time (Default: the
+            ``async_workers`` option)
+        :type workers: Optional[int]
+        :param chunk_size: Bytes read from the response and written at a time
+        :type chunk_size: int
+        :rtype: DownloadReport
+        """
+        keys = [issue.key if isinstance(issue, Issue) else issue for issue in issues]
+        if not keys:
+            return DownloadReport()
+        workers = workers or self._options["async_workers"]
+        started = time.time()
+
+        def listing(key):
+            try:
+                js = self._get_json("issue/" + key, params={"fields": "attachment"})
+            except JIRAError as e:
+                logging.warning("Listing the attachments of %s failed: %s", key, e.text)
+                return e
+            return js["fields"].get("attachment") or []
+
+        with ThreadPoolExecutor(max_workers=min(len(keys), workers)) as executor:
+            listings = list(executor.map(self.instrumentation.wrap(listing), keys))
+
+        downloads = []
+        failed = [listing for listing in listings if isinstance(listing, Exception)]
+        for key, attachments in zip(keys, listings):
+            if isinstance(attachments, Exception):
+                continue
+            names = [os.path.basename(a["filename"].replace("\\", "/")) or a["id"] for a in attachments]
+            for attachment, name in zip(attachments, names):
+                if names.count(name) > 1:
+                    name = "%s-%s" % (attachment["id"], name)
+                path = os.path.join(dest_dir, key, name)
+                downloads.append((attachment, path))
+        if not downloads:
+            return DownloadReport(failed, seconds=time.time() - started)
+
+        received = []
+        skipped = []
+
+        def download(item):
+            attachment, path = item
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                written = self._download_to_file(
+                    attachment["content"], path, size=attachment.get("size"), chunk_size=chunk_size
+                )
+            except Exception as e:
+                logging.warning("Downloading %s failed: %s", attachment["content"], e)
+                return e
+            if written is None:
+                skipped.append(path)
+            else:
+                received.append(written)
+            return path
+
+        with ThreadPoolExecutor(max_workers=min(len(downloads), workers)) as executor:
+            results = list(executor.map(self.instrumentation.wrap(download), downloads))
+        report = DownloadReport(
+            failed + results, bytes_sent=sum(received), seconds=time.time() - started, skipped=skipped
+        )
+        logging.info("Downloaded %s", report)
+        return report
+
+    def _download_to_file(
+        self, url, path, size=None, chunk_size=1024 * 1024, progress=None, digest=None, headers=None
+    ):
+        """Stream ``url`` to ``path``, resuming from ``path + ".part"`` when a previous attempt left one.
+
+        :param size: Expected size in bytes. When given, a complete ``path`` is not
+            downloaded again. Otherwise the size the server announces is used.
+            The result is checked against it either way.
+        :param progress: Called as ``progress(bytes_done, bytes_total)`` after every chunk;
+            ``bytes_total`` is None when the size is not known
+        :param digest: A :py:mod:`hashlib` object updated with the whole file,
+            including the part downloaded by a previous attempt
+        :param headers: Extra request headers
+        :return: Bytes received, or None if ``path`` was already complete
+        :rtype: Optional[int]
+        """
+        if size is not None and os.path.isfile(path) and os.path.getsize(path) == size:
+            return None
+        partial = path + ".part"
+        offset = os.path.getsize(partial) if os.path.isfile(partial) else 0
+        if size is not None and offset >= size:
+            offset = 0
+        headers = dict(headers or {})
+        if offset:
+            headers["Range"] = "bytes=%d-" % offset
+        # ResilientSession raises for a 206, so the partial content of a
+        # resumed download is fetched with get_range, which keeps its retries
+        r = self._session.get_range(url, headers=headers, stream=True)
+        written = 0
+        try:
+            if r.status_code == 416:
+                # nothing past the offset: the part holds the whole file unless
+                # the server reports another length for it
+                total = r.headers.get("Content-Range", "").rpartition("/")[2]
+                if not offset or (total.isdigit() and int(total) != offset):
+                    if offset:
+                        os.remove(partial)
+                    raise JIRAError(status_code=416, text="Range not satisfiable for %s" % path, url=url)
+            # a server that ignores the Range header sends the whole file again
+            resumed = r.status_code in (206, 416)
+            if size is None:
+                size = offset if r.status_code == 416 else _response_size(r)
+            done = offset if resumed else 0
+            if resumed and digest is not None:
+                with open(partial, "rb") as f:
+                    for block in iter(lambda: f.read(chunk_size), b""):
+                        digest.update(block)
+            if r.status_code == 416 and progress is not None:
+                progress(done, size)
+            if r.status_code != 416:
+                with open(partial, "ab" if resumed else "wb") as f:
+                    for chunk in r.iter_content(chunk_size):
+                        f.write(chunk)
+                        if digest is not None:
+                            digest.update(chunk)
+                        written += len(chunk)
+                        done += len(chunk)
+                        if progress is not None:
+                            progress(done, size)
+        finally:
+            r.close()
+        if size is not None and os.path.getsize(partial) != size:
+            raise JIRAError(
+                "Downloaded %d of %d bytes" % (os.path.getsize(partial), size), url=url
+            )
+        os.replace(partial, path)
+        return written
+
+    def _post_attachment(self, issue, buffer, filename):
+        url = self._get_url("issue/" + str(issue) + "/attachments")
+        bodies = []
+
+        def body():
+            # a retry sends a fresh body with the boundary already in the headers
+            boundary = bodies[0].boundary if bodies else None
+            bodies.append(MultipartFileBody(buffer, filename, boundary=boundary))
+            return bodies[-1]
+
+        try:
+            data = body()
+            r = self._session.post(
+                url,
+                data=data,
+                headers={"content-type": data.content_type, "X-Atlassian-Token": "nocheck"},
+                retry_data=body,
+            )
+        finally:
+            for data in bodies:
+                data.close()
+        js = json_loads(r)
+        if not js or not isinstance(js, Iterable):
+            raise JIRAError("Unable to parse JSON: %s" % js)
+        return Attachment(self._options, self._session, js[0])
+
     def delete_attachment(self, id):
         """Delete attachment by id.
 
@@ -1183,6 +2840,7 @@ class JIRA(object):
 
         :param group: Name of the group.
         :type group: str
+        :rtype: GroupMembers
         """
         if self._version < (6, 0, 0):
             raise NotImplementedError(
@@ -1193,20 +2851,34 @@ class JIRA(object):
         r = self._get_json("group", params=params)
         size = r["users"]["size"]
         end_index = r["users"]["end-index"]
+        items = r["users"]["items"]
+        page = max(1, len(items))
+
+        # the first page tells us the group size and page size, so the
+        # remaining windows can be requested concurrently. Each window moves
+        # on from the end-index Jira returns, in case it sent fewer users
+        # than were asked for.
+        def fetch(start):
+            stop = min(start + page, size)
+            users = []
+            while start < stop:
+                params = {"groupname": group, "expand": "users[%s:%s]" % (start, stop - 1)}
+                window = self._get_json("group", params=params)["users"]
+                users.extend(window["items"])
+                if window["end-index"] < start:
+                    break
+                start = window["end-index"] + 1
+            return users
 
-        while end_index < size - 1:
-            params = {
-                "groupname": group,
-                "expand": "users[%s:%s]" % (end_index + 1, end_index + 50),
-            }
-            r2 = self._get_json("group", params=params)
-            for user in r2["users"]["items"]:
-                r["users"]["items"].append(user)
-            end_index = r2["users"]["end-index"]
-            size = r["users"]["size"]
+        starts = list(range(end_index + 1, size, page))
+        if starts:
+            workers = min(len(starts), self._options["async_workers"])
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for users in executor.map(self.instrumentation.wrap(fetch), starts):
+                    items.extend(users)
 
         result = {}
-        for user in r["users"]["items"]:
+        for user in items:
             """
             result[user["key"]] = {
                 "name": user["name"],
@@ -1219,7 +2891,7 @@ class JIRA(object):
                'fullname': user['displayName'],
                'email': user.get('emailAddress', 'hidden'),
                'active': user['active']}
-        return OrderedDict(sorted(result.items(), key=lambda t: t[0]))
+        return GroupMembers(sorted(result.items(), key=lambda t: t[0]))
 
     def add_group(self, groupname):
         """Create a new group in JIRA.
@@ -1942,6 +3614,86 @@ class JIRA(object):
         result = self._session.delete(url, params=params)
         return result
 
+    def add_watchers(self, issues, account_ids, current=None, workers=None):
+        """Add users to the watchers of one or more issues, several requests at a time.
+
+        Users already watching an issue are not added again. A user that cannot
+        be added does not stop the others; the exception is returned as the result
+        for that user and issue.
+
+        :param issues: An issue (ID, key or Issue) or a list of them
+        :param account_ids: accountIds of the users to add
+        :type account_ids: Iterable[str]
+        :param current: accountIds already known to be watching, by issue key. The
+            watchers of issues not in it are read from the server first.
+        :type current: Optional[Dict[str, Iterable[str]]]
+        :param workers: Number of requests sent at the same time (Default: the
+            ``async_workers`` option)
+        :type workers: Optional[int]
+        :return: ``True`` for users added, ``False`` for users who were already
+            watching, or the exception, by ``(issue, accountId)``
+        :rtype: OrderedDict
+        """
+        return self._change_watchers("add", issues, account_ids, current, workers)
+
+    def remove_watchers(self, issues, account_ids, current=None, workers=None):
+        """Remove users from the watchers of one or more issues, several requests at a time.
+
+        Users who are not watching an issue are skipped. Otherwise this works like
+        :py:meth:`add_watchers`.
+
+        :return: ``True`` for users removed, ``False`` for users who were not
+            watching, or the exception, by ``(issue, accountId)``
+        :rtype: OrderedDict
+        """
+        return self._change_watchers("remove", issues, account_ids, current, workers)
+
+    def _change_watchers(self, action, issues, account_ids, current, workers):
+        if isinstance(issues, (str, int, Issue)):
+            issues = [issues]
+        keys = [issue.key if isinstance(issue, Issue) else str(issue) for issue in issues]
+        account_ids = [a for a in OrderedDict.fromkeys(account_ids) if a]
+        results = OrderedDict()
+        if not keys or not account_ids:
+            return results
+        workers = workers or self._options["async_workers"]
+        current = dict(current or {})
+
+        def watching(key):
+            js = self._get_json("issue/" + key + "/watchers")
+            return [w.get("accountId") for w in js.get("watchers", [])]
+
+        unknown = [key for key in keys if key not in current]
+        if unknown:
+            with ThreadPoolExecutor(max_workers=min(len(unknown), workers)) as executor:
+                current.update(zip(unknown, executor.map(self.instrumentation.wrap(watching), unknown)))
+
+        changes = []
+        for key in keys:
+            present = set(current[key])
+            for account_id in account_ids:
+                needed = (account_id in present) == (action == "remove")
+                results[(key, account_id)] = needed
+                if needed:
+                    changes.append((key, account_id))
+
+        def change(item):
+            key, account_id = item
+            try:
+                if action == "add":
+                    self.add_watcher(key, account_id)
+                else:
+                    self.remove_watcher(key, account_id)
+            except JIRAError as e:
+                logging.warning("Could not %s watcher %s on %s: %s", action, account_id, key, e.text)
+                return e
+            return True
+
+        if changes:
+            with ThreadPoolExecutor(max_workers=min(len(changes), workers)) as executor:
+                results.update(zip(changes, executor.map(self.instrumentation.wrap(change), changes)))
+        return results
+
     @translate_resource_args
     def worklogs(self, issue):
         """Get a list of worklog Resources from the server for an issue.
@@ -2051,19 +3803,9 @@ class JIRA(object):
         :rtype: Response
         """
         # let's see if we have the right issue link 'type' and fix it if needed
-        issue_link_types = self.issue_link_types()
-
-        if type not in issue_link_types:
-            for lt in issue_link_types:
-                if lt.outward == type:
-                    # we are smart to figure it out what he meant
-                    type = lt.name
-                    break
-                elif lt.inward == type:
-                    # so that's the reverse, so we fix the request
-                    type = lt.name
-                    inwardIssue, outwardIssue = outwardIssue, inwardIssue
-                    break
+        type, inwardIssue, outwardIssue = self._resolve_issue_link_type(
+            type, inwardIssue, outwardIssue
+        )
 
         data = {
             "type": {"name": type},
@@ -2074,6 +3816,60 @@ class JIRA(object):
         url = self._get_url("issueLink")
         return self._session.post(url, data=json.dumps(data))
 
+    def create_issue_links(self, links, workers=None):
+        """Create many links between issues, several at a time.
+
+        A link that cannot be created does not stop the others; its exception
+        takes its place in the result.
+
+        :param links: ``(type, inwardIssue, outwardIssue)`` or
+            ``(type, inwardIssue, outwardIssue, comment)`` tuples, with the
+            arguments of :py:meth:`create_issue_link`
+        :type links: Iterable[Tuple]
+        :param workers: Number of links created at the same time (Default: the
+            ``async_workers`` option)
+        :type workers: Optional[int]
+        :return: The response or the exception for each link, in order
+        :rtype: List[Union[Response, Exception]]
+        """
+        links = [
+            tuple(arg.key if isinstance(arg, Issue) else arg for arg in link)
+            for link in links
+        ]
+        if not links:
+            return []
+        # load the link types once, before the workers need them
+        self.issue_link_types()
+
+        def create(link):
+            try:
+                return self.create_issue_link(*link)
+            except JIRAError as e:
+                logging.warning("Could not link %s to %s: %s", link[1], link[2], e.text)
+                return e
+
+        workers = min(len(links), workers or self._options["async_workers"])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.instrumentation.wrap(create), links))
+
+    def _resolve_issue_link_type(self, type, inwardIssue, outwardIssue):
+        """Turn an inward or outward description of a link type into its name.
+
+        :return: ``(name, inwardIssue, outwardIssue)``, with the issues swapped when
+            ``type`` was the inward description
+        """
+        issue_link_types = self.issue_link_types()
+        if any(lt.name == type for lt in issue_link_types):
+            return type, inwardIssue, outwardIssue
+        for lt in issue_link_types:
+            if lt.outward == type:
+                # we are smart to figure it out what he meant
+                return lt.name, inwardIssue, outwardIssue
+            elif lt.inward == type:
+                # so that's the reverse, so we fix the request
+                return lt.name, outwardIssue, inwardIssue
+        return type, inwardIssue, outwardIssue
+
     def delete_issue_link(self, id):
         """Delete a link between two issues.
 
@@ -2096,7 +3892,7 @@ class JIRA(object):
 
         :rtype: List[IssueLinkType]
         """
-        if not hasattr(self, "self._cached_issue_link_types") or force:
+        if force or not hasattr(self, "_cached_issue_link_types"):
             r_json = self._get_json("issueLinkType")
             self._cached_issue_link_types = [
                 IssueLinkType(self._options, self._session, raw_link_json)
@@ -2178,6 +3974,27 @@ class JIRA(object):
             raise KeyError("Request type '%s' is unknown." % name)
         return request_type
 
+    # Labels
+
+    def labels(self, maxResults=1000):
+        """Get the names of all labels in use on the server.
+
+        :param maxResults: labels requested per page (Default: 1000, the server maximum)
+        :type maxResults: int
+        :rtype: List[str]
+        """
+        labels = []
+        startAt = 0
+        while True:
+            r_json = self._get_json(
+                "label", params={"startAt": startAt, "maxResults": maxResults}
+            )
+            values = r_json.get("values", [])
+            labels.extend(values)
+            if r_json.get("isLast", True) or not values:
+                return labels
+            startAt += len(values)
+
     # User permissions
 
     # non-resource
@@ -2546,6 +4363,89 @@ class JIRA(object):
 
         return issues
 
+    def count(self, jql_str):
+        """Get the number of issues matching a JQL search string, without fetching any of them.
+
+        :param jql_str: The JQL search string.
+        :type jql_str: str
+        :rtype: int
+        """
+        params = {"jql": jql_str, "startAt": 0, "maxResults": 0, "fields": "id"}
+        return self._get_json("search", params=params)["total"]
+
+    def count_by(self, jql_str, field, values, workers=None):
+        """Count the issues matching a JQL search string for each value of a field.
+
+        Reads the field of the matching issues in one search when that takes
+        fewer pages than there are values, and otherwise runs one
+        :meth:`count` per value, several at a time. Issues with none of the
+        values are not counted.
+
+        :param jql_str: The JQL search string.
+        :type jql_str: str
+        :param field: JQL name of the field to group by, e.g. ``assignee``.
+        :type field: str
+        :param values: Values of the field to count. ``None`` counts the issues
+            where the field is empty.
+        :type values: Iterable[Optional[str]]
+        :param workers: Number of counts run at the same time (Default: the
+            ``async_workers`` option)
+        :type workers: Optional[int]
+        :rtype: Dict[Optional[str], int]
+        """
+        values = list(dict.fromkeys(values))
+        if not values:
+            return {}
+        counts = self._tally_by(jql_str, field, values)
+        if counts is not None:
+            return counts
+
+        def count(value):
+            if value is None:
+                return self.count(_jql_and(jql_str, "{} is EMPTY".format(field)))
+            return self.count(_jql_and(jql_str, "{} = {}".format(field, _jql_quote(value))))
+
+        workers = min(len(values), workers or self._options["async_workers"])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            counts = executor.map(self.instrumentation.wrap(count), values)
+            return dict(zip(values, counts))
+
+    def _tally_by(self, jql_str, field, values, page=100):
+        """Count the issues per value from one search returning only ``field``.
+
+        Both decisions are made on the first page, which is needed for the
+        total anyway: the search restricts the issues to the values asked for,
+        so values read from later pages that match none of them are skipped.
+
+        :return: The counts, or ``None`` when the search would take more pages
+            than there are values, or the field values of the first page could
+            not be told apart from the values asked for.
+        """
+        named = [value for value in values if value is not None]
+        predicates = []
+        if named:
+            predicates.append("{} in ({})".format(field, ", ".join(_jql_quote(value) for value in named)))
+        if None in values:
+            predicates.append("{} is EMPTY".format(field))
+        search = _jql_and(jql_str, " OR ".join(predicates))
+        counts = dict.fromkeys(values, 0)
+        start = 0
+        while True:
+            params = {"jql": search, "startAt": start, "maxResults": page, "fields": field}
+            result = self._get_json("search", params=params)
+            issues = result.get("issues", [])
+            found = [_field_value(issue.get("fields", {}).get(field)) for issue in issues]
+            if start == 0:
+                pages = -(-result["total"] // max(1, result.get("maxResults") or page))
+                if pages > len(values) or any(value not in counts for value in found):
+                    return None
+            for value in found:
+                if value in counts:
+                    counts[value] += 1
+            start += len(issues)
+            if not issues or start >= result["total"]:
+                return counts
+
     # Security levels
     def security_level(self, id):
         """Get a security level Resource.
@@ -3025,7 +4925,7 @@ class JIRA(object):
         :rtype: NoReturn
         """
         verify = self._options["verify"]
-        self._session = ResilientSession(timeout=timeout)
+        self._session = JiraSession(timeout=timeout)
         self._session.verify = verify
         self._session.auth = (username, password)
         self._session.cert = self._options["client_cert"]
@@ -3043,7 +4943,7 @@ class JIRA(object):
             resource_owner_key=oauth["access_token"],
             resource_owner_secret=oauth["access_token_secret"],
         )
-        self._session = ResilientSession(timeout)
+        self._session = JiraSession(timeout)
         self._session.verify = verify
         self._session.auth = oauth
 
@@ -3066,7 +4966,7 @@ class JIRA(object):
                 % kerberos_options["mutual_authentication"]
             )
 
-        self._session = ResilientSession(timeout=timeout)
+        self._session = JiraSession(timeout=timeout)
         self._session.verify = verify
         self._session.auth = HTTPKerberosAuth(
             mutual_authentication=mutual_authentication
@@ -3081,10 +4981,11 @@ class JIRA(object):
 
     def _create_jwt_session(self, jwt, timeout):
         try:
-            jwt_auth = JWTAuth(jwt["secret"], alg="HS256")
-        except NameError as e:
+            from requests_jwt import JWTAuth
+        except ImportError:
             logging.error("JWT authentication requires requests_jwt")
-            raise e
+            raise
+        jwt_auth = JWTAuth(jwt["secret"], alg="HS256")
         jwt_auth.set_header_format("JWT %s")
 
         jwt_auth.add_field("iat", lambda req: JIRA._timestamp())
@@ -3094,7 +4995,7 @@ class JIRA(object):
         jwt_auth.add_field("qsh", QshGenerator(self._options["context_path"]))
         for f in jwt["payload"].items():
             jwt_auth.add_field(f[0], f[1])
-        self._session = ResilientSession(timeout=timeout)
+        self._session = JiraSession(timeout=timeout)
         self._session.verify = self._options["verify"]
         self._session.auth = jwt_auth
 
@@ -3105,6 +5006,9 @@ class JIRA(object):
     def _get_url(self, path, base=JIRA_BASE_URL):
         """ Returns the full url based on JIRA base url and the path provided
 
+        The part of ``base`` in front of ``{path}`` is formatted from the options
+        once per client; after that building a URL is a dict lookup and a concatenation.
+
         :param path: The subpath desired.
         :type path: str
         :param base: The base url which should be prepended to the path
@@ -3114,9 +5018,16 @@ class JIRA(object):
         :rtype: str
 
         """
-        options = self._options.copy()
-        options.update({"path": path})
-        return base.format(**options)
+        try:
+            return self._url_prefixes[base] + path
+        except KeyError:
+            pass
+        if not base.endswith("{path}"):
+            options = self._options.copy()
+            options.update({"path": path})
+            return base.format(**options)
+        prefix = self._url_prefixes[base] = base[: -len("{path}")].format(**self._options)
+        return prefix + path
 
     def _get_json(self, path, params=None, base=JIRA_BASE_URL):
         """Get the json for a given path and params.
@@ -3132,7 +5043,9 @@ class JIRA(object):
 
         """
         url = self._get_url(path, base)
-        r = self._session.get(url, params=params)
+        # identical GETs issued concurrently by other threads share one request
+        key = (url, json.dumps(params, sort_keys=True, default=str))
+        r = self._inflight.do(key, lambda: self._session.get(url, params=params))
         try:
             r_json = json_loads(r)
         except ValueError as e:
@@ -3150,6 +5063,17 @@ class JIRA(object):
             raise JIRAError("Unable to find resource %s(%s)", resource_cls, ids)
         return resource
 
+    @property
+    def _magic(self):
+        """libmagic, loaded the first time a MIME type is needed. None when unavailable."""
+        if "_magic" not in self.__dict__:
+            self._try_magic()
+        return self.__dict__["_magic"]
+
+    @_magic.setter
+    def _magic(self, value):
+        self.__dict__["_magic"] = value
+
     def _try_magic(self):
         try:
             import magic
@@ -3182,6 +5106,9 @@ class JIRA(object):
         if self._magic is not None:
             return self._magic.id_buffer(buff)
         else:
+            import imghdr
+            import mimetypes
+
             try:
                 return mimetypes.guess_type("f." + imghdr.what(0, buff))[0]
             except (IOError, TypeError):
@@ -3386,9 +5313,10 @@ class JIRA(object):
             return None
         r = self._session.get(url, headers=self._options["headers"])
         # This is weird.  I used to get xml, but now I'm getting json
-        try:
-            return json.loads(r.text)
-        except Exception:
+        text = r.text.lstrip()
+        if text.startswith("{"):
+            return json.loads(text)
+        else:
             import defusedxml.ElementTree as etree
 
             progress = {}
@@ -3409,40 +5337,118 @@ class JIRA(object):
         if self.deploymentType != "Cloud":
             logging.warning("This functionality is not available in Server version")
             return None
-        status = self.backup_progress()
-        perc_complete = int(
-            re.search(r"\s([0-9]*)\s", status["alternativePercentage"]).group(1)
-        )
-        file_size = int(status["size"])
+        perc_complete, file_size = _backup_state(self.backup_progress())
         return perc_complete >= 100 and file_size > 0
 
-    def backup_download(self, filename=None):
-        """Download backup file from WebDAV (cloud only)."""
+    def wait_for_backup(self, timeout=3600, min_interval=1, max_interval=60, download=True, filename=None, **kwargs):
+        """Wait for the running cloud backup to finish, then download it.
+
+        The progress is polled at intervals adapted to how fast it has been
+        moving: about half the estimated time left, so the end of the backup is
+        seen soon after it happens without polling a slow backup every second.
+        Until there is a rate to go by, the interval doubles from ``min_interval``.
+
+        :param timeout: Seconds to wait before giving up
+        :type timeout: float
+        :param min_interval: Shortest time between two polls, in seconds
+        :type min_interval: float
+        :param max_interval: Longest time between two polls, in seconds
+        :type max_interval: float
+        :param download: Download the backup as soon as it is complete
+        :type download: bool
+        :param filename: Passed to :py:meth:`backup_download`, along with any other keyword arguments
+        :type filename: Optional[str]
+        :return: The downloaded file name when ``download`` is set, otherwise the final
+            :py:meth:`backup_progress`; None when the backup did not finish in time
+        :rtype: Optional[Union[str, Dict[str, str]]]
+        """
+        if self.deploymentType != "Cloud":
+            logging.warning("This functionality is not available in Server version")
+            return None
+        deadline = time.time() + timeout
+        interval = min_interval
+        first = None
+        while True:
+            progress = self.backup_progress()
+            now = time.time()
+            if progress is None:
+                return None
+            percent, size = _backup_state(progress)
+            if percent >= 100 and size > 0:
+                logging.info("Backup %s is complete", progress.get("fileName"))
+                if download:
+                    return self.backup_download(filename, **kwargs)
+                return progress
+            if first is None or percent < first[1]:
+                first = (now, percent)
+            elif percent > first[1]:
+                rate = (percent - first[1]) / (now - first[0])
+                interval = (100 - percent) / rate / 2
+            else:
+                interval *= 2
+            interval = max(min_interval, min(max_interval, interval))
+            if now + interval > deadline:
+                if now >= deadline:
+                    logging.warning("Backup did not finish in %s seconds", timeout)
+                    return None
+                interval = deadline - now
+            logging.debug("Backup at %d%%, polling again in %.1fs", percent, interval)
+            time.sleep(interval)
+
+    def backup_download(self, filename=None, chunk_size=8 * 1024 * 1024, progress=None, checksum=None):
+        """Download backup file from WebDAV (cloud only).
+
+        The file is streamed to ``<filename>.part`` in ``chunk_size`` chunks and
+        renamed once it is complete. A download that was interrupted is resumed
+        from the partial file with an HTTP Range request by the next call.
+
+        :param filename: Local file name (Default: the name of the backup on the server)
+        :type filename: Optional[str]
+        :param chunk_size: Bytes read from the response and written at a time
+        :type chunk_size: int
+        :param progress: Called as ``progress(bytes_done, bytes_total)`` after every chunk;
+            ``bytes_total`` is None when the server does not send the size
+        :type progress: Optional[Callable[[int, Optional[int]], Any]]
+        :param checksum: Name of a :py:mod:`hashlib` algorithm, e.g. ``sha256``. The digest
+            of the file is written next to it as ``<filename>.<checksum>``, in the
+            format ``sha256sum -c`` reads.
+        :type checksum: Optional[str]
+        :return: The local file name, or None if the backup could not be downloaded
+        :rtype: Optional[str]
+        """
         if self.deploymentType != "Cloud":
             logging.warning("This functionality is not available in Server version")
             return None
         remote_file = self.backup_progress()["fileName"]
         local_file = filename or remote_file
         url = self._options["server"] + "/webdav/backupmanager/" + remote_file
+        digest = None
+        if checksum:
+            import hashlib
+
+            digest = hashlib.new(checksum)
         try:
             logging.debug("Writing file to %s" % local_file)
-            with open(local_file, "wb") as file:
-                try:
-                    resp = self._session.get(
-                        url, headers=self._options["headers"], stream=True
-                    )
-                except Exception:
-                    raise JIRAError()
-                if not resp.ok:
-                    logging.error("Something went wrong with download: %s" % resp.text)
-                    raise JIRAError(resp.text)
-                for block in resp.iter_content(1024):
-                    file.write(block)
+            written = self._download_to_file(
+                url,
+                local_file,
+                chunk_size=chunk_size,
+                progress=progress,
+                digest=digest,
+                headers=self._options["headers"],
+            )
         except JIRAError as je:
             logging.error("Unable to access remote backup file: %s" % je)
+            return None
         except IOError as ioe:
             logging.error(ioe)
-        return None
+            return None
+        logging.info("Downloaded %d bytes of %s to %s", written, remote_file, local_file)
+        if digest is not None:
+            with open("%s.%s" % (local_file, checksum), "w") as f:
+                f.write("%s  %s\n" % (digest.hexdigest(), os.path.basename(local_file)))
+            logging.info("%s %s: %s", checksum, local_file, digest.hexdigest())
+        return local_file
 
     def current_user(self, field="key"):
         """Returns the username or emailAddress of the current user. For anonymous
@@ -0,0 +1,276 @@
+"""
+Long running Housekeeping. See README for license info.
+
+Instead of a cron job starting a new process for every run, the daemon keeps
+one Housekeeping instance, with its authenticated client and what it has
+read (server info, fields, group members, labels, filters, transitions), and
+runs each job every settings.job_intervals seconds. The caches are refreshed
+every settings.daemon_refresh_seconds. GET /health answers 200 while every
+job's last run succeeded and none is overdue, 503 otherwise, with the state
+of each job as JSON; GET /metrics gives the same counters and the request
+statistics per job in the Prometheus text format. With --webhook-port the
+daemon also runs the webhook receiver (webhook.py) on the same instance.
+Usage:
+
+    python daemon.py [--port 8086] [--webhook-port 8085 [--token TOKEN]]
+
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import logging
+import threading
+import time
+
+from jiratools import Housekeeping
+import settings
+
+
+class Scheduler:
+    """
+    Runs the jobs of a Housekeeping instance on their intervals and keeps the
+    state of their last runs.
+
+    """
+    def __init__(self, housekeeping, intervals=None, refresh_seconds=None):
+        """
+        Inputs:
+        :housekeeping:      Housekeeping(run=False) to run the jobs with
+        :intervals:         seconds between runs per job, with a "default".
+                            Defaults to settings.job_intervals
+        :refresh_seconds:   seconds between Housekeeping.refresh() calls.
+                            Defaults to settings.daemon_refresh_seconds
+
+        """
+        self.housekeeping = housekeeping
+        self.intervals = intervals or settings.job_intervals
+        self.refresh_seconds = (settings.daemon_refresh_seconds
+                                if refresh_seconds is None else refresh_seconds)
+        self.started = time.time()
+        self.refreshed = self.started
+        # every job is due right away, so the first cycle is a full run
+        self.jobs = dict((job, {"runs": 0, "failures": 0, "next_run": self.started,
+                                "last_started": None, "last_seconds": None,
+                                "last_error": None, "processed": 0,
+                                "deferred": 0, "failed_issues": 0})
+                         for job in housekeeping.jobs)
+        self._stopped = threading.Event()
+
+    def interval(self, job):
+        return self.intervals.get(job, self.intervals["default"])
+
+    def run_pending(self):
+        """
+        Runs the jobs that are due, in the order of Housekeeping.jobs.
+        Returns: seconds until the next job is due
+
+        """
+        if time.time() - self.refreshed >= self.refresh_seconds:
+            self.housekeeping.refresh()
+            self.refreshed = time.time()
+        for job in self.housekeeping.jobs:
+            if self._stopped.is_set():
+                break
+            if self.jobs[job]["next_run"] <= time.time():
+                self.run(job)
+        return max(0.0, min(state["next_run"] for state in self.jobs.values())
+                   - time.time())
+
+    def run(self, job):
+        """
+        Runs a job once over all its issues and records the outcome. A job
+        that fails is logged and tried again at its next interval.
+
+        """
+        state = self.jobs[job]
+        housekeeping = self.housekeeping
+        state["last_started"] = time.time()
+        # changes made outside this client since the last job
+        if housekeeping.mirror:
+            housekeeping.mirror.dirty = True
+        with housekeeping.lock:
+            try:
+                housekeeping.run_job(job)
+            except Exception as e:
+                state["failures"] += 1
+                state["last_error"] = "{}: {}".format(type(e).__name__, e)
+                logging.exception("daemon: %s failed", job)
+            else:
+                state["last_error"] = None
+            finally:
+                state["runs"] += 1
+                state["last_seconds"] = time.time() - state["last_started"]
+                state["next_run"] = state["last_started"] + self.interval(job)
+                budget = housekeeping.budgets[-1] if housekeeping.budgets else None
+                executor = (housekeeping.executors[-1]
+                            if housekeeping.executors else None)
+                if budget is not None and budget.job == job:
+                    state["processed"] += budget.processed
+                    state["deferred"] += budget.deferred
+                if executor is not None and executor.job == job:
+                    state["failed_issues"] += executor.failed
+                # a long running process keeps no per-run history
+                del housekeeping.budgets[:]
+                del housekeeping.executors[:]
+        logging.info("daemon: %s ran in %.1fs, next in %ds", job,
+                     state["last_seconds"], self.interval(job))
+
+    def run_forever(self):
+        while not self._stopped.is_set():
+            self._stopped.wait(self.run_pending())
+
+    def stop(self):
+        self._stopped.set()
+
+    def health(self):
+        """
+        Returns (healthy, dict of the daemon and job states). Unhealthy when
+        a job's last run failed or a job is overdue by more than an interval.
+
+        """
+        now = time.time()
+        problems = []
+        for job, state in self.jobs.items():
+            if state["last_error"]:
+                problems.append("{} failed: {}".format(job, state["last_error"]))
+            elif now - state["next_run"] > self.interval(job):
+                problems.append("{} is overdue".format(job))
+        return not problems, {
+            "status": "ok" if not problems else "failing",
+            "problems": problems,
+            "uptime": now - self.started,
+            "jobs": self.jobs,
+            }
+
+    def metrics(self):
+        """
+        Returns the job states and the request statistics of the client per
+        job in the Prometheus text format.
+
+        """
+        lines = []
+
+        def add(name, kind, help_text, samples):
+            lines.append("# HELP housekeeping_{} {}".format(name, help_text))
+            lines.append("# TYPE housekeeping_{} {}".format(name, kind))
+            for job, value in samples:
+                lines.append('housekeeping_{}{{job="{}"}} {}'.format(
+                    name, job or "", value))
+
+        jobs = sorted(self.jobs.items())
+        add("job_runs_total", "counter", "Job runs.",
+            [(job, state["runs"]) for job, state in jobs])
+        add("job_failures_total", "counter", "Job runs that raised.",
+            [(job, state["failures"]) for job, state in jobs])
+        add("job_issues_total", "counter", "Issues handed to jobs.",
+            [(job, state["processed"]) for job, state in jobs])
+        add("job_deferred_issues_total", "counter",
+            "Issues left for the next run by the job budgets.",
+            [(job, state["deferred"]) for job, state in jobs])
+        add("job_failed_issues_total", "counter", "Issues that failed.",
+            [(job, state["failed_issues"]) for job, state in jobs])
+        add("job_last_run_seconds", "gauge", "Duration of the last run.",
+            [(job, state["last_seconds"]) for job, state in jobs
+             if state["last_seconds"] is not None])
+        stats = sorted(self.housekeeping.job_stats.jobs.items(),
+                       key=lambda item: item[0] or "")
+        add("requests_total", "counter", "Requests sent to Jira.",
+            [(job, s["requests"]) for job, s in stats])
+        add("request_errors_total", "counter", "Requests that failed.",
+            [(job, s["errors"]) for job, s in stats])
+        add("request_seconds_total", "counter", "Time spent in requests.",
+            [(job, round(s["request_seconds"], 3)) for job, s in stats])
+        return "\n".join(lines) + "\n"
+
+
+class HealthServer:
+    """
+    HTTP server for the /health and /metrics endpoints of a Scheduler. Use as
+    a context manager or call start()/stop().
+
+    """
+    def __init__(self, scheduler, host="127.0.0.1", port=8086):
+        self.scheduler = scheduler
+        handler = type("Handler", (_Handler,), {"scheduler": scheduler})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.url = "http://%s:%d/" % self.server.server_address
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    scheduler = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path in ("", "/health"):
+            healthy, state = self.scheduler.health()
+            self._reply(200 if healthy else 503, "application/json",
+                        json.dumps(state, default=str))
+        elif path == "/metrics":
+            self._reply(200, "text/plain; version=0.0.4",
+                        self.scheduler.metrics())
+        else:
+            self._reply(404, "text/plain", "not found\n")
+
+    def _reply(self, status, content_type, text):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jira Housekeeping daemon")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address of the health, metrics and webhook "
+                             "endpoints")
+    parser.add_argument("--port", type=int, default=8086,
+                        help="port of /health and /metrics")
+    parser.add_argument("--webhook-port", type=int,
+                        help="also receive Jira webhook events on this port")
+    parser.add_argument("--token", help="secret the webhook URL must carry "
+                                        "as ?token=")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    housekeeping = Housekeeping(run=False)
+    scheduler = Scheduler(housekeeping)
+    servers = [HealthServer(scheduler, args.host, args.port).start()]
+    if args.webhook_port:
+        import webhook
+        dispatcher = webhook.Dispatcher(housekeeping, scheduler.refresh_seconds)
+        servers.append(webhook.WebhookServer(dispatcher, args.host,
+                                             args.webhook_port,
+                                             args.token).start())
+    logging.info("daemon: health on %s", servers[0].url)
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.stop()
+        housekeeping.jira.close()
@@ -0,0 +1,176 @@
+"""
+Concurrent per-issue execution for the Housekeeping jobs. See README for
+license info.
+
+An IssueExecutor calls a job's per-issue function for every issue it is
+given, on a bounded pool of threads. It is meant for jobs whose work on one
+issue touches only that issue, so the issues are handled in no particular
+order; jobs whose decisions depend on earlier issues keep a serial loop. An
+issue whose function raises is logged and counted as failed, and the
+remaining issues are still handled.
+
+"""
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import logging
+import threading
+import time
+
+
+# marks the pool threads, see on_worker()
+_local = threading.local()
+
+# outcome of one issue: what the function returned or the exception it
+# raised, and how long it took
+IssueResult = namedtuple("IssueResult", "issue result error seconds")
+
+
+def on_worker():
+    """
+    True when called from one of an IssueExecutor's pool threads. Code that
+    starts threads of its own runs serially there instead, so nested pools do
+    not outgrow the client's connection pool.
+
+    """
+    return getattr(_local, "worker", False)
+
+
+class IssueExecutor:
+    """
+    Bounded thread pool running a function once per issue.
+
+    """
+    def __init__(self, job, instrumentation, workers=1, progress_every=50):
+        """
+        Inputs:
+        :job:               name of the job, for the log and the report
+        :instrumentation:   the client's Instrumentation; the worker threads
+                            attribute their requests to the current job
+        :workers:           issues handled at the same time. 1 handles them
+                            in the calling thread
+        :progress_every:    log progress every this many issues
+
+        """
+        self.job = job
+        self.instrumentation = instrumentation
+        self.workers = max(1, workers or 1)
+        self.progress_every = progress_every
+        self.processed = 0
+        self.failed = 0
+        self.latencies = []
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def map(self, fn, issues):
+        """
+        Calls fn(issue) for every issue. Issues are drawn from the iterable
+        only when there is room for them, so a JobBudget.issues() generator
+        stops handing them out as soon as the budget is spent.
+        Inputs:
+            :fn:        function taking a single issue
+            :issues:    iterable of issues
+        Returns: list of IssueResult, in the order the issues were given
+
+        """
+        self.started = self.started or time.time()
+        try:
+            if self.workers == 1:
+                return [self._call(fn, issue) for issue in issues]
+            return self._map_concurrent(fn, issues)
+        finally:
+            self.finished = time.time()
+
+    def _map_concurrent(self, fn, issues):
+        call = self.instrumentation.wrap(self._call_on_worker)
+        pending = enumerate(issues)
+        running = set()
+        results = {}
+        drained = False
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                # draw new issues while there is room for them
+                while not drained and len(running) < self.workers:
+                    try:
+                        index, issue = next(pending)
+                    except StopIteration:
+                        drained = True
+                        break
+                    running.add(pool.submit(call, fn, issue, index))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, result = future.result()
+                    results[index] = result
+        return [results[index] for index in sorted(results)]
+
+    def _call_on_worker(self, fn, issue, index):
+        _local.worker = True
+        try:
+            return self._call(fn, issue, index)
+        finally:
+            _local.worker = False
+
+    def _call(self, fn, issue, index=None):
+        started = time.time()
+        result = error = None
+        try:
+            result = fn(issue)
+        except Exception as e:
+            error = e
+            logging.exception("%s: %s failed", self.job,
+                              getattr(issue, "key", issue))
+        outcome = IssueResult(issue, result, error, time.time() - started)
+        self._record(outcome)
+        return outcome if index is None else (index, outcome)
+
+    def _record(self, outcome):
+        with self._lock:
+            self.latencies.append(outcome.seconds)
+            self.processed += 1
+            if outcome.error is not None:
+                self.failed += 1
+            processed, failed = self.processed, self.failed
+        if self.progress_every and processed % self.progress_every == 0:
+            logging.info("%s: %d issues done, %d failed, %.1f issues/s",
+                         self.job, processed, failed,
+                         processed / max(self.elapsed, 1e-9))
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def percentile(self, fraction):
+        """
+        Returns the given fraction (0-1) of the per-issue latencies, in
+        seconds, or 0 when no issue was handled.
+
+        """
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def report(self):
+        """
+        Returns a one line summary of the issues handled and their latency.
+
+        """
+        return "{:<32} {:>7} {:>8} {:>6} {:>9.1f} {:>8.0f} {:>8.0f} {:>8.0f}".format(
+            self.job,
+            self.workers,
+            self.processed,
+            self.failed,
+            self.processed / self.elapsed if self.elapsed else 0.0,
+            self.percentile(0.5) * 1e3,
+            self.percentile(0.95) * 1e3,
+            max(self.latencies or [0]) * 1e3)
+
+    @staticmethod
+    def report_header():
+        return "{:<32} {:>7} {:>8} {:>6} {:>9} {:>8} {:>8} {:>8}".format(
+            "job", "workers", "issues", "failed", "issues/s", "p50 ms",
+            "p95 ms", "max ms")
@@ -6,12 +6,21 @@ Reference for using the jira client:
 http://pythonhosted.org/jira/
 
 """
+from budget import JobBudget
 from datetime import datetime
-from jira.client import JIRA
+from executor import IssueExecutor, on_worker
+from jira.client import JIRA, EndpointHistogram, JobBreakdown, WritePlan
+from jira.exceptions import JIRAError
+from jql import LabelIndex, compose, keys_in
+from matcher import get_matcher
+from membership import MembershipIndex
+from mirror import IssueMirror, count_by, search
+import argparse
 import logging
 import operator
 import secrets
 import settings
+import threading
 
 class Housekeeping:
     """
@@ -19,20 +28,139 @@ class Housekeeping:
     by the Housekeeping agent.
 
     """
-    def __init__(self):
+    # commands to run, in order
+    jobs = [
+        "content_acquisition_auto_qc",
+        "requeue_free_indexing",
+        "auto_assign",
+        "remind_reporter_to_close",
+        "close_resolved",
+        "clear_auto_close_label",
+        "resolved_issue_audit",
+        "handle_audited_tickets",
+        ]
+
+    def __init__(self, run=True, dry_run=False, options=None):
+        """
+        Inputs:
+        :run:       run all jobs right away
+        :dry_run:   record the writes in self.jira.write_plan instead of
+                    sending them
+        :options:   client options overriding secrets.options, e.g. a
+                    cassette to record or replay
+
+        """
         # open JIRA API Connection
-        self.jira = JIRA(options=secrets.options,
+        options = dict(secrets.options, dry_run=dry_run, **(options or {}))
+        self.jira = JIRA(options=options,
                             basic_auth=secrets.housekeeping_auth)
 
-        # commands to run
-        self.content_acquisition_auto_qc()
-        self.requeue_free_indexing()
-        self.auto_assign()
-        self.remind_reporter_to_close()
-        self.close_resolved()
-        self.clear_auto_close_label()
-        self.resolved_issue_audit()
-        self.handle_audited_tickets()
+        # request statistics per endpoint and per job
+        self.endpoint_stats = EndpointHistogram().register(self.jira.instrumentation)
+        self.job_stats = JobBreakdown().register(self.jira.instrumentation)
+        # budgets of the jobs run so far. Jobs called directly get no limit
+        self.budgets = []
+        self.budget = JobBudget(None)
+        # per-issue executors of the jobs run so far. Jobs called directly
+        # handle their issues one at a time
+        self.executors = []
+        self.executor = IssueExecutor(None, self.jira.instrumentation)
+        # issue keys the running job is limited to, None for all the issues
+        # its filters match (see run_job)
+        self.scope = None
+        # jobs run one at a time on an instance, even when a long running
+        # process (daemon.py, webhook.py) starts them from several threads
+        self.lock = threading.RLock()
+
+        # filter JQL by filter key, and transitions by project, issue type
+        # and status. Kept until refresh()
+        self.filter_jql = {}
+        self.transitions = {}
+
+        # labels in use, read the first time a job filters on them
+        self.labels = LabelIndex(self.jira)
+
+        # local copy of the issues answering the searches, if configured.
+        # Every write marks it stale, so the next search syncs it first
+        self.mirror = IssueMirror.from_settings(self.jira)
+
+        # every group the jobs check against, downloaded once for the run
+        with self.jira.instrumentation.span("setup"):
+            self.members = MembershipIndex(self.jira, settings.housekeeping_groups)
+            if self.mirror:
+                self.mirror.sync()
+
+        if run:
+            self.run()
+
+    def run(self, jobs=None):
+        """
+        Runs the given jobs (default: all of them) in order.
+
+        """
+        for job in jobs or self.jobs:
+            self.run_job(job)
+
+    def run_job(self, job, keys=None):
+        """
+        Runs a single job within its budget (see settings.job_budgets) with
+        its issues handled by settings.job_workers threads, attributing its
+        requests to the job name in the request statistics.
+        Inputs:
+            :job:   name of the job method
+            :keys:  only handle these issues, if they match the job's
+                    filters. None for every issue the filters match
+
+        """
+        if keys is not None and not keys:
+            return
+        with self.lock:
+            limits = settings.job_budgets.get(job, settings.job_budgets["default"])
+            self.budget = JobBudget(job, **limits)
+            self.budgets.append(self.budget)
+            workers = settings.job_workers.get(job, settings.job_workers["default"])
+            self.executor = IssueExecutor(job, self.jira.instrumentation, workers)
+            self.executors.append(self.executor)
+            self.scope = keys
+            try:
+                with self.jira.instrumentation.span(job), \
+                        self.budget.track(self.jira.instrumentation):
+                    getattr(self, job)()
+            finally:
+                self.budget = JobBudget(None)
+                self.executor = IssueExecutor(None, self.jira.instrumentation)
+                self.scope = None
+
+    def refresh(self):
+        """
+        Drops what this instance read once and kept (group members, labels,
+        filter JQL, transitions) so the next jobs read it again, and makes
+        the next search sync the mirror. For long running processes, where
+        these change under the instance.
+
+        """
+        with self.lock, self.jira.instrumentation.span("setup"):
+            self.members = MembershipIndex(self.jira, settings.housekeeping_groups)
+            self.labels = LabelIndex(self.jira)
+            self.filter_jql = {}
+            self.transitions = {}
+            if self.mirror:
+                self.mirror.dirty = True
+
+    def report(self):
+        """
+        Returns the budget and request statistics of this run as text.
+
+        """
+        budgets = [JobBudget.report_header()]
+        budgets.extend(budget.report() for budget in self.budgets)
+        executors = [IssueExecutor.report_header()]
+        executors.extend(executor.report() for executor in self.executors
+                         if executor.processed)
+        return "{}\n\n{}\n\n{}\n\n{}".format("\n".join(budgets),
+                                               "\n".join(executors),
+                                               self.job_stats.report(),
+                                               self.endpoint_stats.report())
 
 
     def content_acquisition_auto_qc(self):
@@ -45,7 +173,7 @@ class Housekeeping:
         # get CA tickets merged 30+ minute ago
         issues = self.get_issues("auto_qc")
 
-        for issue in issues:
+        def _qc(issue):
             #print(dir(issue.fields.reporter))
             reporter = issue.fields.reporter.displayName
             reporterID = issue.fields.reporter.accountId
@@ -55,10 +183,12 @@ class Housekeeping:
             771 is the transition ID spedific to this step for this project.
             Anything more generic will need to parse the transitions list.
             """
-            tran_id = self.get_transition_id(issue,"qc")
-            self.jira.transition_issue(issue.key,tran_id)
+            if not self.transition(issue,["qc"]):
+                raise JIRAError("No QC transition for {}".format(issue.key))
             self.jira.add_comment(issue.key, message)
 
+        self.executor.map(_qc, self.budget.issues(issues))
+
     def handle_audited_tickets(self):
         """
         Handles audit tickets that are failed. Closed tickets are ignored. Failed
@@ -69,11 +199,11 @@ class Housekeeping:
         Returns: None
 
         """
-        issues = self.jira.search_issues(   # get all the ADT issues
+        issues = self.search_scoped(   # get all the ADT issues
             'project=ADT and status="Failed Audit"')
 
         # For each failed issue, generate a new work ticket then close this one
-        for issue in issues:
+        for issue in self.budget.issues(issues):
             #BUID
             adt_buid=issue.fields.customfield_10502
             #WCID
@@ -152,22 +282,14 @@ class Housekeeping:
         # get all the issues from projects in the audit list
         issues = self.get_issues("audit_list")
 
-        #build a list of all users in the MS & MD groups
-        member_svc = self.get_group_members("member-services")
-        member_dev = self.get_group_members("membership-development")
-        member_aud = self.get_group_members("issue audits")
-        member_all = []
-        for user in member_svc:
-            member_all.append(user) #only need the user names, not the meta data
-        for user in member_dev:
-            member_all.append(user)
-        for user in member_aud:
-            member_all.append(user)
-        member_all = set(member_all) #de-dupe
+        #all users in the MS, MD & audit groups
+        member_all = self.members.union("member-services",
+                                        "membership-development",
+                                        "issue audits")
 
 
         # cycle through them and create a new ADT ticket for each
-        for issue in issues:
+        for issue in self.budget.issues(issues):
             # capture issue fields
             ind_buid=issue.fields.customfield_10502 #BUID
             ind_wcid=issue.fields.customfield_10501 #WCID
@@ -240,18 +362,21 @@ class Housekeeping:
         Returns: Nothing
 
         """
-        # get issues that are stale and need reassigned
-        issues = self.get_issues("stale_free")
+        # get issues that are stale and need reassigned, leaving out the
+        # ones waiting on something
+        issues = self.get_issues("stale_free",exclude_labels=["wait"])
 
-        # itirate issues and set assignee to empty. This will allow
+        # set the assignee of each issue to empty. This will allow
         # auto assignment to set the assignee.
-        for issue in issues:
-            #check for wait in label
+        def _requeue(issue):
+            #check for wait in labels added since the label list was read
             wait_label = self.label_contains(issue,"wait")
             # if no wait label, clear the assignee so it can be re-autoassigned
             if (not wait_label):
                 issue.update(assignee={'name':""})
 
+        self.executor.map(_requeue, self.budget.issues(issues))
+
 
     def make_new_issue(self,project,issue_assignee,issue_reporter,summary,
                                       description="",watchers=[],links=[],
@@ -278,6 +403,8 @@ class Housekeeping:
             :indexing_type: the indexing type - custom field 10500
             :comments: list dictionaries of comments and authors to auto add.
         Returns: Jira Issue Object
+        Raises: JIRAError of the first link that could not be created, once
+            the rest of the issue is done
 
         """
         issue_dict = {
@@ -297,18 +424,23 @@ class Housekeeping:
 
         # add watchers to audit ticket (reporter, assignee, wacthers from indexrep ticket)
         print(watchers)
-        for watcher in watchers:
-            try:
-                self.jira.add_watcher(new_issue,watcher)
-                print("Watcher added: {}".format(watcher))
-            except:
+        # a new issue has no watchers to check against
+        added = self.jira.add_watchers(new_issue,watchers,
+                                       current={new_issue.key: []})
+        for (key, watcher), result in added.items():
+            if isinstance(result, Exception):
                 print("Watcher skipped: {}".format(watcher))
-                pass
+            else:
+                print("Watcher added: {}".format(watcher))
 
         # link the audit ticket back to indexrep ticket
         print(links)
-        for link in links:
-            self.jira.create_issue_link('Relates',new_issue,link)
+        linked = self.jira.create_issue_links(
+            [('Relates',new_issue.key,link) for link in links])
+        failed = [result for result in linked if isinstance(result, Exception)]
+        for link, result in zip(links, linked):
+            if isinstance(result, Exception):
+                print("Link failed: {}".format(link))
 
         # add custom field values if set
         if buid:
@@ -336,22 +468,20 @@ class Housekeeping:
             quoted_comments = "Comments from the parent issue:\\\ {}".format(quoted_comments)
             self.jira.add_comment(new_issue,quoted_comments)
 
+        # a failed link raises, as it did when the links were made one by
+        # one, so the caller leaves the source ticket open
+        if failed:
+            raise failed[0]
         return new_issue
 
 
     # method to transistion audit ticket
     def get_group_members(self, group_name):
         """
-        Returns the members of a group as a list
+        Returns the members of a group as a dict keyed by accountId. Served
+        from the membership index, so each group is downloaded once per run.
         """
-        group = self.jira.groups(query=group_name)[0]
-        """print("----")
-        print(group)
-        print("----")
-        print(group.title())
-        print("----")"""
-        members = self.jira.group_members(group.title())
-        return members
+        return self.members.members(group_name)
 
     def auto_assign(self,project="INDEXREP"):
         """
@@ -426,7 +556,7 @@ class Housekeeping:
             }]
 
         for auto_assign_dict in auto_assign_dicts:
-            for issue in auto_assign_dict["issue_list"]:
+            for issue in self.budget.issues(auto_assign_dict["issue_list"]):
                 username = self.user_with_fewest_issues(auto_assign_dict["assignee_group"],
                                                         auto_assign_dict["assigned_list"])
 
@@ -440,10 +570,10 @@ class Housekeeping:
                             issue.update({"customfield_10500":{"id":"10103"}})
 
                         elif auto_assign_dict["issue_list"]==free_issues:
-                            free_index_mem = self.get_group_members("free-index-default")
                             # set the indexing type to free if the reporter is in the list
                             # of users who default to free
-                            if issue.fields.reporter.accountId in free_index_mem:
+                            if self.members.in_group(issue.fields.reporter.accountId,
+                                                     "free-index-default"):
                                 issue.update({"customfield_10500":{"id":"10100"}}) #free
                             else: #default is member otherwise
                                 issue.update({"customfield_10500":{"id":"10103"}})
@@ -466,13 +596,16 @@ class Housekeeping:
 
         """
         issues = self.get_issues("remind_close_issues")
-        for issue in issues:
+
+        def _remind(issue):
             reporter = issue.fields.reporter.accountId
             reporterName = issue.fields.reporter.displayName
             message = "[{}|~accountid:{}], this issue has been resolved for 13 days. It will be closed automatically in 24 hours.".format(reporterName,reporter)
             self.bot_comment(issue,message)
             self.toggle_label(issue,secrets.ac_label,"add")
 
+        self.executor.map(_remind, self.budget.issues(issues))
+
     def close_resolved(self):
         """
         Looks up all issues labeled for auto-closing that have not been updated
@@ -481,7 +614,8 @@ class Housekeeping:
 
         """
         issues = self.get_issues("auto_close_issues")
-        for issue in issues:
+
+        def _close(issue):
             reporter = issue.fields.reporter.accountId
             reporterName = issue.fields.reporter.displayName
             message = ("[{}|~accountid:{}], this issue has been closed automatically").format(reporterName,reporter)
@@ -489,6 +623,8 @@ class Housekeeping:
             self.close_issue(issue)
             self.bot_comment(issue,message)
 
+        self.executor.map(_close, self.budget.issues(issues))
+
     def get_transition_id(self,issue,key):
         """
         Finds the transition id for an issue given a specific search string.
@@ -498,7 +634,12 @@ class Housekeeping:
         Returns: transition id or False
 
         """
-        trans = self.jira.transitions(issue)
+        state = self.transition_state(issue)
+        trans = self.transitions.get(state) if state[2] else None
+        if trans is None:
+            trans = self.jira.transitions(issue)
+            if state[2]:
+                self.transitions[state] = trans
         tran_id = False
         for tran in trans:
             tran_name = tran['name'].lower()
@@ -506,6 +647,60 @@ class Housekeeping:
                 tran_id = tran['id']
         return tran_id
 
+    def transition_state(self,issue):
+        """
+        Returns the (project, issue type, status) an issue's transitions are
+        cached under. They mostly follow from its workflow and status.
+
+        """
+        fields = getattr(issue, "fields", None)
+        return (getattr(issue, "key", issue).rsplit("-", 1)[0],
+                getattr(getattr(fields, "issuetype", None), "name", None),
+                getattr(getattr(fields, "status", None), "name", None))
+
+    def transition(self,issue,keys,fields=None):
+        """
+        Moves an issue through the first transition found for the search
+        strings. Workflow conditions can make an issue's transitions differ
+        from the cached ones, so when a cached transition is missing or
+        fails, the issue's own transitions are read and it is tried again.
+        Inputs:
+            :issue:     jira issue
+            :keys:      search strings, in order of preference
+            :fields:    fields to set, e.g. a resolution. Sent without them
+                        when the transition has no screen for them
+        Returns: True|False whether a transition was found
+
+        """
+        state = self.transition_state(issue)
+        for retry in (False, True):
+            cached = not retry and state in self.transitions
+            if retry:
+                # the cached transitions don't hold for this issue
+                self.transitions.pop(state, None)
+            tran_id = False
+            for key in keys:
+                tran_id = tran_id or self.get_transition_id(issue,key)
+            try:
+                if tran_id:
+                    self._send_transition(issue,tran_id,fields)
+                    return True
+                if not cached:
+                    return False
+            except JIRAError:
+                if not cached:
+                    raise
+
+    def _send_transition(self,issue,tran_id,fields):
+        if fields:
+            try:
+                self.jira.transition_issue(issue,tran_id,fields)
+                return
+            #some close transitions don't have a resolution screen
+            except: #open ended, but the JIRAError exception is broken.
+                pass
+        self.jira.transition_issue(issue,tran_id)
+
     def close_issue(self, issue):
         """
         Closes the issue passed to it with a resolution of fixed.
@@ -514,22 +709,10 @@ class Housekeeping:
 
         """
         watch_list = self.toggle_watchers("remove",issue)
-        trans = self.jira.transitions(issue)
-        success_flag = False
-        tran_id = self.get_transition_id(issue,"close")
-        if not tran_id:
-            tran_id = self.get_transition_id(issue,"complete")
-
-        if tran_id:
-            try:
-                self.jira.transition_issue(issue,tran_id,
-                                           {'resolution':{'id':'1'}})
-            #some close transitions don't have a resolution screen
-            except: #open ended, but the JIRAError exception is broken.
-                self.jira.transition_issue(issue,tran_id)
-            success_flag = True
+        success_flag = self.transition(issue,["close","complete"],
+                                       {'resolution':{'id':'1'}})
 
-        watch_list = self.toggle_watchers("add",issue,watch_list)
+        watch_list = self.toggle_watchers("add",issue,watch_list,watching=[])
         return success_flag
 
     def clear_auto_close_label(self):
@@ -539,8 +722,9 @@ class Housekeeping:
 
         """
         issues = self.get_issues("autoclose_label")
-        for issue in issues:
-            self.toggle_label(issue,secrets.ac_label,"remove")
+        self.executor.map(
+            lambda issue: self.toggle_label(issue,secrets.ac_label,"remove"),
+            self.budget.issues(issues))
 
     def bot_comment(self,issue,message):
         """
@@ -551,7 +735,7 @@ class Housekeeping:
         """
         watch_list = self.toggle_watchers("remove",issue)
         self.jira.add_comment(issue.key,message)
-        self.toggle_watchers("add",issue, watch_list)
+        self.toggle_watchers("add",issue, watch_list, watching=[])
 
     def toggle_label(self,issue,label,action):
         """
@@ -568,9 +752,9 @@ class Housekeeping:
         else:
             label_list.remove(label)
         issue.update(fields={"labels": label_list})
-        self.toggle_watchers("add",issue, watch_list)
+        self.toggle_watchers("add",issue, watch_list, watching=[])
 
-    def toggle_watchers(self,action,issue,watch_list=[]):
+    def toggle_watchers(self,action,issue,watch_list=[],watching=None):
         """
         Internal method that either adds or removes the watchers of an issue. If
         it removes them,it returns a list of users that were removed. If it
@@ -580,6 +764,9 @@ class Housekeeping:
         :action: String "add"|"remove". The action to take
         :issue:  Issue whose watchers list is being modified
         :watch_list: list of users. Optional for remove. Required for add.
+        :watching: accountIds known to be watching the issue, for add. None
+            to look them up, so users already watching are not added again.
+            [] when putting back the watchers this method just removed.
 
         Returns:
         :issue_watcher: List of users who are or were watching the issue.
@@ -587,19 +774,23 @@ class Housekeeping:
         """
         if action=="remove":
             issue_watchers = self.jira.watchers(issue).watchers
-            for issue_watcher in issue_watchers:
-                # watch list can be inconsensent when returned by the jira api
-                # same issue in the add loop
-                try:
-                    self.jira.remove_watcher(issue,issue_watcher.accountId)
-                except AttributeError:
-                    pass #self.jira.add_watcher(issue,old_watcher)
+            # watch list can be inconsensent when returned by the jira api,
+            # so watchers without an accountId are left alone
+            account_ids = [getattr(w, "accountId", None)
+                           for w in issue_watchers]
+            key = getattr(issue, "key", issue)
+            # on an executor worker the watchers are changed one at a time
+            self.jira.remove_watchers(key,account_ids,
+                                      current={key: account_ids},
+                                      workers=1 if on_worker() else None)
         else:
-            for old_watcher in watch_list:
-                try:
-                    self.jira.add_watcher(issue,old_watcher.accountId)
-                except AttributeError:
-                    self.jira.add_watcher(issue,old_watcher)
+            # the list holds either watcher objects or accountIds
+            key = getattr(issue, "key", issue)
+            self.jira.add_watchers(key,[getattr(w, "accountId", w)
+                                        for w in watch_list],
+                                   current=None if watching is None
+                                   else {key: watching},
+                                   workers=1 if on_worker() else None)
             issue_watchers = self.jira.watchers(issue).watchers
         return issue_watchers
 
@@ -623,8 +814,8 @@ class Housekeeping:
     def check_for_text(self,issue,text_list):
         """
         Internal method that searches the summary and description of an issue for
-        a given list of strings. Match is non-case sensative, and converts
-        everything to lower case before checking for a match.
+        a given list of strings. Match is non-case sensative. The strings are
+        compiled into a matcher once per list (see matcher.py).
 
         Inputs:
         :issue: Jira issue object that is being checked
@@ -634,23 +825,7 @@ class Housekeeping:
         True|False  True if any of the values in text_list exist.
 
         """
-        string_exists = False
-        if issue.fields.summary:
-            summary = issue.fields.summary.lower()
-        else:
-            summary = ""
-
-        if issue.fields.description:
-            description = issue.fields.description.lower()
-        else:
-            description = ""
-
-        for text in text_list:
-            text = text.lower()
-            if text in summary or text in description:
-                string_exists = True
-
-        return string_exists
+        return get_matcher(text_list).search_issue(issue)
 
 
     def user_with_fewest_issues(self,group,query,blacklist=[]):
@@ -665,21 +840,13 @@ class Housekeeping:
 
         """
         members = self.get_group_members(group)
-        issues = self.jira.search_issues(query,maxResults=1000)
-
-        member_count = {}
-
-        for member in members:
-            member_count[member]=0
-
-        # perform the count anew for each ticket
-        for issue in issues:
-            if issue.fields.assignee:
-                assignee = issue.fields.assignee.accountId
-            else:
-                assignee = None
-            if assignee in members and not self.label_contains(issue,"wait"):
-                member_count[assignee] = member_count[assignee]+1
+        if not members:
+            raise LookupError("Group {} has no members to assign".format(group))
+        # waiting issues don't count, so leave them out of the search, and
+        # let Jira (or the mirror) do the counting per member
+        query = compose(query, self.labels.exclude_containing("wait"))
+        member_count = count_by(self.jira,self.mirror,query,"assignee",
+                                members)
 
         #sort the list so that the user with the lowest count is first
         member_count_sorted = sorted(member_count.items(),
@@ -695,27 +862,145 @@ class Housekeeping:
         return str(member_count_sorted[0][0])
 
 
-    def get_issues(self,filter_key,return_jql=False):
+    def get_issues(self,filter_key,return_jql=False,exclude_labels=()):
         """
         Returns issues found using a jira filter.
 
         Inputs:
             :filter_key:    the dict key for the filter in settings
             :return_jql:    flag to return JQL instead on issues
+            :exclude_labels: leave out issues with a label containing any of
+                             these strings (see label_contains)
 
         Returns:
             :issues:    Jira Issues object (default) or JQL string
 
         """
-        filter_id = secrets.jira_filters[filter_key]
-        jql_query = self.jira.filter(filter_id).jql
+        jql_query = self.filter_jql.get(filter_key)
+        if jql_query is None:
+            filter_id = secrets.jira_filters[filter_key]
+            jql_query = self.filter_jql[filter_key] = self.jira.filter(filter_id).jql
+        if exclude_labels:
+            jql_query = compose(jql_query,
+                                self.labels.exclude_containing(*exclude_labels))
         if return_jql:
             # some functionality needs the JQL instead of an issue list
             # notably the method self.user_with_fewest_issues
             return jql_query
         else:
-            issues = self.jira.search_issues(jql_query)
+            issues = self.search_scoped(jql_query)
             return issues
 
+    def scoped(self,jql_query):
+        """
+        Limits a query to the issues the running job was given, if any.
+        Inputs: jql_query: JQL of the issues a job handles
+        Returns: JQL string
+
+        """
+        if self.scope is None:
+            return jql_query
+        return compose(jql_query, keys_in(self.scope))
+
+    def search_scoped(self,jql_query):
+        """
+        Searches for the issues of a query within the running job's scope.
+        Jira refuses the whole query when a key in the scope was deleted,
+        moved or can't be seen, so such keys are dropped from the scope and
+        the search is run again.
+        Inputs: jql_query: JQL of the issues a job handles
+        Returns: list of issues
+
+        """
+        # the scope is [] once every key in it turned out to be stale
+        while self.scope != []:
+            try:
+                return search(self.jira,self.mirror,self.scoped(jql_query))
+            except JIRAError as e:
+                stale = self.stale_keys(e)
+                if not stale:
+                    raise
+                logging.warning("%s: skipping issues Jira doesn't know: %s",
+                                self.budget.job, ", ".join(stale))
+                self.scope = [key for key in self.scope if key not in stale]
+        return []
+
+    def stale_keys(self,error):
+        """
+        Returns the keys of the scope a JIRAError reports as unknown, e.g.
+        "An issue with key 'MER-12' does not exist for field 'key'."
+
+        """
+        if self.scope is None or error.status_code != 400:
+            return []
+        messages = [error.text or ""]
+        try:
+            messages += error.response.json().get("errorMessages") or []
+        except (AttributeError, ValueError):
+            pass
+        text = "\n".join(str(message) for message in messages)
+        return [key for key in self.scope if "'{}'".format(key) in text]
+
+def replay_plan(path, workers=None):
+    """
+    Sends the writes of a plan recorded with --dry-run. The plan is what the
+    jobs would have written given the state they read; jobs that read what
+    earlier writes changed (auto_assign after requeue_free_indexing, the
+    workload counts of auto_assign) decide differently in a real run, so a
+    replay is not equivalent to one.
+    Inputs:
+        :path:      JSON lines file written by WritePlan.dump
+        :workers:   number of issues written to concurrently
+    Returns: list of (entry, response, error) tuples, in plan order
 
-Housekeeping()
+    """
+    jira = JIRA(options=secrets.options, basic_auth=secrets.housekeeping_auth)
+    results = WritePlan.load(path).replay(jira, workers=workers)
+    failed = sum(1 for _, _, error in results if error is not None)
+    sent = sum(1 for _, response, _ in results if response is not None)
+    print("{} writes sent, {} failed, {} skipped".format(
+        sent, failed, len(results) - sent - failed))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jira Housekeeping")
+    parser.add_argument("--stats", action="store_true",
+                        help="print request statistics per job and endpoint")
+    parser.add_argument("--dry-run", metavar="PLAN",
+                        help="write the planned writes to PLAN instead of "
+                             "sending them. The plan is a preview: reads do "
+                             "not see the planned writes, so jobs that "
+                             "depend on earlier writes plan differently "
+                             "from a real run")
+    parser.add_argument("--replay", metavar="PLAN",
+                        help="send the writes recorded in PLAN and exit. "
+                             "Not equivalent to a run, see --dry-run")
+    parser.add_argument("--workers", type=int,
+                        help="issues written to concurrently by --replay")
+    parser.add_argument("--cassette", metavar="FILE",
+                        help="record the HTTP traffic to FILE, or replay it "
+                             "with --cassette-mode replay")
+    parser.add_argument("--cassette-mode", choices=["record", "replay"],
+                        default="record")
+    parser.add_argument("--cassette-latency", type=float, default=1.0,
+                        help="factor applied to the recorded response times "
+                             "when replaying (0 for none)")
+    args = parser.parse_args()
+
+    if args.replay:
+        replay_plan(args.replay, workers=args.workers)
+    else:
+        options = {}
+        if args.cassette:
+            options = {"cassette": args.cassette,
+                       "cassette_mode": args.cassette_mode,
+                       "cassette_latency": args.cassette_latency}
+        housekeeping = Housekeeping(dry_run=bool(args.dry_run), options=options)
+        if args.dry_run:
+            housekeeping.jira.write_plan.dump(args.dry_run)
+            print("{} writes planned in {}".format(
+                len(housekeeping.jira.write_plan), args.dry_run))
+        if args.stats:
+            print(housekeeping.report())
+        housekeeping.jira.close()
@@ -0,0 +1,105 @@
+"""
+JQL building blocks for the Jira scripts. See README for license info.
+
+Saved filters give the scripts their base JQL. The helpers here narrow that
+JQL with extra predicates, so issues the scripts would skip anyway are
+filtered out by Jira and never transferred.
+
+"""
+import re
+
+ORDER_BY = re.compile(r"\s+ORDER\s+BY\s+", re.I)
+
+
+def quote(value):
+    """
+    Returns value as a JQL string literal.
+
+    """
+    return '"{}"'.format(str(value).replace("\\", "\\\\").replace('"', '\\"'))
+
+
+def compose(jql, *predicates):
+    """
+    Adds predicates to a JQL query with AND, keeping its ORDER BY clause last.
+    Inputs:
+        :jql:           base query, e.g. the JQL of a saved filter
+        :predicates:    JQL clauses. Empty ones are skipped
+    Returns: JQL string
+
+    """
+    predicates = [predicate for predicate in predicates if predicate]
+    if not predicates:
+        return jql
+    parts = ORDER_BY.split(jql, maxsplit=1)
+    where = parts[0].strip()
+    clauses = ["({})".format(where)] if where else []
+    clauses.extend("({})".format(predicate) for predicate in predicates)
+    composed = " AND ".join(clauses)
+    if len(parts) > 1:
+        composed = "{} ORDER BY {}".format(composed, parts[1])
+    return composed
+
+
+def keys_in(keys):
+    """
+    Returns a predicate keeping only the issues with the given keys. An empty
+    key list gives an empty predicate.
+
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return ""
+    return "key in ({})".format(", ".join(quote(key) for key in keys))
+
+
+def labels_not_in(labels):
+    """
+    Returns a predicate dropping issues that carry any of the labels. Issues
+    without labels are kept, which "labels not in" on its own would drop.
+    An empty label list gives an empty predicate.
+
+    """
+    labels = sorted(set(labels))
+    if not labels:
+        return ""
+    return "labels is EMPTY OR labels not in ({})".format(
+        ", ".join(quote(label) for label in labels))
+
+
+class LabelIndex:
+    """
+    The labels in use on the server, fetched once, for turning "label
+    contains text" checks (which JQL cannot express) into label lists.
+
+    """
+    def __init__(self, jira):
+        """
+        Inputs:
+        :jira:  connected JIRA client
+
+        """
+        self.jira = jira
+        self._labels = None
+
+    @property
+    def labels(self):
+        if self._labels is None:
+            self._labels = self.jira.labels()
+        return self._labels
+
+    def containing(self, text):
+        """
+        Returns the labels that contain text, like Housekeeping.label_contains.
+
+        """
+        return [label for label in self.labels if text in label]
+
+    def exclude_containing(self, *texts):
+        """
+        Returns a predicate dropping issues with a label containing any of the
+        texts.
+
+        """
+        return labels_not_in(label for text in texts
+                             for label in self.containing(text))
@@ -0,0 +1,107 @@
+"""
+Keyword matching for the Jira scripts. See README for license info.
+
+A KeywordMatcher is compiled once from a list of phrases (for example
+settings.member_setup_strs) and finds all of them in a text with a single,
+case-insensitive scan, instead of lower-casing the phrases and searching for
+each of them on every call.
+
+"""
+from collections import OrderedDict
+from functools import lru_cache
+import re
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive substring matcher for a fixed set of phrases.
+
+    """
+    def __init__(self, phrases):
+        """
+        Inputs:
+        :phrases:   strings to look for. Matching ignores case
+
+        """
+        # lower-cased phrase -> phrase as given, first spelling wins
+        self.phrases = OrderedDict()
+        for phrase in phrases:
+            if phrase:
+                self.phrases.setdefault(phrase.lower(), phrase)
+        # longest first, so the regex reports the longest phrase at a position
+        ordered = sorted(self.phrases, key=len, reverse=True)
+        if ordered:
+            alternatives = "|".join(re.escape(phrase) for phrase in ordered)
+            self._search = re.compile(alternatives).search
+            self._finditer = re.compile("(?=({}))".format(alternatives)).finditer
+        else:
+            self._search = lambda text: None
+            self._finditer = lambda text: iter(())
+        # every phrase that matches where a longer one does is a prefix of it
+        self._prefixes = dict(
+            (phrase, tuple(other for other in ordered if phrase.startswith(other)))
+            for phrase in ordered)
+
+    def search(self, *texts):
+        """
+        True if any phrase occurs in any of the texts. Stops at the first hit.
+
+        """
+        return self._search(_join(texts)) is not None
+
+    def matches(self, *texts):
+        """
+        Returns the set of phrases (as given) that occur in any of the texts.
+
+        """
+        found = set()
+        for match in self._finditer(_join(texts)):
+            found.update(self._prefixes[match.group(1)])
+        return set(self.phrases[phrase] for phrase in found)
+
+    def search_issue(self, issue, fields=("summary", "description")):
+        """
+        True if any phrase occurs in one of the given fields of an issue.
+
+        """
+        return self.search(*_issue_texts(issue, fields))
+
+    def classify(self, issues, fields=("summary", "description")):
+        """
+        Matches every issue of a search result.
+        Inputs:
+            :issues:    iterable of Jira issues
+            :fields:    issue fields to look in
+        Returns: OrderedDict of issue key -> set of matched phrases, for the
+            issues that matched anything, in search order
+
+        """
+        classified = OrderedDict()
+        for issue in issues:
+            found = self.matches(*_issue_texts(issue, fields))
+            if found:
+                classified[issue.key] = found
+        return classified
+
+
+@lru_cache(maxsize=32)
+def _compiled(phrases):
+    return KeywordMatcher(phrases)
+
+
+def get_matcher(phrases):
+    """
+    Returns the KeywordMatcher for a list of phrases, compiling it only the
+    first time the same phrases are asked for.
+
+    """
+    return _compiled(tuple(phrases))
+
+
+def _join(texts):
+    # newlines never occur in a phrase, so no match spans two texts
+    return "\n".join(text for text in texts if text).lower()
+
+
+def _issue_texts(issue, fields):
+    return [getattr(issue.fields, field, None) or "" for field in fields]
@@ -0,0 +1,155 @@
+"""
+Group membership index for the Jira scripts. See README for license info.
+
+Downloads every referenced group once and keeps a user -> groups inverted
+index next to the per-group member details, so checks like "is the reporter
+in any of these groups" are a dict lookup instead of a fresh download.
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+
+
+class MembershipIndex:
+    """
+    Membership of a set of Jira groups, indexed both ways.
+
+    Groups are keyed case-insensitively by the name they are referenced with
+    in the scripts. Groups that were not loaded up front are fetched the
+    first time they are asked for. A group that cannot be downloaded is left
+    out, and asking for it raises, so only the code using it fails.
+
+    """
+    def __init__(self, jira, groups=(), workers=5):
+        """
+        Inputs:
+        :jira:      connected JIRA client
+        :groups:    group names to load immediately
+        :workers:   number of groups downloaded concurrently
+
+        """
+        self.jira = jira
+        self.workers = workers
+        self._details = {}
+        self._members = {}
+        self._groups_of = {}
+        # group -> LookupError for groups Jira does not have
+        self._missing = {}
+        self._lock = threading.Lock()
+        if groups:
+            self.load(*groups)
+
+    def load(self, *groups):
+        """
+        Downloads the given groups (concurrently) and adds them to the index,
+        replacing any previous membership for those groups.
+        Returns: dict of group -> exception for the groups that could not be
+            downloaded. They are logged and left out of the index
+
+        """
+        groups = [group for group in groups if group]
+        if not groups:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            fetch = self.jira.instrumentation.wrap(self._fetch)
+            fetched = list(executor.map(fetch, groups))
+        errors = {}
+        with self._lock:
+            for group, details in zip(groups, fetched):
+                if isinstance(details, Exception):
+                    logging.warning("Could not load group %s: %s", group, details)
+                    errors[group] = details
+                    if isinstance(details, LookupError):
+                        self._missing[group.lower()] = details
+                else:
+                    self._missing.pop(group.lower(), None)
+                    self._add(group, details)
+        return errors
+
+    def refresh(self):
+        """
+        Re-downloads every group currently in the index.
+
+        """
+        self.load(*(list(self._members) + list(self._missing)))
+
+    def members(self, group):
+        """
+        Returns the member details of a group, keyed by accountId.
+
+        """
+        return self._details[self._ensure(group)]
+
+    def account_ids(self, group):
+        """
+        Returns the accountIds of a group as a frozenset.
+
+        """
+        return self._members[self._ensure(group)]
+
+    def groups_of(self, account_id):
+        """
+        Returns the (lower-cased) names of the indexed groups a user belongs to.
+
+        """
+        return frozenset(self._groups_of.get(account_id, ()))
+
+    def in_group(self, account_id, group):
+        """
+        True if the user is a member of the group.
+
+        """
+        return account_id in self.account_ids(group)
+
+    def in_any(self, account_id, *groups):
+        """
+        True if the user is a member of at least one of the groups.
+
+        """
+        return any(self.in_group(account_id, group) for group in groups)
+
+    def union(self, *groups):
+        """
+        Returns the accountIds that are in any of the groups.
+
+        """
+        return frozenset().union(*(self.account_ids(group) for group in groups))
+
+    def intersection(self, *groups):
+        """
+        Returns the accountIds that are in all of the groups.
+
+        """
+        if not groups:
+            return frozenset()
+        return self.account_ids(groups[0]).intersection(
+            *(self.account_ids(group) for group in groups[1:]))
+
+    def _ensure(self, group):
+        key = group.lower()
+        if key in self._missing:
+            raise self._missing[key]
+        if key not in self._members:
+            errors = self.load(group)
+            if errors:
+                raise errors[group]
+        return key
+
+    def _fetch(self, group_name):
+        try:
+            found = self.jira.groups(query=group_name)
+            if not found:
+                raise LookupError("No Jira group named {!r}".format(group_name))
+            return self.jira.group_members(found[0])
+        except Exception as e:
+            return e
+
+    def _add(self, group, details):
+        key = group.lower()
+        for account_id in self._members.get(key, ()):
+            self._groups_of[account_id].discard(key)
+        self._details[key] = details
+        self._members[key] = frozenset(details)
+        for account_id in details:
+            self._groups_of.setdefault(account_id, set()).add(key)
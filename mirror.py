@@ -0,0 +1,718 @@
+"""
+Local issue mirror for the Jira scripts. See README for license info.
+
+Keeps a copy of the issues of the projects in settings.mirror_projects in a
+SQLite file. The first sync downloads every issue (with its changelog); later
+syncs only ask Jira for the issues updated since the newest update already in
+the mirror. Searches written in the JQL the scripts use are answered from the
+mirror; anything it cannot evaluate raises UnsupportedQuery so the caller can
+ask Jira instead.
+
+"""
+from datetime import datetime, timedelta, timezone
+from jira.client import ResultList
+from jira.resources import Issue
+from jql import compose, quote
+import json
+import logging
+import re
+import settings
+import sqlite3
+import threading
+import time
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    key TEXT PRIMARY KEY,
+    id INTEGER,
+    project TEXT,
+    number INTEGER,
+    issuetype TEXT,
+    status TEXT,
+    resolution TEXT,
+    assignee TEXT,
+    reporter TEXT,
+    created TEXT,
+    updated TEXT,
+    resolutiondate TEXT,
+    raw TEXT
+);
+CREATE INDEX IF NOT EXISTS issues_project ON issues (project, resolution);
+CREATE INDEX IF NOT EXISTS issues_assignee ON issues (assignee);
+CREATE INDEX IF NOT EXISTS issues_resolutiondate ON issues (resolutiondate);
+CREATE TABLE IF NOT EXISTS labels (
+    key TEXT,
+    label TEXT,
+    PRIMARY KEY (key, label)
+);
+CREATE INDEX IF NOT EXISTS labels_label ON labels (label);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class UnsupportedQuery(ValueError):
+    """
+    Raised for JQL the mirror cannot evaluate (functions, text search,
+    history searches, custom fields, ...).
+
+    """
+
+
+class IssueMirror:
+    """
+    SQLite copy of the issues of a set of projects, kept current with
+    incremental syncs.
+
+    """
+    def __init__(self, jira, path, projects, page_size=100,
+                 full_sync_seconds=None):
+        """
+        Inputs:
+        :jira:      connected JIRA client, used for syncing and to build the
+                    Issue objects returned by searches
+        :path:      SQLite file. ":memory:" keeps the mirror for one run only
+        :projects:  keys of the projects to mirror
+        :page_size: issues downloaded per search request when syncing
+        :full_sync_seconds: a sync this long after the last full one is a
+                    full sync, dropping deleted and moved issues. None for
+                    only the first sync
+
+        """
+        self.jira = jira
+        self.path = path
+        self.projects = sorted(projects)
+        self.page_size = page_size
+        self.full_sync_seconds = full_sync_seconds
+        # set when the client writes to Jira, so the next search syncs first
+        self.dirty = False
+        # a mirror opened from disk holds what the last process left behind,
+        # so the first search of every process syncs
+        self.synced = False
+        self._tz = None
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    @classmethod
+    def from_settings(cls, jira):
+        """
+        Returns the mirror configured in settings (mirror_path and
+        mirror_projects), tracking the client's writes, or None when
+        settings.mirror_path is not set.
+
+        """
+        if not getattr(settings, "mirror_path", None):
+            return None
+        return cls(jira, settings.mirror_path, settings.mirror_projects,
+                   full_sync_seconds=getattr(settings, "mirror_full_sync_seconds",
+                                             None)).track(jira.instrumentation)
+
+    def track(self, instrumentation):
+        """
+        Marks the mirror out of date whenever the client writes to Jira.
+
+        """
+        instrumentation.add_hook(post=self._saw_request)
+        return self
+
+    def _saw_request(self, event):
+        if event["method"] not in ("GET", "HEAD", "OPTIONS"):
+            self.dirty = True
+
+    @property
+    def last_updated(self):
+        """
+        Newest issue update in the mirror (UTC, "YYYY-MM-DD HH:MM:SS"), or
+        None before the first sync.
+
+        """
+        return self._meta("last_updated")
+
+    def sync(self, full=False):
+        """
+        Brings the mirror up to date.
+
+        A full sync (the first one, after the project list changed, or
+        full_sync_seconds after the last full one) downloads every issue and
+        drops the ones Jira no longer returns. Otherwise the issues updated
+        since the newest update in the mirror are listed with just their
+        update time, and only the ones that differ from the mirror are
+        downloaded; deleted and moved issues are only noticed by a full sync.
+        Returns: number of issues downloaded
+
+        """
+        with self._lock:
+            self.dirty = False
+            if self._meta("projects") != ",".join(self.projects):
+                full = True
+            full_synced = float(self._meta("full_synced") or 0)
+            if (self.full_sync_seconds is not None and
+                    time.time() - full_synced >= self.full_sync_seconds):
+                full = True
+            jql = "project in ({})".format(
+                ", ".join(quote(project) for project in self.projects))
+            since = None if full else self.last_updated
+            if since is not None:
+                jql = compose(jql, 'updated >= "{}"'.format(
+                    self._jira_time(since)))
+            jql += " ORDER BY updated ASC"
+
+            seen = set()
+            newest = since
+            if since is not None:
+                changed = [raw["key"] for raw in self._pages(jql, "updated")
+                           if _utc(raw["fields"].get("updated")) !=
+                           self._updated(raw["key"])]
+                pages = (self._pages("key in ({})".format(", ".join(
+                    changed[i:i + self.page_size])), expand="changelog")
+                    for i in range(0, len(changed), self.page_size))
+                issues = (raw for page in pages for raw in page)
+            else:
+                issues = self._pages(jql, expand="changelog")
+            for raw in issues:
+                updated = self._store(raw)
+                seen.add(raw["key"])
+                if updated and (newest is None or updated > newest):
+                    newest = updated
+
+            if full:
+                stale = [key for key, in self._db.execute(
+                    "SELECT key FROM issues") if key not in seen]
+                self._db.executemany("DELETE FROM issues WHERE key = ?",
+                                     [(key,) for key in stale])
+                self._db.executemany("DELETE FROM labels WHERE key = ?",
+                                     [(key,) for key in stale])
+            self._set_meta("projects", ",".join(self.projects))
+            if full:
+                self._set_meta("full_synced", str(time.time()))
+            if newest is not None:
+                self._set_meta("last_updated", newest)
+            self._db.commit()
+            self.synced = True
+            logging.info("mirror: %s sync downloaded %d issues",
+                         "full" if full else "incremental", len(seen))
+            return len(seen)
+
+    def ensure_fresh(self):
+        """
+        Syncs if this process has not synced the mirror yet or the client
+        wrote since.
+
+        """
+        if self.dirty or not self.synced:
+            self.sync()
+
+    def search_issues(self, jql_str, startAt=0, maxResults=50,
+                      validate_query=True, fields=None, expand=None,
+                      json_result=None):
+        """
+        Same as JIRA.search_issues, answered from the mirror. The fields
+        argument is ignored: mirrored issues always carry all their fields.
+        The changelog is included when expand asks for it.
+        Raises UnsupportedQuery for JQL the mirror cannot evaluate.
+
+        """
+        where, params, order = _Translator(self._timezone(), self.projects).translate(jql_str)
+        self.ensure_fresh()
+        with self._lock:
+            total = self._db.execute(
+                "SELECT COUNT(*) FROM issues WHERE " + where, params
+                ).fetchone()[0]
+            sql = "SELECT raw FROM issues WHERE {} ORDER BY {}".format(
+                where, order)
+            limit = maxResults if maxResults else -1
+            rows = self._db.execute(sql + " LIMIT ? OFFSET ?",
+                                    params + [limit, startAt]).fetchall()
+        raws = []
+        for raw, in rows:
+            raw = json.loads(raw)
+            if "changelog" not in (expand or ""):
+                raw.pop("changelog", None)
+            raws.append(raw)
+        if json_result:
+            return {"startAt": startAt, "maxResults": maxResults,
+                    "total": total, "issues": raws}
+        return ResultList(
+            [Issue(self.jira._options, self.jira._session, raw=raw)
+             for raw in raws],
+            startAt, maxResults, total)
+
+    def count(self, jql_str):
+        """
+        Returns the number of mirrored issues matching a JQL query.
+        Raises UnsupportedQuery for JQL the mirror cannot evaluate.
+
+        """
+        where, params, _ = _Translator(self._timezone(), self.projects).translate(jql_str)
+        self.ensure_fresh()
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM issues WHERE " + where, params
+                ).fetchone()[0]
+
+    def count_by(self, jql_str, field, values):
+        """
+        Returns the number of mirrored issues matching a JQL query for each
+        of the values of a field, like JIRA.count_by. Raises UnsupportedQuery
+        for JQL the mirror cannot evaluate and for fields it cannot group by.
+
+        """
+        column = COLUMNS.get(field.lower())
+        if column is None or column in DATES:
+            raise UnsupportedQuery("Cannot count by {}".format(field))
+        where, params, _ = _Translator(self._timezone(), self.projects).translate(jql_str)
+        self.ensure_fresh()
+        with self._lock:
+            counts = dict(self._db.execute(
+                "SELECT {0}, COUNT(*) FROM issues WHERE {1} GROUP BY {0}"
+                .format(column, where), params))
+        return {value: counts.get(value, 0) for value in values}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _pages(self, jql, fields=None, expand=None):
+        """
+        Yields the raw issues of a search, a page at a time.
+
+        """
+        start = 0
+        while True:
+            page = self.jira.search_issues(
+                jql, startAt=start, maxResults=self.page_size, fields=fields,
+                expand=expand, json_result=True)
+            for raw in page["issues"]:
+                yield raw
+            start += len(page["issues"])
+            if not page["issues"] or start >= page["total"]:
+                return
+
+    def _updated(self, key):
+        row = self._db.execute("SELECT updated FROM issues WHERE key = ?",
+                               (key,)).fetchone()
+        return row[0] if row else None
+
+    def _store(self, raw):
+        fields = raw.get("fields") or {}
+        key = raw["key"]
+        project = key.rsplit("-", 1)[0]
+        updated = _utc(fields.get("updated"))
+        self._db.execute(
+            "INSERT OR REPLACE INTO issues VALUES "
+            "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, int(raw["id"]), project, int(key.rsplit("-", 1)[1]),
+             _name(fields.get("issuetype")), _name(fields.get("status")),
+             _name(fields.get("resolution")), _account(fields.get("assignee")),
+             _account(fields.get("reporter")), _utc(fields.get("created")),
+             updated, _utc(fields.get("resolutiondate")), json.dumps(raw)))
+        self._db.execute("DELETE FROM labels WHERE key = ?", (key,))
+        self._db.executemany("INSERT OR IGNORE INTO labels VALUES (?, ?)",
+                             [(key, label) for label
+                              in fields.get("labels") or ()])
+        return updated
+
+    def _meta(self, name):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE name = ?",
+                                   (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                         (name, value))
+
+    def _timezone(self):
+        """
+        The time zone Jira reads JQL dates in: the one of the user the
+        client is logged in as.
+
+        """
+        if self._tz is None:
+            name = self.jira.myself().get("timeZone")
+            self._tz = timezone.utc
+            if name and ZoneInfo is not None:
+                try:
+                    self._tz = ZoneInfo(name)
+                except (KeyError, ValueError):
+                    logging.warning("mirror: unknown time zone %s, using UTC",
+                                    name)
+        return self._tz
+
+    def _jira_time(self, utc_text):
+        moment = datetime.strptime(utc_text, "%Y-%m-%d %H:%M:%S.%f").replace(
+            tzinfo=timezone.utc)
+        # JQL dates have minute precision; the mirror re-reads issues updated
+        # in the same minute as the newest one it has
+        return moment.astimezone(self._timezone()).strftime("%Y/%m/%d %H:%M")
+
+
+def search(jira, mirror, jql_str, **kwargs):
+    """
+    Runs a search against the mirror when there is one and it can evaluate
+    the query, and against Jira otherwise. Takes the arguments of
+    JIRA.search_issues.
+
+    """
+    if mirror is not None:
+        try:
+            return mirror.search_issues(jql_str, **kwargs)
+        except UnsupportedQuery as e:
+            logging.info("mirror: asking Jira for %r: %s", jql_str, e)
+    return jira.search_issues(jql_str, **kwargs)
+
+
+def count(jira, mirror, jql_str):
+    """
+    Counts the issues matching a query with the mirror when there is one and
+    it can evaluate the query, and with Jira otherwise.
+
+    """
+    if mirror is not None:
+        try:
+            return mirror.count(jql_str)
+        except UnsupportedQuery as e:
+            logging.info("mirror: asking Jira to count %r: %s", jql_str, e)
+    return jira.count(jql_str)
+
+
+def count_by(jira, mirror, jql_str, field, values):
+    """
+    Counts the issues matching a query for each value of a field, with the
+    mirror when there is one and it can evaluate the query, and with Jira
+    otherwise. Takes the arguments of JIRA.count_by.
+
+    """
+    if mirror is not None:
+        try:
+            return mirror.count_by(jql_str, field, values)
+        except UnsupportedQuery as e:
+            logging.info("mirror: asking Jira to count %r by %s: %s",
+                         jql_str, field, e)
+    return jira.count_by(jql_str, field, values)
+
+
+def _name(value):
+    return value.get("name") if value else None
+
+
+def _account(user):
+    return user.get("accountId") if user else None
+
+
+def _utc(timestamp):
+    """
+    Converts a Jira timestamp (2019-01-05T03:00:00.000+0000) to UTC text
+    that sorts and compares chronologically, keeping the milliseconds.
+
+    """
+    if not timestamp:
+        return None
+    moment = datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%f%z")
+    return _utc_text(moment)
+
+
+def _utc_text(moment):
+    return moment.astimezone(timezone.utc).strftime(
+        "%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+TOKEN = re.compile(r'''\s*(?:
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<op>!=|>=|<=|!~|=|~|>|<|\(|\)|,)
+  | (?P<word>[^\s"'(),=!<>~]+(?:\(\))?)
+)''', re.X)
+
+# JQL field -> issues column
+COLUMNS = {
+    "project": "project",
+    "key": "key",
+    "issuekey": "key",
+    "issuetype": "issuetype",
+    "type": "issuetype",
+    "status": "status",
+    "resolution": "resolution",
+    "assignee": "assignee",
+    "reporter": "reporter",
+    "created": "created",
+    "createddate": "created",
+    "updated": "updated",
+    "updateddate": "updated",
+    "resolutiondate": "resolutiondate",
+    "resolved": "resolutiondate",
+    }
+DATES = ("created", "updated", "resolutiondate")
+RELATIVE = re.compile(r"^([-+]?)(\d+)([mhdw])$")
+UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+ANY_LABEL = "EXISTS (SELECT 1 FROM labels l WHERE l.key = issues.key)"
+# fields the mirror stores by name, where Jira also accepts numeric ids
+NAMED = ("project", "issuetype", "status", "resolution")
+
+
+class _Translator:
+    """
+    Translates the subset of JQL the scripts use into an SQL WHERE clause,
+    its parameters and an ORDER BY clause.
+
+    Every part of the query returns its SQL with the set of projects it
+    limits the issues to (None when it does not), so queries that could
+    match issues outside the mirrored projects are refused.
+
+    """
+    def __init__(self, tz, projects):
+        self.tz = tz
+        self.projects = set(project.upper() for project in projects)
+
+    def translate(self, jql):
+        self.tokens = self._tokenize(jql)
+        self.pos = 0
+        self.params = []
+        where, projects = "1", None
+        if self._peek() and not self._peek_word("ORDER"):
+            where, projects = self._or()
+        if projects is None or not projects <= self.projects:
+            raise UnsupportedQuery(
+                "{!r} is not limited to the mirrored projects".format(jql))
+        order = "id ASC"
+        if self._peek_word("ORDER"):
+            self._next()
+            self._expect_word("BY")
+            order = self._order_by()
+        if self._peek() is not None:
+            raise UnsupportedQuery("Unexpected {!r} in {!r}".format(
+                self._peek()[1], jql))
+        return where, self.params, order
+
+    def _tokenize(self, jql):
+        tokens, pos = [], 0
+        jql = jql.strip()
+        while pos < len(jql):
+            match = TOKEN.match(jql, pos)
+            if not match or match.end() == pos:
+                raise UnsupportedQuery("Cannot read {!r}".format(jql[pos:]))
+            pos = match.end()
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "string":
+                value = re.sub(r"\\(.)", r"\1", value[1:-1])
+            tokens.append((kind, value))
+        return tokens
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _peek_word(self, word):
+        token = self._peek()
+        return (token is not None and token[0] == "word"
+                and token[1].upper() == word)
+
+    def _peek_op(self, op):
+        token = self._peek()
+        return token is not None and token[0] == "op" and token[1] == op
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise UnsupportedQuery("Unexpected end of query")
+        self.pos += 1
+        return token
+
+    def _expect_word(self, word):
+        if not self._peek_word(word):
+            raise UnsupportedQuery("Expected {}".format(word))
+        self._next()
+
+    def _expect_op(self, op):
+        if not self._peek_op(op):
+            raise UnsupportedQuery("Expected {}".format(op))
+        self._next()
+
+    def _or(self):
+        parts = [self._and()]
+        while self._peek_word("OR"):
+            self._next()
+            parts.append(self._and())
+        if len(parts) == 1:
+            return parts[0]
+        # either side may match, so both must be limited
+        projects = [p for _, p in parts]
+        return "({})".format(" OR ".join(sql for sql, _ in parts)), (
+            None if None in projects else set.union(*projects))
+
+    def _and(self):
+        parts = [self._not()]
+        while self._peek_word("AND"):
+            self._next()
+            parts.append(self._not())
+        if len(parts) == 1:
+            return parts[0]
+        # one limited side limits the whole
+        projects = [p for _, p in parts if p is not None]
+        return "({})".format(" AND ".join(sql for sql, _ in parts)), (
+            set.intersection(*projects) if projects else None)
+
+    def _not(self):
+        if self._peek_word("NOT"):
+            self._next()
+            return "NOT {}".format(self._not()[0]), None
+        if self._peek_op("("):
+            self._next()
+            inner, projects = self._or()
+            self._expect_op(")")
+            return "({})".format(inner), projects
+        return self._clause()
+
+    def _clause(self):
+        kind, field = self._next()
+        field = field.lower()
+        if field != "labels" and field not in COLUMNS:
+            raise UnsupportedQuery("Field {} is not mirrored".format(field))
+        sql = self._condition(field)
+        if field == "project" and self._limit is not None:
+            return sql, self._limit
+        return sql, None
+
+    def _condition(self, field):
+        # project = X and project in (X, Y) limit the projects searched
+        self._limit = None
+
+        if self._peek_word("IS"):
+            self._next()
+            negate = self._peek_word("NOT")
+            if negate:
+                self._next()
+            if not (self._peek_word("EMPTY") or self._peek_word("NULL")):
+                raise UnsupportedQuery("Expected EMPTY after IS")
+            self._next()
+            return self._empty(field, negate)
+        if self._peek_word("NOT") or self._peek_word("IN"):
+            negate = self._peek_word("NOT")
+            if negate:
+                self._next()
+            self._expect_word("IN")
+            values = self._values()
+            if not negate:
+                self._limit = set(value.upper() for value in values)
+            return self._in(field, values, negate)
+        if not self._peek() or self._peek()[0] != "op":
+            raise UnsupportedQuery("Unsupported operator {!r}".format(
+                self._peek() and self._peek()[1]))
+        op = self._next()[1]
+        if op in ("~", "!~"):
+            raise UnsupportedQuery("Text search is not mirrored")
+        value = self._value()
+        if COLUMNS.get(field) in DATES:
+            return self._date(COLUMNS[field], op, value)
+        if op not in ("=", "!="):
+            raise UnsupportedQuery("{} {} is not supported".format(field, op))
+        if value.upper() in ("EMPTY", "NULL"):
+            return self._empty(field, op == "!=")
+        if op == "=":
+            self._limit = set([value.upper()])
+        return self._in(field, [value], op == "!=")
+
+    def _value(self):
+        kind, value = self._next()
+        if kind == "op":
+            raise UnsupportedQuery("Unexpected {!r}".format(value))
+        if kind == "word" and value.endswith("()"):
+            raise UnsupportedQuery("Function {} is not mirrored".format(value))
+        return value
+
+    def _values(self):
+        if self._peek() and self._peek()[0] == "word":
+            raise UnsupportedQuery("Function {} is not mirrored".format(
+                self._peek()[1]))
+        self._expect_op("(")
+        values = [self._value()]
+        while self._peek_op(","):
+            self._next()
+            values.append(self._value())
+        self._expect_op(")")
+        return values
+
+    def _empty(self, field, negate):
+        if field == "labels":
+            return ANY_LABEL if negate else "NOT " + ANY_LABEL
+        return "{} IS {}NULL".format(COLUMNS[field], "NOT " if negate else "")
+
+    def _in(self, field, values, negate):
+        if COLUMNS.get(field) in NAMED and any(value.isdigit() for value in values):
+            raise UnsupportedQuery("{} ids are not mirrored".format(field))
+        marks = ", ".join("?" for _ in values)
+        if field == "labels":
+            self.params.extend(values)
+            has = ("EXISTS (SELECT 1 FROM labels l WHERE l.key = issues.key "
+                   "AND l.label IN ({}))".format(marks))
+            # like Jira, != and not in leave out issues without labels
+            return "({} AND NOT {})".format(ANY_LABEL, has) if negate else has
+        column = COLUMNS[field]
+        if column in DATES:
+            raise UnsupportedQuery("{} IN is not supported".format(field))
+        if column == "resolution":
+            unresolved = [v for v in values if v.lower() == "unresolved"]
+            values = [v for v in values if v.lower() != "unresolved"]
+            if unresolved:
+                clause = "resolution IS NULL"
+                if values:
+                    clause = "({} OR {})".format(
+                        clause, self._in(field, values, False))
+                return "NOT {}".format(clause) if negate else clause
+        self.params.extend(values)
+        # NULLs never compare, so != and not in leave out empty fields like
+        # Jira does
+        return "{} COLLATE NOCASE {}IN ({})".format(
+            column, "NOT " if negate else "", marks)
+
+    def _date(self, column, op, value):
+        if op not in (">=", ">", "<=", "<", "="):
+            raise UnsupportedQuery("{} {} is not supported".format(column, op))
+        self.params.append(self._moment(value))
+        return "{} {} ?".format(column, op)
+
+    def _moment(self, value):
+        relative = RELATIVE.match(value.strip())
+        if relative:
+            sign, amount, unit = relative.groups()
+            delta = timedelta(**{UNITS[unit]: int(amount)})
+            moment = datetime.now(timezone.utc) + (-delta if sign == "-"
+                                                  else delta)
+        else:
+            for pattern in ("%Y/%m/%d %H:%M", "%Y-%m-%d %H:%M",
+                            "%Y/%m/%d", "%Y-%m-%d"):
+                try:
+                    moment = datetime.strptime(value.strip(), pattern)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise UnsupportedQuery("Cannot read date {!r}".format(value))
+            moment = moment.replace(tzinfo=self.tz)
+        return _utc_text(moment)
+
+    def _order_by(self):
+        orders = []
+        while True:
+            field = self._next()[1].lower()
+            if field in ("key", "issuekey"):
+                columns = ["project", "number"]
+            elif field in COLUMNS:
+                columns = [COLUMNS[field]]
+            else:
+                raise UnsupportedQuery("Cannot order by {}".format(field))
+            direction = "ASC"
+            if self._peek_word("ASC") or self._peek_word("DESC"):
+                direction = self._next()[1].upper()
+            orders.extend("{} {}".format(column, direction)
+                          for column in columns)
+            if not self._peek_op(","):
+                return ", ".join(orders + ["id ASC"])
+            self._next()
@@ -4,6 +4,7 @@ Script for generating monthly stats out of Jira.
 """
 from datetime import datetime
 from jira.client import JIRA
+from mirror import IssueMirror, count
 import secrets
 
 class MonthlyCount:
@@ -12,6 +13,8 @@ class MonthlyCount:
         options=secrets.options
         housekeeping_auth=secrets.housekeeping_auth
         self.jira = JIRA(options=options, basic_auth=housekeeping_auth)
+        # counts come from the local issue mirror when one is configured
+        self.mirror = IssueMirror.from_settings(self.jira)
 
         for search in secrets.monthlySearches:
             self.get_count(search["jql"],search["label"])
@@ -41,18 +44,11 @@ class MonthlyCount:
         end_date = "{}-{}-01".format(end_year,end_month)
         query = '{} and resolutiondate >= "{}" and resolutiondate < "{}"'.format(query,start_date,end_date)
 
-        # retrieve data. Loop until there are less than 100 results (API limit)
-        start = 0
-        issues = self.jira.search_issues(query,maxResults=100,startAt=start)
-        issue_count = len(issues)
-        total = issue_count
-        while issue_count==100:
-            start += 100
-            issues = self.jira.search_issues(query,maxResults=100,startAt=start)
-            issue_count = len(issues)
-            total += issue_count
+        # only the total is needed, so no issues are downloaded
+        total = count(self.jira,self.mirror,query)
 
         #print the output. Super fancy.
         print ("{}: {}".format(total,label))
 
-MonthlyCount()
+if __name__ == "__main__":
+    MonthlyCount()
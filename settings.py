@@ -9,3 +9,67 @@ member_setup_strs=[
     "new member set up",
     "new member"
     ]
+
+# every group the housekeeping jobs look up. They are downloaded once per run
+# into a membership index
+housekeeping_groups=[
+    "member-services",
+    "membership-development",
+    "issue audits",
+    "issue audits lead",
+    "content-acquisition",
+    "content-acquisition-free",
+    "free-index-default",
+    "mer-assignees",
+    "mer-auto-watch",
+    "se-assignees",
+    ]
+
+# request and wall time budget per housekeeping job. Issues a job has not
+# reached when its budget runs out are left for the next run. None = no limit
+job_budgets={
+    "default": {"max_requests": 1500, "max_seconds": 600},
+    "auto_assign": {"max_requests": 3000, "max_seconds": 900},
+    }
+
+# issues a housekeeping job handles at the same time (see executor.py). Jobs that balance assignments
+# across a group count open issues per user, so they always run one at a time
+job_workers={
+    "default": 5,
+    }
+
+# local SQLite copy of the issues of these projects, answering the scripts'
+# searches (see mirror.py). None to always search Jira
+mirror_path=None
+mirror_projects=["INDEXREP", "ADT", "FCA", "MER", "SE"]
+# seconds between full syncs of the mirror, which drop issues deleted or
+# moved out of the mirrored projects. None for only the first sync
+mirror_full_sync_seconds=24*3600
+
+# housekeeping jobs run by webhook.py for the issue of a Jira webhook event.
+# A rule matches the event name and, with a field, a change setting that field
+# to "to" (None: emptied). Jobs run after "delay" seconds, for filters that
+# wait a while after a change
+webhook_routes=[
+    {"event": "jira:issue_created", "jobs": ["auto_assign"]},
+    {"event": "jira:issue_updated", "field": "assignee", "to": None,
+     "jobs": ["auto_assign"]},
+    {"event": "jira:issue_updated", "field": "status", "to": "Merged",
+     "jobs": ["content_acquisition_auto_qc"], "delay": 1800},
+    {"event": "jira:issue_updated", "field": "status", "to": "Resolved",
+     "jobs": ["resolved_issue_audit"]},
+    {"event": "jira:issue_updated", "field": "status", "to": "Failed Audit",
+     "jobs": ["handle_audited_tickets"]},
+    {"event": "jira:issue_updated", "field": "resolution", "to": None,
+     "jobs": ["clear_auto_close_label"]},
+    ]
+
+# seconds between runs of each job in daemon.py, and between refreshes of what
+# the daemon keeps from one run to the next (groups, labels, filters,
+# transitions)
+job_intervals={
+    "default": 900,
+    "auto_assign": 60,
+    "content_acquisition_auto_qc": 300,
+    }
+daemon_refresh_seconds=3600
@@ -0,0 +1,57 @@
+"""
+Shared setup for the tests. See README for license info.
+
+The tests run the scripts against benchmarks/fakejira.py, with this repo's
+client.py installed as jira.client the way run.py does it.
+
+"""
+import importlib
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import fakejira  # noqa: E402
+import run  # noqa: E402
+
+run.install_client()
+run.skip_reload_delay()
+
+
+def script(name, fake):
+    """
+    Imports a script module anew against a FakeJira, so it binds the secrets
+    pointing at that server.
+
+    """
+    run.install_secrets(fake)
+    sys.modules.pop(name, None)
+    return importlib.import_module(name)
+
+
+def quietly(fn, *args, **kwargs):
+    """
+    Calls fn with its prints swallowed.
+
+    """
+    with redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def issue_state(dataset):
+    """
+    Returns what the housekeeping jobs change on each issue of a dataset.
+
+    """
+    return dict(
+        (key, ((issue["fields"].get("assignee") or {}).get("accountId"),
+               issue["fields"]["status"]["name"],
+               sorted(issue["fields"]["labels"]),
+               sorted(issue["watchers"]),
+               [comment["body"] for comment in issue["comments"]]))
+        for key, issue in dataset.issues.items())
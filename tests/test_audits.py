@@ -0,0 +1,39 @@
+"""
+Tests of the audit ticket jobs. See README for license info.
+
+"""
+import unittest
+
+import support  # noqa: F401
+from support import fakejira, quietly, script
+
+from jira.exceptions import JIRAError
+
+
+class FailedAuditTest(unittest.TestCase):
+    def test_source_stays_open_when_a_link_fails(self):
+        dataset = fakejira.Dataset(issues=100)
+        failed = sorted(key for key, issue in dataset.issues.items()
+                        if key.startswith("ADT-")
+                        and issue["fields"]["status"]["name"] == "Failed Audit")
+        self.assertTrue(failed)
+        # links to an issue that was deleted since
+        dataset.issues[failed[0]]["fields"]["issuelinks"] = [
+            {"id": "1", "outwardIssue": {"key": "MER-9999"}}]
+        with fakejira.FakeJira(dataset) as fake:
+            jiratools = script("jiratools", fake)
+            housekeeping = quietly(jiratools.Housekeeping, run=False)
+            with self.assertRaises(JIRAError):
+                quietly(housekeeping.run_job, "handle_audited_tickets",
+                        [failed[0]])
+            housekeeping.jira.close()
+        self.assertEqual(
+            dataset.issues[failed[0]]["fields"]["status"]["name"],
+            "Failed Audit")
+        # the new ticket was still made, with its other link
+        self.assertIn(failed[0], [link["outwardIssue"]["key"]
+                                  for link in dataset.links])
+
+
+if __name__ == "__main__":
+    unittest.main()
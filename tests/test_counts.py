@@ -0,0 +1,101 @@
+"""
+Tests of JIRA.count_by. See README for license info.
+
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import support
+from support import fakejira
+
+from jira.client import JIRA
+
+QUERY = 'project = INDEXREP AND resolution is EMPTY ORDER BY created DESC'
+
+
+class CountByTest(unittest.TestCase):
+    def setUp(self):
+        self.fake = fakejira.FakeJira(fakejira.Dataset(issues=500)).start()
+        self.jira = JIRA(options={"server": self.fake.url},
+                         basic_auth=("test", "test"))
+        self.users = sorted(self.fake.dataset.users)[:6] + [None]
+
+    def tearDown(self):
+        self.jira.close()
+        self.fake.stop()
+
+    def requests(self):
+        return sum(stat["requests"] for stat in self.fake.snapshot().values())
+
+    def expected(self):
+        counts = dict.fromkeys(self.users, 0)
+        for issue in self.fake.dataset.search(QUERY):
+            assignee = (issue["fields"]["assignee"] or {}).get("accountId")
+            if assignee in counts:
+                counts[assignee] += 1
+        return counts
+
+    def test_one_search(self):
+        before = self.requests()
+        self.assertEqual(self.jira.count_by(QUERY, "assignee", self.users),
+                         self.expected())
+        self.assertLess(self.requests() - before, len(self.users))
+
+    def test_count_per_value(self):
+        # the unassigned issues take more pages than there are values
+        unassigned = sum(1 for issue in self.fake.dataset.issues.values()
+                         if issue["fields"]["assignee"] is None)
+        self.assertGreater(unassigned, 100)
+        before = self.requests()
+        self.assertEqual(self.jira.count_by("project != NONE", "assignee",
+                                            [None]), {None: unassigned})
+        # the first page of the search and one count
+        self.assertEqual(self.requests() - before, 2)
+
+    def test_values_without_issues(self):
+        names = ["User %d" % n for n in range(3)]
+        before = self.requests()
+        self.assertEqual(self.jira.count_by(QUERY, "assignee", names),
+                         dict.fromkeys(names, 0))
+        self.assertEqual(self.requests() - before, 1)
+
+    def test_tally_decides_on_the_first_page(self):
+        def page(*values):
+            return {"total": 3, "maxResults": 2, "issues": [
+                {"fields": {"assignee": {"accountId": value}}}
+                for value in values]}
+
+        # a later page with a value not asked for is skipped
+        with mock.patch.object(self.jira, "_get_json",
+                               side_effect=[page("a", "b"), page("c")]):
+            self.assertEqual(self.jira._tally_by("project = A", "assignee",
+                                                 ["a", "b"]),
+                             {"a": 1, "b": 1})
+        # values on the first page that were not asked for fall back to
+        # counting per value
+        with mock.patch.object(self.jira, "_get_json",
+                               side_effect=[page("a", "c")]) as get:
+            self.assertIsNone(self.jira._tally_by("project = A", "assignee",
+                                                  ["a", "b"]))
+            self.assertEqual(get.call_count, 1)
+
+    def test_client_does_not_import_the_scripts(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        shutil.copy(os.path.join(support.ROOT, "client.py"), directory)
+        subprocess.check_call([sys.executable, "-c", "import client"],
+                              cwd=directory)
+
+    def test_no_values(self):
+        before = self.requests()
+        self.assertEqual(self.jira.count_by(QUERY, "assignee", []), {})
+        self.assertEqual(self.requests(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Tests of resumable downloads. See README for license info.
+
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import support
+from support import fakejira
+
+from jira.client import JIRA
+from jira.exceptions import JIRAError
+
+CONTENT = os.urandom(200000)
+
+
+class DownloadTest(unittest.TestCase):
+    def setUp(self):
+        self.fake = fakejira.FakeJira(fakejira.Dataset(issues=5)).start()
+        self.jira = JIRA(options={"server": self.fake.url},
+                         basic_auth=("test", "test"))
+        issue = sorted(self.fake.dataset.issues)[0]
+        attachment = self.jira.add_attachment(issue, io.BytesIO(CONTENT),
+                                              "feed.xml")
+        self.url = attachment.content
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "feed.xml")
+        # no backoff between retries
+        patcher = mock.patch("jira.resilientsession.time.sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.jira.close()
+        self.fake.stop()
+        shutil.rmtree(self.directory)
+
+    def write_part(self, data):
+        with open(self.path + ".part", "wb") as f:
+            f.write(data)
+
+    def test_resumes_partial_download(self):
+        self.write_part(CONTENT[:1000])
+        digest = hashlib.sha256()
+        written = self.jira._download_to_file(self.url, self.path, digest=digest)
+        self.assertEqual(written, len(CONTENT) - 1000)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), CONTENT)
+        self.assertEqual(digest.hexdigest(), hashlib.sha256(CONTENT).hexdigest())
+
+    def test_complete_part_of_unknown_size_finishes(self):
+        self.write_part(CONTENT)
+        digest = hashlib.sha256()
+        self.assertEqual(self.jira._download_to_file(self.url, self.path,
+                                                     digest=digest), 0)
+        self.assertFalse(os.path.exists(self.path + ".part"))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), CONTENT)
+        self.assertEqual(digest.hexdigest(), hashlib.sha256(CONTENT).hexdigest())
+
+    def test_part_longer_than_the_file_is_dropped(self):
+        self.write_part(CONTENT + b"stale")
+        with self.assertRaises(JIRAError) as raised:
+            self.jira._download_to_file(self.url, self.path)
+        self.assertEqual(raised.exception.status_code, 416)
+        self.assertFalse(os.path.exists(self.path + ".part"))
+
+    def test_unavailable_server_is_retried(self):
+        self.write_part(CONTENT[:1000])
+        self.fake.fail_next(503, 2)
+        self.jira._download_to_file(self.url, self.path)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), CONTENT)
+
+
+if __name__ == "__main__":
+    unittest.main()
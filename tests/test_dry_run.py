@@ -0,0 +1,76 @@
+"""
+Tests of dry-run plans. See README for license info.
+
+"""
+import unittest
+
+import support
+from support import fakejira, quietly, script
+
+from client import WritePlan
+from jira.client import JIRA
+from jira.exceptions import JIRAError
+
+# jobs whose reads do not depend on their own writes, so a plan of them sends
+# the same writes a direct run makes
+INDEPENDENT = ["content_acquisition_auto_qc", "remind_reporter_to_close",
+               "close_resolved"]
+
+
+class ReplayTest(unittest.TestCase):
+    def direct(self, jobs):
+        dataset = fakejira.Dataset(issues=100)
+        with fakejira.FakeJira(dataset) as fake:
+            jiratools = script("jiratools", fake)
+            housekeeping = quietly(jiratools.Housekeeping, run=False)
+            quietly(housekeeping.run, jobs)
+            housekeeping.jira.close()
+        return support.issue_state(dataset)
+
+    def replayed(self, jobs):
+        dataset = fakejira.Dataset(issues=100)
+        with fakejira.FakeJira(dataset) as fake:
+            jiratools = script("jiratools", fake)
+            housekeeping = quietly(jiratools.Housekeeping, run=False,
+                                   dry_run=True)
+            quietly(housekeeping.run, jobs)
+            plan = WritePlan(housekeeping.jira.write_plan.entries)
+            housekeeping.jira.close()
+            self.assertEqual(support.issue_state(dataset),
+                             support.issue_state(fakejira.Dataset(issues=100)),
+                             "the dry run wrote to the server")
+            jira = JIRA(options={"server": fake.url},
+                        basic_auth=("test", "test"))
+            results = plan.replay(jira)
+            jira.close()
+        self.assertTrue(results)
+        self.assertEqual([error for _, _, error in results if error], [])
+        return support.issue_state(dataset)
+
+    def test_replay_matches_direct_run(self):
+        for job in INDEPENDENT:
+            self.assertEqual(self.replayed([job]), self.direct([job]), job)
+
+
+class PlaceholderTest(unittest.TestCase):
+    def test_reads_of_a_planned_issue(self):
+        with fakejira.FakeJira(fakejira.Dataset(issues=5)) as fake:
+            jira = JIRA(options={"server": fake.url, "dry_run": True},
+                        basic_auth=("test", "test"))
+            issue = jira.create_issue(fields={
+                "project": {"key": "MER"}, "summary": "planned",
+                "issuetype": {"name": "Task"}})
+            self.assertEqual(issue.key, "DRYRUN-1")
+            self.assertEqual(jira.issue(issue.key).fields.summary, "planned")
+            self.assertEqual(jira.transitions(issue.key), [])
+            self.assertEqual(jira.watchers(issue.key).watchers, [])
+            self.assertEqual(jira.comments(issue.key), [])
+            self.assertEqual(jira.remote_links(issue.key), [])
+            with self.assertRaises(JIRAError) as raised:
+                jira._get_json("issue/DRYRUN-1/properties")
+            self.assertIn("Dry run", raised.exception.text)
+            jira.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Tests of the per-issue executor. See README for license info.
+
+"""
+import threading
+import time
+import unittest
+
+import support  # noqa: F401
+
+from jira.client import Instrumentation
+
+from executor import IssueExecutor, on_worker
+
+
+class ExecutorTest(unittest.TestCase):
+    def test_results_in_given_order(self):
+        executor = IssueExecutor("job", Instrumentation(), workers=4)
+        # later issues finish first
+        results = executor.map(lambda n: time.sleep(0.01 * (5 - n)) or n * 2,
+                               range(5))
+        self.assertEqual([r.result for r in results], [0, 2, 4, 6, 8])
+        self.assertEqual(executor.processed, 5)
+
+    def test_failures_are_counted(self):
+        executor = IssueExecutor("job", Instrumentation(), workers=3)
+        results = executor.map(lambda n: 1 // (n % 2), range(6))
+        self.assertEqual(executor.failed, 3)
+        self.assertEqual([r.error is None for r in results],
+                         [False, True] * 3)
+
+    def test_on_worker(self):
+        seen = []
+
+        def record(issue):
+            seen.append((issue, on_worker(),
+                         threading.current_thread() is threading.main_thread()))
+
+        IssueExecutor("job", Instrumentation(), workers=1).map(record, ["A"])
+        IssueExecutor("job", Instrumentation(), workers=2).map(record, ["B", "C"])
+        self.assertEqual(sorted(seen), [("A", False, True), ("B", True, False),
+                                        ("C", True, False)])
+        self.assertFalse(on_worker())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""
+Tests of JIRA.group_members. See README for license info.
+
+"""
+import unittest
+
+import support  # noqa: F401
+from support import fakejira
+
+from jira.client import JIRA
+
+
+class GroupMembersTest(unittest.TestCase):
+    def members(self, group_page):
+        dataset = fakejira.Dataset(issues=0, users=300, group_size=237)
+        group = sorted(dataset.groups)[0]
+        with fakejira.FakeJira(dataset) as fake:
+            fake.group_page = group_page
+            jira = JIRA(options={"server": fake.url},
+                        basic_auth=("test", "test"))
+            members = jira.group_members(group)
+            jira.close()
+        self.assertEqual(sorted(members), dataset.groups[group])
+
+    def test_full_windows(self):
+        self.members(50)
+
+    def test_short_windows(self):
+        # ranges are answered with fewer users than the first page had
+        self.members(17)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests of the HTTP cache of the client. See README for license info.
+
+"""
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+import support  # noqa: F401
+
+from client import CachingAdapter, HTTPCache
+
+URL = "https://jira.example.com/rest/api/2/field"
+# what Jira sends with its REST responses
+JIRA_HEADERS = {"Cache-Control": "no-cache, no-store, no-transform",
+                "ETag": '"v1"',
+                "Set-Cookie": "JSESSIONID=fresh; Path=/"}
+
+
+class Server(BaseAdapter):
+    """Answers with the given headers, and 304 when the ETag matches."""
+
+    def __init__(self, headers=None):
+        super(Server, self).__init__()
+        self.headers = headers or {}
+        self.sent = 0
+        self.not_modified = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        response = Response()
+        response.headers = requests.structures.CaseInsensitiveDict(self.headers)
+        etag = self.headers.get("ETag")
+        if etag and request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response._content = ("body %d" % self.sent).encode("utf-8")
+        response.raw = io.BytesIO()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class CachingAdapterTest(unittest.TestCase):
+    def session(self, server, cache=None, **kwargs):
+        session = requests.Session()
+        session.mount("https://", CachingAdapter(
+            cache or HTTPCache(max_age=60), ["/field"], adapter=server, **kwargs))
+        return session
+
+    def test_entries_follow_the_user_not_the_cookie(self):
+        server = Server({"ETag": '"v1"'})
+        cache = HTTPCache(max_age=60)
+        alice = self.session(server, cache, identity="basic:alice")
+        first = alice.get(URL, cookies={"JSESSIONID": "one"}).text
+        # Jira rotated the session cookie
+        self.assertEqual(alice.get(URL, cookies={"JSESSIONID": "two"}).text,
+                         first)
+        bob = self.session(server, cache, identity="basic:bob")
+        self.assertNotEqual(bob.get(URL).text, first)
+        self.assertEqual(server.sent, 2)
+
+    def test_authorization_header_without_identity(self):
+        server = Server({"ETag": '"v1"'})
+        session = self.session(server)
+        first = session.get(URL, auth=("alice", "secret")).text
+        self.assertEqual(session.get(URL, auth=("alice", "secret")).text, first)
+        self.assertNotEqual(session.get(URL, auth=("bob", "secret")).text, first)
+
+    def test_set_cookie_is_not_replayed(self):
+        server = Server(dict(JIRA_HEADERS, **{"Cache-Control": "max-age=60"}))
+        session = self.session(server)
+        session.get(URL)
+        session.cookies.set("JSESSIONID", "current")
+        response = session.get(URL)
+        self.assertTrue(response.from_cache)
+        self.assertNotIn("Set-Cookie", response.headers)
+        self.assertEqual(session.cookies.get("JSESSIONID"), "current")
+
+    def test_private_is_cached_and_no_store_is_not(self):
+        server = Server({"Cache-Control": "private, max-age=60"})
+        session = self.session(server)
+        self.assertEqual(session.get(URL).text, session.get(URL).text)
+        self.assertEqual(server.sent, 1)
+        server = Server({"Cache-Control": "no-store"})
+        session = self.session(server)
+        self.assertNotEqual(session.get(URL).text, session.get(URL).text)
+        self.assertEqual(server.sent, 2)
+
+    def test_jira_headers(self):
+        # by default nothing Jira sends is kept
+        server = Server(JIRA_HEADERS)
+        session = self.session(server)
+        session.get(URL)
+        session.get(URL)
+        self.assertEqual(server.not_modified, 0)
+        # with ignore_no_store the entry is kept and revalidated each time,
+        # so Jira answers 304 without a body
+        server = Server(JIRA_HEADERS)
+        session = self.session(server, ignore_no_store=True)
+        first = session.get(URL).text
+        self.assertEqual(session.get(URL).text, first)
+        self.assertEqual(session.get(URL).text, first)
+        self.assertEqual((server.sent, server.not_modified), (3, 2))
+
+
+class DiskTierTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pruned_to_size(self):
+        cache = HTTPCache(directory=self.directory, max_disk_bytes=5000)
+        for n in range(20):
+            cache.put("key%02d" % n, {"stored": n, "headers": {},
+                                      "encoding": None,
+                                      "content": b"x" * 1000})
+        names = os.listdir(self.directory)
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.directory, name))
+                                 for name in names), 5000)
+        self.assertIn("key19.body", names)
+        self.assertNotIn("key00.body", names)
+
+
+if __name__ == "__main__":
+    unittest.main()
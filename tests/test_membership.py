@@ -0,0 +1,50 @@
+"""
+Tests of the group membership index. See README for license info.
+
+"""
+import unittest
+
+import support  # noqa: F401
+from support import fakejira, quietly, script
+
+
+class MissingGroupTest(unittest.TestCase):
+    def setUp(self):
+        dataset = fakejira.Dataset(issues=50)
+        del dataset.groups["membership-development"]
+        self.fake = fakejira.FakeJira(dataset).start()
+        jiratools = script("jiratools", self.fake)
+        with self.assertLogs(level="WARNING"):
+            self.housekeeping = quietly(jiratools.Housekeeping, run=False)
+
+    def tearDown(self):
+        self.housekeeping.jira.close()
+        self.fake.stop()
+
+    def test_only_jobs_using_the_group_fail(self):
+        members = self.housekeeping.members
+        self.assertTrue(members.account_ids("member-services"))
+        quietly(self.housekeeping.run_job, "close_resolved")
+        with self.assertRaises(LookupError):
+            quietly(self.housekeeping.run_job, "resolved_issue_audit")
+
+    def test_missing_group_is_not_fetched_again(self):
+        members = self.housekeeping.members
+        before = sum(stat["requests"] for stat in self.fake.snapshot().values())
+        for _ in range(3):
+            with self.assertRaises(LookupError):
+                members.in_group("someone", "membership-development")
+        self.assertEqual(
+            sum(stat["requests"] for stat in self.fake.snapshot().values()),
+            before)
+
+    def test_empty_group_has_no_one_to_assign(self):
+        self.fake.dataset.groups["issue audits"] = []
+        self.housekeeping.members.load("issue audits")
+        with self.assertRaises(LookupError):
+            self.housekeeping.user_with_fewest_issues("issue audits",
+                                                      "project = ADT")
+
+
+if __name__ == "__main__":
+    unittest.main()
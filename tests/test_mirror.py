@@ -0,0 +1,131 @@
+"""
+Tests of the issue mirror. See README for license info.
+
+"""
+from datetime import datetime, timezone
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+from support import fakejira
+
+from jira.client import JIRA
+import mirror
+from mirror import IssueMirror, UnsupportedQuery, _Translator
+
+
+class TranslatorTest(unittest.TestCase):
+    def setUp(self):
+        self.translator = _Translator(timezone.utc, fakejira.PROJECTS)
+
+    def assertRefused(self, jql):
+        with self.assertRaises(UnsupportedQuery):
+            self.translator.translate(jql)
+
+    def test_limited_to_mirrored_projects(self):
+        for jql in ('project = ADT',
+                    'project in (ADT, SE) ORDER BY created DESC',
+                    'project = ADT OR project = SE',
+                    '(project = INDEXREP AND status = Merged) AND '
+                    '(key in ("INDEXREP-1"))'):
+            self.translator.translate(jql)
+
+    def test_unlimited_queries_are_refused(self):
+        for jql in ('status = Open',
+                    'project = OTHER',
+                    'project in (OTHER, ADT)',
+                    'project = ADT OR status = Open',
+                    'NOT project = OTHER',
+                    'project != INDEXREP AND status = Resolved',
+                    'ORDER BY created'):
+            self.assertRefused(jql)
+
+    def test_ids_are_refused(self):
+        self.assertRefused('project = 10000')
+        self.assertRefused('project = ADT AND status = 3')
+        self.assertRefused('project = ADT AND resolution in (1, 2)')
+
+
+class FallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.dataset = fakejira.Dataset(issues=50)
+        self.dataset.add_issue("OTHER", {
+            "summary": "outside the mirror", "status": {"name": "Open"},
+            "reporter": None, "assignee": None, "labels": [],
+            "issuelinks": [], "resolutiondate": None,
+            "created": "2019-01-01T00:00:00.000+0000",
+            "updated": "2019-01-01T00:00:00.000+0000"})
+        self.fake = fakejira.FakeJira(self.dataset).start()
+        self.jira = JIRA(options={"server": self.fake.url},
+                         basic_auth=("test", "test"))
+        self.mirror = IssueMirror(self.jira, ":memory:", fakejira.PROJECTS)
+
+    def tearDown(self):
+        self.mirror.close()
+        self.jira.close()
+        self.fake.stop()
+
+    def test_counts_match_jira(self):
+        for jql in ('project = OTHER', 'status = Open',
+                    'project in (OTHER, ADT)', 'project = ADT',
+                    'project = ADT AND status = Open'):
+            self.assertEqual(mirror.count(self.jira, self.mirror, jql),
+                             self.jira.count(jql), jql)
+
+    def test_unlimited_search_goes_to_jira(self):
+        with self.assertRaises(UnsupportedQuery):
+            self.mirror.search_issues('project = OTHER')
+        issues = mirror.search(self.jira, self.mirror, 'project = OTHER')
+        self.assertEqual([issue.key for issue in issues], ["OTHER-1"])
+
+
+class ReopenTest(unittest.TestCase):
+    def setUp(self):
+        self.dataset = fakejira.Dataset(issues=50)
+        self.fake = fakejira.FakeJira(self.dataset).start()
+        self.jira = JIRA(options={"server": self.fake.url},
+                         basic_auth=("test", "test"))
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "mirror.sqlite")
+        self.open().close()
+
+    def tearDown(self):
+        self.jira.close()
+        self.fake.stop()
+        shutil.rmtree(self.directory)
+
+    def open(self, full_sync_seconds=None):
+        opened = IssueMirror(self.jira, self.path, fakejira.PROJECTS,
+                             full_sync_seconds=full_sync_seconds)
+        opened.ensure_fresh()
+        return opened
+
+    def test_new_process_syncs(self):
+        now = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+        self.dataset.add_issue("ADT", {
+            "summary": "added since", "status": {"name": "Open"},
+            "reporter": None, "assignee": None, "labels": [],
+            "issuelinks": [], "resolutiondate": None,
+            "created": now, "updated": now})
+        reopened = self.open()
+        self.assertEqual(reopened.count("project = ADT"),
+                         self.jira.count("project = ADT"))
+        reopened.close()
+
+    def test_deleted_issues_dropped_by_periodic_full_sync(self):
+        key = sorted(k for k in self.dataset.issues if k.startswith("ADT-"))[0]
+        issue = self.dataset.issues.pop(key)
+        del self.dataset.by_id[issue["id"]]
+        expected = self.jira.count("project = ADT")
+        reopened = self.open()
+        self.assertEqual(reopened.count("project = ADT"), expected + 1)
+        reopened.close()
+        reopened = self.open(full_sync_seconds=0)
+        self.assertEqual(reopened.count("project = ADT"), expected)
+        reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Tests of jobs run for given issues, as the webhook receiver does. See README
+for license info.
+
+"""
+import unittest
+
+import support
+from support import fakejira, quietly, script
+
+
+class ScopeTest(unittest.TestCase):
+    def run_job(self, job, keys=None, deleted=0):
+        """
+        Runs a job on a fresh dataset, for the given keys plus the keys of
+        issues deleted before the job runs.
+        Returns: (issue states afterwards, the issues of the job's scope)
+
+        """
+        dataset = fakejira.Dataset(issues=100)
+        gone = []
+        for _ in range(deleted):
+            issue = dataset.add_issue("MER", {})
+            gone.append(issue["key"])
+            del dataset.issues[issue["key"]]
+            del dataset.by_id[issue["id"]]
+        with fakejira.FakeJira(dataset) as fake:
+            jiratools = script("jiratools", fake)
+            housekeeping = quietly(jiratools.Housekeeping, run=False)
+            scope = None if keys is None else list(keys) + gone
+            quietly(housekeeping.run_job, job, scope)
+            failed = housekeeping.executors[-1].failed
+            housekeeping.jira.close()
+        self.assertEqual(failed, 0)
+        return support.issue_state(dataset)
+
+    def test_deleted_key_is_skipped(self):
+        keys = sorted(fakejira.Dataset(issues=100).issues)
+        direct = self.run_job("close_resolved")
+        self.assertNotEqual(direct, support.issue_state(
+            fakejira.Dataset(issues=100)), "the job changed nothing")
+        with self.assertLogs(level="WARNING") as logs:
+            scoped = self.run_job("close_resolved", keys, deleted=2)
+        self.assertEqual(scoped, direct)
+        self.assertIn("MER-", "\n".join(logs.output))
+
+    def test_only_deleted_keys(self):
+        self.assertEqual(self.run_job("close_resolved", [], deleted=1),
+                         support.issue_state(fakejira.Dataset(issues=100)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+"""
+Tests of the cached transitions. See README for license info.
+
+"""
+import unittest
+
+import support  # noqa: F401
+from support import fakejira, quietly, script
+
+
+class TransitionTest(unittest.TestCase):
+    def test_cached_transition_not_valid_for_issue(self):
+        dataset = fakejira.Dataset(issues=0)
+        fields = {"summary": "Feed", "status": {"name": "Resolved"},
+                  "issuetype": {"name": "Task"}, "labels": [],
+                  "reporter": None, "assignee": None}
+        first = dataset.add_issue("MER", fields)
+        second = dataset.add_issue("MER", fields)
+        # a workflow condition hides "Close Issue" from the second issue
+        second["transitions"] = [t for t in fakejira.TRANSITIONS
+                                 if t["name"] == "Complete"]
+        with fakejira.FakeJira(dataset) as fake:
+            jiratools = script("jiratools", fake)
+            housekeeping = quietly(jiratools.Housekeeping, run=False)
+            jira = housekeeping.jira
+            self.assertTrue(quietly(housekeeping.close_issue,
+                                    jira.issue(first["key"])))
+            self.assertTrue(housekeeping.transitions)
+            self.assertTrue(quietly(housekeeping.close_issue,
+                                    jira.issue(second["key"])))
+            self.assertFalse(quietly(housekeeping.transition,
+                                     jira.issue(second["key"]), ["qc"]))
+            jira.close()
+        self.assertEqual([issue["fields"]["status"]["name"]
+                          for issue in (first, second)], ["Closed", "Closed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 from datetime import datetime
 from jira.client import JIRA
+from membership import MembershipIndex
+from mirror import IssueMirror, search
 import secrets
 import settings
 import statistics
@@ -10,6 +12,8 @@ class TimeToTouch:
         options=secrets.options
         housekeeping_auth=secrets.housekeeping_auth
         self.jira = JIRA(options=options, basic_auth=housekeeping_auth)
+        # issues and changelogs come from the local mirror when configured
+        self.mirror = IssueMirror.from_settings(self.jira)
         self.calculate_touch_time("Sales-Engineering")
 
     def calculate_touch_time(self,team):
@@ -40,7 +44,7 @@ class TimeToTouch:
         # init the list to contain the touch time
         touchList = []
         # get user list
-        userList = self.get_group_members(team)
+        members = MembershipIndex(self.jira, [team])
         for issue in issues:
             createdDate=datetime.strptime(
                 issue.fields.created.split(".")[0],
@@ -63,7 +67,7 @@ class TimeToTouch:
                 author = ticketLog.__getitem__(i).author
                 #print(author.accountId)
 
-                if author.accountId in userList:
+                if members.in_group(author.accountId, team):
                     seTouchDate=datetime.strptime(
                         ticketLog.__getitem__(i).created.split(".")[0],
                         "%Y-%m-%dT%H:%M:%S"
@@ -113,10 +117,15 @@ class TimeToTouch:
             :issues:    Jira Issues object
 
         """
-        result = self.jira.search_issues(
+        # only the creation date and the changelog are read, so leave every
+        # other field out of the (large) changelog pages
+        result = search(
+            self.jira,
+            self.mirror,
             jql,
             startAt=start,
             expand="changelog",
+            fields="created",
             maxResults=max
             )
         return result
@@ -137,12 +146,5 @@ class TimeToTouch:
             touchTime = str(touchTime) + " Hours"
         return touchTime
 
-    def get_group_members(self, group_name):
-        """
-        Returns the members of a group as a list
-        """
-        group = self.jira.groups(query=group_name)[0]
-        members = self.jira.group_members(group)
-        return members
-
-TimeToTouch()
+if __name__ == "__main__":
+    TimeToTouch()
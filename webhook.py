@@ -0,0 +1,325 @@
+"""
+Jira webhook receiver for the Housekeeping jobs. See README for license info.
+
+Jira posts an event to the receiver whenever an issue is created or updated.
+Each event is matched against settings.webhook_routes, and the housekeeping
+jobs it names run for that issue alone, seconds after the change instead of
+at the next cron run. The jobs still check the issue against their filters,
+so an event never makes a job do more than the cron run would have done; the
+cron run stays as a slower sweep for events that were missed. Usage:
+
+    python webhook.py [--host 127.0.0.1] [--port 8085] [--token TOKEN]
+    python webhook.py --post event.json [event.json ...] [--url URL]
+
+The second form posts sample payloads to a running receiver. GET on the
+receiver returns the number of queued, run and failed jobs.
+
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import heapq
+import hmac
+import itertools
+import json
+import logging
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from jiratools import Housekeeping
+import settings
+
+
+def route(event, routes=None):
+    """
+    Finds the jobs a Jira webhook event should run.
+    Inputs:
+        :event:     decoded webhook payload
+        :routes:    list of rules, default settings.webhook_routes. A rule
+                    matches the webhookEvent and, if it names a field, a
+                    changelog item setting that field to "to" (None for
+                    emptying it)
+    Returns: list of (job, delay in seconds), in rule order
+
+    """
+    items = (event.get("changelog") or {}).get("items") or []
+    jobs = []
+    for rule in settings.webhook_routes if routes is None else routes:
+        if rule["event"] != event.get("webhookEvent"):
+            continue
+        if "field" in rule and not any(_sets(item, rule["field"], rule.get("to"))
+                                       for item in items):
+            continue
+        for job in rule["jobs"]:
+            if job not in [name for name, _ in jobs]:
+                jobs.append((job, rule.get("delay", 0)))
+    return jobs
+
+
+def _sets(item, field, value):
+    if (item.get("field") or "").lower() != field.lower():
+        return False
+    if value is None:
+        return not item.get("toString") and not item.get("to")
+    return (item.get("toString") or "").lower() == value.lower()
+
+
+class Dispatcher:
+    """
+    Queue of (job, issue) pairs run by a single thread on one Housekeeping
+    instance, so events share its client, caches and mirror.
+
+    """
+    def __init__(self, housekeeping=None, refresh_seconds=3600):
+        """
+        Inputs:
+        :housekeeping:      Housekeeping(run=False) to run the jobs with.
+                            Created on the first batch when not given
+        :refresh_seconds:   refresh the caches of the Housekeeping
+                            instance (Housekeeping.refresh) this often
+
+        """
+        self.housekeeping = housekeeping
+        self.refresh_seconds = refresh_seconds
+        self.built = time.time() if housekeeping else None
+        self.ran = 0
+        self.failed = 0
+        # True while a batch is being run
+        self.running = False
+        self._queue = []
+        self._pending = {}
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending)
+
+    def submit(self, key, jobs):
+        """
+        Queues jobs for an issue. A job already queued for the issue is
+        queued once, at the earlier of the two times.
+        Inputs:
+            :key:   issue key
+            :jobs:  list of (job, delay in seconds), as returned by route()
+
+        """
+        with self._condition:
+            for job, delay in jobs:
+                due = time.time() + delay
+                if self._pending.get((job, key), due + 1) <= due:
+                    continue
+                self._pending[(job, key)] = due
+                heapq.heappush(self._queue, (due, next(self._order), job, key))
+            self._condition.notify()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and not self._due():
+                    timeout = self._queue[0][0] - time.time() if self._queue else None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                batch = {}
+                while self._due():
+                    due, _, job, key = heapq.heappop(self._queue)
+                    # entries replaced by an earlier submit are skipped
+                    if self._pending.get((job, key)) == due:
+                        del self._pending[(job, key)]
+                        batch.setdefault(job, set()).add(key)
+                self.running = True
+            try:
+                self.run(batch)
+            finally:
+                self.running = False
+
+    def _due(self):
+        return bool(self._queue) and self._queue[0][0] <= time.time()
+
+    def run(self, batch):
+        """
+        Runs a batch of jobs, each for its issues, in the order of
+        Housekeeping.jobs. A failing job is logged and the others still run.
+        Inputs: batch: dict of job name -> issue keys
+
+        """
+        if self.housekeeping is None:
+            self.housekeeping = Housekeeping(run=False)
+            self.built = time.time()
+        elif time.time() - self.built > self.refresh_seconds:
+            self.housekeeping.refresh()
+            self.built = time.time()
+        housekeeping = self.housekeeping
+        # the events report changes made outside this client
+        if housekeeping.mirror:
+            housekeeping.mirror.dirty = True
+        for job in sorted(batch, key=_job_order):
+            keys = sorted(batch[job])
+            try:
+                housekeeping.run_job(job, keys)
+                self.ran += 1
+            except Exception:
+                self.failed += 1
+                logging.exception("webhook: %s failed for %s", job,
+                                  ", ".join(keys))
+            else:
+                logging.info("webhook: ran %s for %s", job, ", ".join(keys))
+        # a long running receiver keeps no per-run history
+        with housekeeping.lock:
+            del housekeeping.budgets[:]
+            del housekeeping.executors[:]
+
+
+def _job_order(job):
+    return (Housekeeping.jobs.index(job) if job in Housekeeping.jobs
+            else len(Housekeeping.jobs), job)
+
+
+class WebhookServer:
+    """
+    HTTP server accepting Jira webhook events. Use as a context manager or
+    call start()/stop().
+
+    """
+    def __init__(self, dispatcher, host="127.0.0.1", port=8085, token=None):
+        """
+        Inputs:
+        :dispatcher:    Dispatcher the routed jobs are queued on
+        :host/port:     address to listen on. Port 0 picks a free one
+        :token:         if set, events must carry it as ?token=... in the
+                        webhook URL
+
+        """
+        self.dispatcher = dispatcher
+        self.token = token
+        handler = type("Handler", (_Handler,), {"receiver": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.url = "http://%s:%d/" % self.server.server_address
+        self._thread = None
+
+    def start(self):
+        self.dispatcher.start()
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.dispatcher.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def accept(self, event):
+        """
+        Queues the jobs routed for an event.
+        Returns: list of (job, delay) queued
+
+        """
+        key = (event.get("issue") or {}).get("key")
+        jobs = route(event) if key else []
+        if jobs:
+            self.dispatcher.submit(key, jobs)
+        logging.info("webhook: %s %s -> %s", event.get("webhookEvent"), key,
+                     ", ".join(job for job, _ in jobs) or "nothing")
+        return jobs
+
+
+class _Handler(BaseHTTPRequestHandler):
+    receiver = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        dispatcher = self.receiver.dispatcher
+        self._reply(200, {"queued": len(dispatcher),
+                          "running": dispatcher.running,
+                          "ran": dispatcher.ran,
+                          "failed": dispatcher.failed})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        token = self.receiver.token
+        if token is not None:
+            given = parse_qs(urlparse(self.path).query).get("token", [""])[0]
+            if not hmac.compare_digest(given, token):
+                return self._reply(403, {"error": "bad token"})
+        try:
+            event = json.loads(body.decode("utf-8"))
+        except ValueError:
+            return self._reply(400, {"error": "body is not JSON"})
+        jobs = self.receiver.accept(event)
+        self._reply(202, {"jobs": [job for job, _ in jobs]})
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def post(url, paths):
+    """
+    Posts sample webhook payloads to a receiver and prints its answers.
+    Inputs:
+        :url:   receiver URL, including ?token=... if it needs one
+        :paths: JSON files, each holding one webhook payload
+
+    """
+    import requests
+    for path in paths:
+        with open(path) as f:
+            response = requests.post(url, json=json.load(f))
+        print("{}: {} {}".format(path, response.status_code, response.text))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jira webhook receiver")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--token", help="secret the webhook URL must carry "
+                                        "as ?token=")
+    parser.add_argument("--post", nargs="+", metavar="EVENT",
+                        help="post these payload files to --url and exit")
+    parser.add_argument("--url", default="http://127.0.0.1:8085/")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.post:
+        post(args.url, args.post)
+    else:
+        receiver = WebhookServer(Dispatcher(Housekeeping(run=False)),
+                                 args.host, args.port, args.token)
+        receiver.start()
+        logging.info("webhook: listening on %s", receiver.url)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            receiver.stop()